@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+'''
+Compare the number of candidates (programs given to the decider), the number of programs built, and the time needed to solve DeepCoder tasks with ExhaustiveEnumerator and BottomUpEnumerator.
+The expected outputs of each task are computed by running its target program on the inputs. The exhaustive search gives up after `--max-attempts` candidates.
+
+    $ PYTHONPATH=. python benchmarks/bottom_up.py
+'''
+
+import argparse
+import time
+import tyrell.spec as S
+from tyrell.dsl import Builder
+from tyrell.enumerator import Enumerator, ExhaustiveEnumerator, BottomUpEnumerator
+from tyrell.decider import Example, ExampleDecider
+from tyrell.synthesizer import Synthesizer
+from tyrell.interpreter import GeneralError
+from demo_deepcoder_enumerator import DeepCoderInterpreter
+
+inputs = [
+    [[6, 2, 4, 7, 9], [5, 3, 6, 1, 0]],
+    [[1, 3, 5, 7, 9], [2, 4, 6, 8, 10]],
+    [[-3, 0, 3, 8, 2], [4, 4, 1, -1, 5]],
+]
+
+tasks = [
+    ('(maximum (map (get_mfn (mfn_pool "mul") (int_pool "3")) (@param 0)))', 4),
+    ('(sum (filter (get_fn (fn_pool "is_even")) (@param 1)))', 4),
+    ('(plus (sum (@param 0)) (maximum (@param 1)))', 3),
+    ('(access (get_int (int_pool "2")) (sort (@param 0)))', 3),
+    ('(count (get_fn (fn_pool "gt_zero")) (zipwith (get_fn (fn_pool "minus")) (@param 0) (@param 1)))', 4),
+]
+
+
+class BoundedDeepCoderInterpreter(DeepCoderInterpreter):
+    '''
+    DeepCoder restricts integers to a small range. Without a bound, nested calls to pow produce integers with millions of digits, which any enumerator that composes int programs freely runs into.
+    '''
+
+    def eval_pow(self, node, args):
+        value = super().eval_pow(node, args)
+        if abs(value) > 2 ** 31:
+            raise GeneralError()
+        return value
+
+
+class LimitedEnumerator(Enumerator):
+    def __init__(self, enumerator, max_attempts):
+        self._enumerator = enumerator
+        self._remaining = max_attempts
+
+    def next(self):
+        if self._remaining == 0:
+            return None
+        self._remaining -= 1
+        return self._enumerator.next()
+
+
+def solve(spec, enumerator, examples):
+    synthesizer = Synthesizer(
+        enumerator=enumerator,
+        decider=ExampleDecider(
+            interpreter=BoundedDeepCoderInterpreter(), examples=examples))
+    start = time.perf_counter()
+    prog = synthesizer.synthesize()
+    return prog, synthesizer.num_attempts, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-s', '--max-size', type=int, default=9)
+    parser.add_argument('-m', '--max-attempts', type=int, default=200000)
+    args = parser.parse_args()
+
+    spec = S.parse_file('example/deepcoder.tyrell')
+    builder = Builder(spec)
+    interp = BoundedDeepCoderInterpreter()
+    for target_str, depth in tasks:
+        target = builder.from_sexp_string(target_str)
+        examples = [Example(input=x, output=interp.eval(target, x)) for x in inputs]
+        print('target: {}'.format(target))
+        for name, enumerator in [
+                ('exhaustive', LimitedEnumerator(ExhaustiveEnumerator(spec, max_depth=depth), args.max_attempts)),
+                ('bottom-up', BottomUpEnumerator(spec, BoundedDeepCoderInterpreter(), inputs, max_size=args.max_size))]:
+            prog, num_attempts, elapsed = solve(spec, enumerator, examples)
+            # The bottom-up enumerator also builds programs of other types, and programs that it prunes
+            num_built = enumerator.num_programs + enumerator.num_pruned if name == 'bottom-up' else num_attempts
+            print('  {:<11}{:>9} candidates {:>9} built {:>9.2f}s  {}'.format(
+                name, num_attempts, num_built, elapsed, prog if prog is not None else '(not found)'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+'''
+Compare the compiled evaluation of PostOrderInterpreter with the visitor-based reference implementation, on programs enumerated for the DeepCoder demo.
+The programs are enumerated once, then every program is evaluated on every example. The compiled time includes compiling each program once.
+
+    $ PYTHONPATH=. python benchmarks/compiled_eval.py -n 2000
+'''
+
+import argparse
+import time
+import tyrell.spec as S
+from tyrell.enumerator import SmtEnumerator
+from tyrell.interpreter import InterpreterError
+from demo_deepcoder_enumerator import DeepCoderInterpreter
+
+inputs = [
+    [[6, 2, 4, 7, 9], [5, 3, 6, 1, 0]],
+    [[1, 3, 5, 7, 9], [2, 4, 6, 8, 10]],
+    [[-3, 0, 3, 8, 2], [4, 4, 1, -1, 5]],
+]
+
+
+def evaluate_all(eval_fn, progs):
+    start = time.perf_counter()
+    results = []
+    for prog in progs:
+        for x in inputs:
+            try:
+                results.append(eval_fn(prog, x))
+            except InterpreterError as e:
+                results.append((type(e), len(e.context.observed)))
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec', type=str, nargs='?', default='example/deepcoder.tyrell')
+    parser.add_argument('-d', '--depth', type=int, default=5)
+    parser.add_argument('-l', '--loc', type=int, default=5)
+    parser.add_argument('-n', '--num-programs', type=int, default=1000)
+    args = parser.parse_args()
+
+    spec = S.parse_file(args.spec)
+    enumerator = SmtEnumerator(spec, depth=args.depth, loc=args.loc)
+    progs = enumerator.next_batch(args.num_programs)
+    print('spec={} depth={} loc={} programs={} examples={}'.format(
+        args.spec, args.depth, args.loc, len(progs), len(inputs)))
+
+    interp = DeepCoderInterpreter()
+    reference_time, expected = evaluate_all(interp.reference_eval, progs)
+    print('{:<10}{:>12.3f}s'.format('reference', reference_time))
+    compiled_time, actual = evaluate_all(interp.eval, progs)
+    assert actual == expected
+    print('{:<10}{:>12.3f}s  speedup {:.2f}'.format(
+        'compiled', compiled_time, reference_time / compiled_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+'''
+Measure parsing and SmtEnumerator construction on a spec with a wide enumset, like the column lists of a real table.
+
+    $ PYTHONPATH=. python benchmarks/enumset.py -c 30 -l 3 -n 20
+'''
+
+import argparse
+import time
+import tracemalloc
+import tyrell.spec as S
+from tyrell.enumerator import SmtEnumerator
+
+SPEC = '''
+enum ColInt {{
+  {cols}
+}}
+enumset ColList[{max_len}] {{
+  {cols}
+}}
+value Table;
+value Empty;
+
+program P(Table) -> Table;
+func empty: Empty -> Empty;
+func select: Table -> Table, ColList;
+func gather: Table -> Table, ColList;
+func unite: Table -> Table, ColInt, ColInt;
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-c', '--num-columns', type=int, default=30)
+    parser.add_argument('-l', '--max-len', type=int, default=3)
+    parser.add_argument('-n', '--num-programs', type=int, default=20)
+    parser.add_argument('-e', '--encoding', type=str, default='int')
+    args = parser.parse_args()
+
+    cols = ', '.join(['"{}"'.format(i + 1) for i in range(args.num_columns)])
+    spec_str = SPEC.format(cols=cols, max_len=args.max_len)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    spec = S.parse(spec_str)
+    parse_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('columns={} max_len={} productions={}'.format(
+        args.num_columns, args.max_len, spec.num_productions()))
+    print('{:<12}{:>10.3f}s  peak {:.1f} MB'.format('parse', parse_time, peak / 1e6))
+
+    start = time.perf_counter()
+    ty = spec.get_type_or_raise('ColList')
+    for value in [['1'], ['2', '5'], [str(args.num_columns)]]:
+        spec.get_enum_production_or_raise(ty, value)
+    print('{:<12}{:>10.4f}s'.format('lookup', time.perf_counter() - start))
+
+    start = time.perf_counter()
+    enumerator = SmtEnumerator(spec, depth=3, loc=2, encoding=args.encoding)
+    print('{:<12}{:>10.3f}s  assertions {}'.format(
+        'encode', time.perf_counter() - start, len(enumerator.z3_solver.assertions())))
+
+    start = time.perf_counter()
+    progs = enumerator.next_batch(args.num_programs)
+    print('{:<12}{:>10.3f}s  programs {}'.format('enumerate', time.perf_counter() - start, len(progs)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+'''
+Measure the evaluation cache of PostOrderInterpreter on programs enumerated for the DeepCoder demo.
+The programs are enumerated once, then every program is evaluated on every example with and without the cache.
+
+    $ PYTHONPATH=. python benchmarks/eval_cache.py -n 2000
+'''
+
+import argparse
+import time
+import tyrell.spec as S
+from tyrell.enumerator import SmtEnumerator
+from tyrell.interpreter import EvalCache, InterpreterError
+from demo_deepcoder_enumerator import DeepCoderInterpreter
+
+inputs = [
+    [[6, 2, 4, 7, 9], [5, 3, 6, 1, 0]],
+    [[1, 3, 5, 7, 9], [2, 4, 6, 8, 10]],
+    [[-3, 0, 3, 8, 2], [4, 4, 1, -1, 5]],
+]
+
+
+def evaluate_all(interp, progs):
+    start = time.perf_counter()
+    num_errors = 0
+    for prog in progs:
+        for x in inputs:
+            try:
+                interp.eval(prog, x)
+            except InterpreterError:
+                num_errors += 1
+    return time.perf_counter() - start, num_errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec', type=str, nargs='?', default='example/deepcoder.tyrell')
+    parser.add_argument('-d', '--depth', type=int, default=5)
+    parser.add_argument('-l', '--loc', type=int, default=5)
+    parser.add_argument('-n', '--num-programs', type=int, default=1000)
+    parser.add_argument('-s', '--max-entries', type=int, default=65536)
+    args = parser.parse_args()
+
+    spec = S.parse_file(args.spec)
+    enumerator = SmtEnumerator(spec, depth=args.depth, loc=args.loc)
+    progs = enumerator.next_batch(args.num_programs)
+    print('spec={} depth={} loc={} programs={} examples={}'.format(
+        args.spec, args.depth, args.loc, len(progs), len(inputs)))
+
+    plain_time, plain_errors = evaluate_all(DeepCoderInterpreter(), progs)
+    print('{:<10}{:>12.3f}s'.format('no cache', plain_time))
+    cache = EvalCache(max_entries=args.max_entries)
+    cached_time, cached_errors = evaluate_all(DeepCoderInterpreter(cache), progs)
+    assert cached_errors == plain_errors
+    print('{:<10}{:>12.3f}s  speedup {:.2f}  {}'.format(
+        'cache', cached_time, plain_time / cached_time, cache))
+
+
+if __name__ == '__main__':
+    main()
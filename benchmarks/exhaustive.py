@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+'''
+Compare the throughput of ExhaustiveEnumerator, which is bounded by depth, with SizedExhaustiveEnumerator, which is bounded by size, with and without a cap on the memoized tables.
+Each enumerator produces the first `--num-programs` programs of the DeepCoder demo spec.
+
+    $ PYTHONPATH=. python benchmarks/exhaustive.py -n 200000
+'''
+
+import argparse
+import time
+import tracemalloc
+import tyrell.spec as S
+from tyrell.enumerator import ExhaustiveEnumerator, SizedExhaustiveEnumerator
+
+
+def run(name, make_enumerator, num_programs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    enumerator = make_enumerator()
+    num_enumerated = 0
+    while num_enumerated < num_programs:
+        prog = enumerator.next()
+        if prog is None:
+            break
+        num_enumerated += 1
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('{:<24}{:>9} programs {:>9.2f}s {:>10.0f} programs/s {:>8.1f} MB peak'.format(
+        name, num_enumerated, elapsed, num_enumerated / elapsed, peak / 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec', type=str, nargs='?', default='example/deepcoder.tyrell')
+    parser.add_argument('-d', '--depth', type=int, default=4)
+    parser.add_argument('-s', '--max-size', type=int, default=12)
+    parser.add_argument('-n', '--num-programs', type=int, default=200000)
+    parser.add_argument('-c', '--max-cached', type=int, default=10000)
+    args = parser.parse_args()
+
+    spec = S.parse_file(args.spec)
+    run('depth {}'.format(args.depth),
+        lambda: ExhaustiveEnumerator(spec, max_depth=args.depth), args.num_programs)
+    run('size {}'.format(args.max_size),
+        lambda: SizedExhaustiveEnumerator(spec, max_size=args.max_size), args.num_programs)
+    run('size {}, {} cached'.format(args.max_size, args.max_cached),
+        lambda: SizedExhaustiveEnumerator(spec, max_size=args.max_size, max_cached=args.max_cached),
+        args.num_programs)
+    run('size {}, no cache'.format(args.max_size),
+        lambda: SizedExhaustiveEnumerator(spec, max_size=args.max_size, max_cached=0),
+        args.num_programs)
+
+
+if __name__ == '__main__':
+    main()
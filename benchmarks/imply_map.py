@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+'''
+Measure how long ExampleConstraintDecider takes to build its imply map: serially, with a process pool, and from the on-disk cache.
+
+    $ PYTHONPATH=. python benchmarks/imply_map.py example/morpheus.tyrell -p 4
+'''
+
+import argparse
+import tempfile
+import time
+import tyrell.spec as S
+from tyrell.cache import DiskCache
+from tyrell.decider.example_constraint import compute_imply_map, imply_map_key
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec', type=str, nargs='?', default='example/morpheus.tyrell')
+    parser.add_argument('-p', '--num-processes', type=int, default=None)
+    args = parser.parse_args()
+
+    spec = S.parse_file(args.spec)
+    num_constrained = len([x for x in spec.get_function_productions() if len(x.constraints) > 0])
+    print('spec={} constrained functions={}'.format(args.spec, num_constrained))
+
+    start = time.perf_counter()
+    imply_map = compute_imply_map(spec, num_processes=1)
+    serial_time = time.perf_counter() - start
+    print('{:<12}{:>10.3f}s  {} entries'.format('serial', serial_time, len(imply_map)))
+
+    start = time.perf_counter()
+    assert compute_imply_map(spec, num_processes=args.num_processes) == imply_map
+    print('{:<12}{:>10.3f}s'.format('pool', time.perf_counter() - start))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache = DiskCache(tmp_dir)
+        cache.put('imply_map', imply_map_key(spec), imply_map)
+        start = time.perf_counter()
+        assert cache.get('imply_map', imply_map_key(spec)) == imply_map
+        print('{:<12}{:>10.4f}s'.format('disk cache', time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+'''
+Measure the time the constraint-based deciders spend analyzing programs enumerated for the toy demo.
+Most of the programs fail the examples, so each analysis encodes the constraints of the program and checks them against every failed example.
+
+    $ PYTHONPATH=. python benchmarks/incremental_z3.py -n 2000
+'''
+
+import argparse
+import time
+import tyrell.spec as S
+from tyrell.enumerator import ExhaustiveEnumerator
+from tyrell.decider import Example, ExampleConstraintDecider, ExampleConstraintPruningDecider
+from tyrell.interpreter import InterpreterError
+from demo_smt_enumerator import ToyInterpreter
+
+examples = [
+    Example(input=[4, 3], output=3),
+    Example(input=[6, 3], output=9),
+    Example(input=[1, 2], output=-2),
+    Example(input=[1, 1], output=0),
+]
+
+
+def analyze_all(decider, progs):
+    start = time.perf_counter()
+    num_blamed = 0
+    for prog in progs:
+        try:
+            res = decider.analyze(prog)
+        except InterpreterError:
+            continue
+        if res.is_bad() and res.why() is not None:
+            num_blamed += 1
+    return time.perf_counter() - start, num_blamed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec', type=str, nargs='?', default='example/toy.tyrell')
+    parser.add_argument('-d', '--depth', type=int, default=4)
+    parser.add_argument('-n', '--num-programs', type=int, default=2000)
+    args = parser.parse_args()
+
+    spec = S.parse_file(args.spec)
+    progs = ExhaustiveEnumerator(spec, max_depth=args.depth).next_batch(args.num_programs)
+    print('spec={} depth={} programs={} examples={}'.format(
+        args.spec, args.depth, len(progs), len(examples)))
+    for decider_class in [ExampleConstraintDecider, ExampleConstraintPruningDecider]:
+        decider = decider_class(spec=spec, interpreter=ToyInterpreter(), examples=examples)
+        elapsed, num_blamed = analyze_all(decider, progs)
+        print('{:<34}{:>10.3f}s  blamed {}'.format(decider_class.__name__, elapsed, num_blamed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+'''
+Measure how the parallel synthesizer scales with the number of workers on the DeepCoder demo.
+`--delay` adds a fixed latency to every evaluation, to stand in for an expensive interpreter such as the R backend of Morpheus.
+Each configuration runs in a fresh process: z3 objects live in a global context, and enumerators built earlier in the same process change the order in which later ones visit the search space.
+
+    $ PYTHONPATH=. python benchmarks/parallel_synthesis.py --delay 0.05 -w 0 -w 1 -w 2 -w 4
+'''
+
+import argparse
+import subprocess
+import sys
+import time
+from functools import partial
+import tyrell.spec as S
+from tyrell.enumerator import SmtEnumerator
+from tyrell.decider import Example, ExampleConstraintDecider
+from tyrell.synthesizer import Synthesizer, ParallelSynthesizer
+from demo_deepcoder_enumerator import DeepCoderInterpreter
+
+examples = [
+    Example(input=[[6, 2, 4, 7, 9], [5, 3, 6, 1, 0]], output=27),
+]
+
+
+class SlowInterpreter(DeepCoderInterpreter):
+    def __init__(self, delay):
+        super().__init__()
+        self._delay = delay
+
+    def eval(self, prog, inputs):
+        time.sleep(self._delay)
+        return super().eval(prog, inputs)
+
+
+def make_decider(spec, delay):
+    return ExampleConstraintDecider(spec=spec, interpreter=SlowInterpreter(delay), examples=examples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec', type=str, nargs='?', default='example/deepcoder.tyrell')
+    parser.add_argument('-d', '--depth', type=int, default=5)
+    parser.add_argument('-l', '--loc', type=int, default=5)
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help='Seconds added to every evaluation')
+    parser.add_argument('-w', '--workers', type=int, action='append',
+                        help='Numbers of workers to measure (default: 0, 1, 2 and 4). 0 means the sequential synthesizer')
+    parser.add_argument('--run', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run is not None:
+        run(args, args.run)
+        return
+
+    print('spec={} depth={} loc={} delay={}'.format(
+        args.spec, args.depth, args.loc, args.delay))
+    print('{:<10}{:>12}  {}'.format('workers', 'time (s)', 'solution'), flush=True)
+    for num_workers in args.workers or [0, 1, 2, 4]:
+        subprocess.run([sys.executable, __file__, args.spec, '--depth', str(args.depth), '--loc', str(args.loc),
+                        '--delay', str(args.delay), '--run', str(num_workers)], check=True)
+
+
+def run(args, num_workers):
+    spec = S.parse_file(args.spec)
+    enumerator = SmtEnumerator(spec, depth=args.depth, loc=args.loc)
+    factory = partial(make_decider, spec, args.delay)
+    if num_workers == 0:
+        synthesizer = Synthesizer(enumerator=enumerator, decider=factory())
+    else:
+        synthesizer = ParallelSynthesizer(
+            enumerator=enumerator, spec=spec, decider_factory=factory, num_workers=num_workers)
+    start = time.perf_counter()
+    prog = synthesizer.synthesize()
+    elapsed = time.perf_counter() - start
+    print('{:<10}{:>12.3f}  {}'.format(num_workers, elapsed, prog), flush=True)
+
+
+if __name__ == '__main__':
+    main()
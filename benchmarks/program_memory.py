@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+'''
+Measure the memory taken by stored programs, as `Node` objects and in a `ProgramBank`.
+The programs are enumerated exhaustively, then copied into each representation while tracemalloc counts the retained bytes.
+
+    $ PYTHONPATH=. python benchmarks/program_memory.py -n 20000
+'''
+
+import argparse
+import tracemalloc
+import tyrell.spec as S
+from tyrell.dsl import Builder, ProgramBank, dfs
+from tyrell.enumerator import ExhaustiveEnumerator
+
+
+def measure(fn):
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    result = fn()
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return end - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec', type=str, nargs='?', default='example/deepcoder.tyrell')
+    parser.add_argument('-d', '--depth', type=int, default=4)
+    parser.add_argument('-n', '--num-programs', type=int, default=20000)
+    args = parser.parse_args()
+
+    spec = S.parse_file(args.spec)
+    progs = ExhaustiveEnumerator(spec, max_depth=args.depth).next_batch(args.num_programs)
+    num_nodes = sum(len(list(dfs(x))) for x in progs)
+    print('spec={} depth={} programs={} nodes={}'.format(
+        args.spec, args.depth, len(progs), num_nodes))
+
+    builder = Builder(spec)
+
+    def copy(node):
+        return builder.make_node(node.production, [copy(x) for x in node.children])
+    node_bytes, copies = measure(lambda: [copy(x) for x in progs])
+
+    def fill_bank():
+        bank = ProgramBank(spec)
+        for prog in progs:
+            bank.add(prog)
+        return bank
+    bank_bytes, bank = measure(fill_bank)
+
+    for name, nbytes in [('nodes', node_bytes), ('bank', bank_bytes)]:
+        print('{:<6}{:>12} bytes  {:>8.1f} per program  {:>6.1f} per node'.format(
+            name, nbytes, nbytes / len(progs), nbytes / num_nodes))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+'''
+Compare RandomEnumerator with WeightedRandomEnumerator on how many distinct programs they produce for a fixed number of samples.
+
+    $ PYTHONPATH=. python benchmarks/random_enumerator.py -n 5000
+'''
+
+import argparse
+import time
+import tyrell.spec as S
+from tyrell.enumerator import RandomEnumerator, WeightedRandomEnumerator
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec', type=str, nargs='?', default='example/toy.tyrell')
+    parser.add_argument('-d', '--depth', type=int, default=4)
+    parser.add_argument('-n', '--num-programs', type=int, default=5000)
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    spec = S.parse_file(args.spec)
+    print('spec={} depth={} programs={}'.format(args.spec, args.depth, args.num_programs))
+
+    enumerator = RandomEnumerator(spec, max_depth=args.depth, seed=args.seed)
+    start = time.perf_counter()
+    progs = [enumerator.next() for _ in range(args.num_programs)]
+    elapsed = time.perf_counter() - start
+    num_distinct = len(set(str(x) for x in progs))
+    print('{:<10}{:>10.3f}s  distinct {:>6}  duplicates {:>6}'.format(
+        'uniform', elapsed, num_distinct, len(progs) - num_distinct))
+
+    enumerator = WeightedRandomEnumerator(spec, max_depth=args.depth, seed=args.seed)
+    start = time.perf_counter()
+    progs = enumerator.next_batch(args.num_programs)
+    elapsed = time.perf_counter() - start
+    num_distinct = len(set(str(x) for x in progs))
+    print('{:<10}{:>10.3f}s  distinct {:>6}  duplicates {:>6}'.format(
+        'weighted', elapsed, num_distinct, enumerator.num_duplicates))
+
+
+if __name__ == '__main__':
+    main()
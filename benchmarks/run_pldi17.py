@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+'''
+Run the Morpheus synthesizer on the pldi17 benchmark suite and write a report that can be compared between commits.
+
+Every `pN_input*.csv` / `pN_output*.csv` group under the suite directory is a task. Tasks whose number of input tables differs from the number of inputs of the spec's program are not run, and are reported as "unsupported". Each task runs in its own process, with a wall-clock timeout and a cap on its address space. The enumerator deepens iteratively from 1 to `--max-loc` functions.
+
+    $ PYTHONPATH=. python benchmarks/run_pldi17.py --timeout 300 --json report.json --csv report.csv
+    $ PYTHONPATH=. python benchmarks/run_pldi17.py --json new.json --baseline report.json
+
+With `--baseline`, the script exits with a non-zero status if a task solved in the baseline is no longer solved, or if the total time on the tasks solved by both runs grows by more than `--tolerance`.
+The default backend needs R (with the compare, dplyr and tidyr libraries) and rpy2, just like morpheus_enumerator.py. `--backend pandas` evaluates programs in-process with morpheus_pandas.py instead.
+'''
+
+import argparse
+import csv
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+FIELDS = ['task', 'status', 'wall_time', 'num_candidates',
+          'num_solver_calls', 'decider_time', 'num_inputs', 'program']
+TASK_FILE = re.compile(r'^p(\d+)_(input|output)(\d+)\.csv$')
+
+
+def discover_tasks(suite_dir):
+    '''Return a list of (name, input files, output file) sorted by task number'''
+    files = defaultdict(lambda: {'input': {}, 'output': {}})
+    for name in os.listdir(suite_dir):
+        m = TASK_FILE.match(name)
+        if m is not None:
+            files[int(m.group(1))][m.group(2)][int(m.group(3))] = os.path.join(suite_dir, name)
+    tasks = []
+    for num in sorted(files):
+        inputs = [files[num]['input'][i] for i in sorted(files[num]['input'])]
+        outputs = [files[num]['output'][i] for i in sorted(files[num]['output'])]
+        if len(inputs) == 0 or len(outputs) != 1:
+            print('Skipping p{}: expected at least one input and exactly one output'.format(num), file=sys.stderr)
+            continue
+        tasks.append(('p{}'.format(num), inputs, outputs[0]))
+    return tasks
+
+
+def run_task(args):
+    '''Synthesize a program for one task in the current process, and print its record as JSON on the last line'''
+    # Imported here so that only the task processes pay for starting R
+    import tyrell.spec as S
+    from tyrell.enumerator import SmtEnumerator
+    from tyrell.decider import Example, ExampleConstraintPruningDecider
+    from tyrell.synthesizer import Synthesizer
+
+    record = {'task': args.task_name, 'num_inputs': len(args.task_inputs)}
+    try:
+        if args.backend == 'pandas':
+            from morpheus_pandas import PandasMorpheusInterpreter, read_table, eq_pandas
+            interpreter = PandasMorpheusInterpreter()
+            input0 = read_table(args.task_inputs[0])
+            # Like the R backend, the other tables are measured against the first input
+            example = Example(input=[input0] + [read_table(x, origin=input0) for x in args.task_inputs[1:]],
+                              output=read_table(args.task_output, origin=input0))
+            equal_output = eq_pandas
+        else:
+            from morpheus_enumerator import MorpheusInterpreter, init_tbl, eq_r
+            for i, csv_loc in enumerate(args.task_inputs):
+                init_tbl('input{}'.format(i), csv_loc)
+            init_tbl('output', args.task_output)
+            interpreter = MorpheusInterpreter()
+            example = Example(input=['input{}'.format(i) for i in range(len(args.task_inputs))],
+                              output='output')
+            equal_output = eq_r
+        spec = S.parse_file(args.spec)
+        enumerator = SmtEnumerator(
+            spec, depth=args.max_loc + 1, loc=1, max_loc=args.max_loc)
+        synthesizer = Synthesizer(
+            enumerator=enumerator,
+            decider=ExampleConstraintPruningDecider(
+                spec=spec,
+                interpreter=interpreter,
+                examples=[example],
+                equal_output=equal_output
+            )
+        )
+        start = time.perf_counter()
+        prog = synthesizer.synthesize()
+        record['wall_time'] = time.perf_counter() - start
+        record['status'] = 'solved' if prog is not None else 'unsolved'
+        record['program'] = str(prog) if prog is not None else ''
+        record['num_candidates'] = synthesizer.num_attempts
+        record['num_solver_calls'] = enumerator.num_solver_calls
+        record['decider_time'] = synthesizer.decider_time
+    except MemoryError:
+        record['status'] = 'memout'
+    print(json.dumps(record))
+
+
+def limit_memory(max_memory_mb):
+    def set_limit():
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    return set_limit
+
+
+def spawn_task(args, task):
+    name, inputs, output = task
+    cmd = [sys.executable, os.path.abspath(__file__),
+           '--spec', args.spec, '--max-loc', str(args.max_loc), '--backend', args.backend,
+           '--task-name', name, '--task-output', output, '--task-inputs'] + inputs
+    record = {'task': name, 'num_inputs': len(inputs)}
+    start = time.perf_counter()
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True, timeout=args.timeout,
+                              preexec_fn=limit_memory(args.max_memory))
+    except subprocess.TimeoutExpired:
+        record['status'] = 'timeout'
+        record['wall_time'] = args.timeout
+        return record
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode == 0 and len(lines) > 0:
+        try:
+            record.update(json.loads(lines[-1]))
+            return record
+        except ValueError:
+            pass
+    # Running out of memory often kills R before python notices
+    record['status'] = 'error'
+    record['wall_time'] = time.perf_counter() - start
+    sys.stderr.write('{} failed with status {}:\n{}\n'.format(
+        name, proc.returncode, proc.stderr[-2000:]))
+    return record
+
+
+def write_csv(path, records):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow({k: record.get(k, '') for k in FIELDS})
+
+
+def compare(records, baseline, tolerance):
+    '''Print the differences with a baseline report and return whether the new run is not a regression'''
+    old = {x['task']: x for x in baseline['records']}
+    new = {x['task']: x for x in records}
+    ok = True
+    old_time, new_time = 0.0, 0.0
+    for task in sorted(set(old) & set(new), key=lambda x: int(x[1:])):
+        if 'unsupported' in (old[task]['status'], new[task]['status']):
+            continue
+        old_solved = old[task]['status'] == 'solved'
+        new_solved = new[task]['status'] == 'solved'
+        if old_solved and not new_solved:
+            print('REGRESSION {}: solved -> {}'.format(task, new[task]['status']))
+            ok = False
+        elif new_solved and not old_solved:
+            print('IMPROVEMENT {}: {} -> solved'.format(task, old[task]['status']))
+        elif old_solved and new_solved:
+            old_time += old[task]['wall_time']
+            new_time += new[task]['wall_time']
+    print('Time on tasks solved by both runs: {:.2f}s -> {:.2f}s'.format(old_time, new_time))
+    if old_time > 0 and new_time > old_time * (1 + tolerance):
+        print('REGRESSION: total time grew by more than {:.0%}'.format(tolerance))
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suite', type=str, default='benchmarks/pldi17')
+    parser.add_argument('--spec', type=str, default='example/morpheus.tyrell')
+    parser.add_argument('-l', '--max-loc', type=int, default=3)
+    parser.add_argument('-b', '--backend', choices=['r', 'pandas'], default='r',
+                        help='How the Morpheus programs are evaluated')
+    parser.add_argument('-t', '--timeout', type=float, default=300.0,
+                        help='Seconds allowed for each task')
+    parser.add_argument('-m', '--max-memory', type=int, default=4096,
+                        help='Address space limit of each task in MB')
+    parser.add_argument('-k', '--task', type=str, action='append',
+                        help='Only run the given tasks (e.g. p1). Can be repeated')
+    parser.add_argument('--json', type=str, help='Write the report as JSON')
+    parser.add_argument('--csv', type=str, help='Write the report as CSV')
+    parser.add_argument('--baseline', type=str,
+                        help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='Allowed relative growth of the total time when comparing against a baseline')
+    # Internal arguments, used by the task processes
+    parser.add_argument('--task-name', type=str, help=argparse.SUPPRESS)
+    parser.add_argument('--task-inputs', type=str, nargs='+', help=argparse.SUPPRESS)
+    parser.add_argument('--task-output', type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.task_name is not None:
+        run_task(args)
+        return
+
+    import tyrell.spec as S
+    num_params = S.parse_file(args.spec).num_input()
+    tasks = discover_tasks(args.suite)
+    if args.task is not None:
+        tasks = [x for x in tasks if x[0] in args.task]
+    records = []
+    for task in tasks:
+        name, inputs, _ = task
+        if len(inputs) != num_params:
+            # The synthesized programs could not read all the input tables
+            record = {'task': name, 'num_inputs': len(inputs), 'status': 'unsupported'}
+        else:
+            record = spawn_task(args, task)
+        print('{:<6}{:<10}{:>10.2f}s  {}'.format(
+            record['task'], record['status'], record.get('wall_time', 0.0), record.get('program', '')), flush=True)
+        records.append(record)
+
+    num_solved = sum(1 for x in records if x['status'] == 'solved')
+    num_unsupported = sum(1 for x in records if x['status'] == 'unsupported')
+    print('Solved {}/{} tasks ({} unsupported)'.format(
+        num_solved, len(records) - num_unsupported, num_unsupported))
+    report = {
+        'settings': {'spec': args.spec, 'max_loc': args.max_loc, 'backend': args.backend, 'timeout': args.timeout,
+                     'max_memory': args.max_memory},
+        'records': records,
+    }
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.csv is not None:
+        write_csv(args.csv, records)
+    if args.baseline is not None:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if not compare(records, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
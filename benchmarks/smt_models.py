@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+'''
+Measure how many models per second the SMT enumerator produces on a spec, for each production encoding and MaxSAT engine.
+The MaxSAT engine only matters when the spec has soft predicates, i.e. predicates with a weight below 100.
+Every model is blocked right after it is produced, as the synthesizer does when a program is rejected without blame.
+
+    $ python benchmarks/smt_models.py example/deepcoder.tyrell --depth 5 --loc 5 -n 50
+
+The predicates of the shipped specs are all hard. Pass `--soft WEIGHT` to turn them into soft predicates of the given weight, which exercises the optimizer:
+
+    $ python benchmarks/smt_models.py example/deepcoder.tyrell --depth 4 --loc 3 -n 50 --soft 3
+'''
+
+import argparse
+import re
+import time
+import tyrell.spec as S
+from tyrell.enumerator import SmtEnumerator
+
+
+def run(spec, args, **kwargs):
+    start = time.perf_counter()
+    enumerator = SmtEnumerator(spec, depth=args.depth, loc=args.loc, **kwargs)
+    build_time = time.perf_counter() - start
+
+    num_models = 0
+    start = time.perf_counter()
+    while num_models < args.num_models:
+        prog = enumerator.next()
+        if prog is None:
+            break
+        num_models += 1
+        enumerator.update()
+        if time.perf_counter() - start > args.timeout:
+            break
+    enum_time = time.perf_counter() - start
+    return build_time, num_models, enum_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec', type=str, nargs='?', default='example/morpheus.tyrell')
+    parser.add_argument('-d', '--depth', type=int, default=4)
+    parser.add_argument('-l', '--loc', type=int, default=3)
+    parser.add_argument('-n', '--num-models', type=int, default=100)
+    parser.add_argument('-t', '--timeout', type=float, default=60.0,
+                        help='Stop enumerating after this many seconds')
+    parser.add_argument('-e', '--encoding', type=str, action='append',
+                        help='Encodings to measure (default: all of them)')
+    parser.add_argument('-m', '--maxsat', type=str, action='append',
+                        help='MaxSAT engines to measure (default: all of them)')
+    parser.add_argument('-s', '--soft', type=int,
+                        help='Replace the weight of hard predicates (100) with this weight')
+    args = parser.parse_args()
+
+    with open(args.spec, 'r') as f:
+        spec_str = f.read()
+    if args.soft is not None:
+        spec_str = re.sub(r'(predicate\s+\w+\(.*),\s*100\s*\)',
+                          r'\1, {})'.format(args.soft), spec_str)
+    spec = S.parse(spec_str)
+    encodings = args.encoding or ['int', 'onehot', 'bitvec']
+    engines = args.maxsat or ['lsu', 'core', 'z3']
+    print('spec={} depth={} loc={} soft={}'.format(
+        args.spec, args.depth, args.loc, args.soft))
+    print('{:<10}{:<8}{:>12}{:>10}{:>12}{:>12}'.format(
+        'encoding', 'maxsat', 'build (s)', 'models', 'enum (s)', 'models/s'))
+    for encoding in encodings:
+        for maxsat in engines:
+            build_time, num_models, enum_time = run(
+                spec, args, encoding=encoding, maxsat=maxsat)
+            print('{:<10}{:<8}{:>12.3f}{:>10}{:>12.3f}{:>12.1f}'.format(
+                encoding, maxsat, build_time, num_models, enum_time, num_models / enum_time if enum_time > 0 else 0.0))
+
+
+if __name__ == '__main__':
+    main()
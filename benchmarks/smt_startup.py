@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+'''
+Measure how long it takes to build the SMT encoding of a spec, and how many clauses each phase produces.
+
+    $ python benchmarks/smt_startup.py example/morpheus.tyrell --depth 4 --loc 3
+'''
+
+import argparse
+import time
+from functools import wraps
+import tyrell.spec as S
+from tyrell.enumerator import SmtEnumerator
+
+PHASES = [
+    'createVariables',
+    'createOutputConstraints',
+    'createLocConstraints',
+    'createInputConstraints',
+    'createFunctionConstraints',
+    'createLeafConstraints',
+    'createChildrenConstraints',
+]
+
+
+def instrument(stats):
+    '''Wrap every encoding phase of SmtEnumerator so that it reports its running time and clause count'''
+    originals = {}
+    for name in PHASES:
+        method = getattr(SmtEnumerator, name)
+        originals[name] = method
+
+        def make_wrapper(name, method):
+            @wraps(method)
+            def wrapper(self, solver, *args, **kwargs):
+                num_clauses = len(solver.assertions())
+                start = time.perf_counter()
+                ret = method(self, solver, *args, **kwargs)
+                elapsed = time.perf_counter() - start
+                stats.append((name, len(solver.assertions()) - num_clauses, elapsed))
+                return ret
+            return wrapper
+        setattr(SmtEnumerator, name, make_wrapper(name, method))
+    return originals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec', type=str, nargs='?', default='example/morpheus.tyrell')
+    parser.add_argument('-d', '--depth', type=int, default=4)
+    parser.add_argument('-l', '--loc', type=int, default=3)
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    spec = S.parse_file(args.spec)
+    best = None
+    for _ in range(args.repeat):
+        stats = []
+        originals = instrument(stats)
+        start = time.perf_counter()
+        enumerator = SmtEnumerator(spec, depth=args.depth, loc=args.loc)
+        total = time.perf_counter() - start
+        for name, method in originals.items():
+            setattr(SmtEnumerator, name, method)
+        if best is None or total < best[0]:
+            best = (total, stats, len(enumerator.z3_solver.assertions()))
+
+    total, stats, num_clauses = best
+    print('spec={} depth={} loc={} productions={} nodes={}'.format(
+        args.spec, args.depth, args.loc, spec.num_productions(), len(enumerator.nodes)))
+    print('{:<28}{:>10}{:>12}'.format('phase', 'clauses', 'time (s)'))
+    for name, clauses, elapsed in stats:
+        print('{:<28}{:>10}{:>12.4f}'.format(name, clauses, elapsed))
+    print('{:<28}{:>10}{:>12.4f}'.format('total', num_clauses, total))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+'''
+Measure `parse_file` with and without a compiled-spec cache, each in a fresh process like a benchmark task would.
+The time of a process includes importing tyrell.spec, which loads the parser module whether or not the spec is parsed.
+
+    $ PYTHONPATH=. python benchmarks/spec_cache.py example/morpheus.tyrell -r 10
+'''
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+CHILD = '''
+import sys, time
+start = time.perf_counter()
+import tyrell.spec as S
+from tyrell.cache import DiskCache
+imported = time.perf_counter()
+S.parse_file(sys.argv[1], cache=DiskCache(sys.argv[2]) if len(sys.argv) > 2 else None)
+print(imported - start, time.perf_counter() - imported)
+'''
+
+
+def run(args):
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    out = subprocess.check_output([sys.executable, '-c', CHILD] + args, env=env, universal_newlines=True)
+    return [float(x) for x in out.split()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('spec', type=str, nargs='?', default='example/morpheus.tyrell')
+    parser.add_argument('-r', '--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        run([args.spec, cache_dir])
+        for name, extra in [('no cache', []), ('cache hit', [cache_dir])]:
+            times = [run([args.spec] + extra) for _ in range(args.repeat)]
+            import_time = sum(x[0] for x in times) / len(times)
+            parse_time = sum(x[1] for x in times) / len(times)
+            print('{:<10}  import {:.4f}s  parse_file {:.4f}s'.format(name, import_time, parse_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+'''
+Micro-benchmark of the method dispatch of GenericVisitor, on `eval_expr` and on the encoding of constraints with `ConstraintEncoder`.
+Each workload is timed with the per-class dispatch table and with the former dispatch, which converted the node's class name to snake case and called `getattr` on every visit.
+
+    $ PYTHONPATH=. python benchmarks/visitor_dispatch.py -n 2000
+'''
+
+import argparse
+import time
+import z3
+import tyrell.spec as S
+from tyrell.visitor import GenericVisitor
+from tyrell.spec.expr import ExprType
+from tyrell.interpreter import PostOrderInterpreter
+from tyrell.decider.eval_expr import eval_expr
+from tyrell.decider.constraint_encoder import ConstraintEncoder
+
+spec_str = r'''
+    value IntExpr {
+        bprop: bool;
+        iprop: int;
+    }
+
+    program Foo(IntExpr, IntExpr) -> IntExpr;
+    func foo: IntExpr r -> IntExpr a, IntExpr b {
+        bprop(a) ==> bprop(r);
+        !bprop(a) || (bprop(b) && iprop(r) == iprop(a) + iprop(b));
+        iprop(a) * iprop(b) - iprop(r) % 3 >= 1 - iprop(a);
+        1 == (if bprop(r) then iprop(a) else iprop(b));
+        iprop(r) <= iprop(a) * 2 + iprop(b) * 3 + 4;
+    }
+'''
+
+
+class FooInterpreter(PostOrderInterpreter):
+    def apply_bprop(self, arg):
+        return arg % 2 == 0
+
+    def apply_iprop(self, arg):
+        return arg
+
+
+def legacy_visit(self, node):
+    method_name = self._visit_method_name(node)
+    visitor = getattr(self, method_name, self.generic_visit)
+    return visitor(node)
+
+
+def run_eval_expr(constraints, n):
+    interp = FooInterpreter()
+    for i in range(n):
+        for expr in constraints:
+            eval_expr(interp, [i, i + 1], 2 * i + 1, expr)
+
+
+def run_encode(constraints, n):
+    def encode_property(prop_expr):
+        name = '{}_{}'.format(prop_expr.name, prop_expr.operand.index)
+        if prop_expr.type == ExprType.BOOL:
+            return z3.Bool(name)
+        return z3.Int(name)
+    for _ in range(n):
+        encoder = ConstraintEncoder(encode_property)
+        for expr in constraints:
+            encoder.visit(expr)
+
+
+def measure(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    spec = S.parse(spec_str)
+    constraints = spec.get_function_production_or_raise('foo').constraints
+    table_visit = GenericVisitor.visit
+    for name, fn, n in [('eval_expr', run_eval_expr, args.repeat),
+                        ('encode', run_encode, args.repeat // 10)]:
+        GenericVisitor.visit = legacy_visit
+        legacy_time = measure(fn, constraints, n)
+        GenericVisitor.visit = table_visit
+        table_time = measure(fn, constraints, n)
+        print('{:<10} getattr {:>8.3f}s  table {:>8.3f}s  speedup {:.2f}'.format(
+            name, legacy_time, table_time, legacy_time / table_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,646 @@
+#!/usr/bin/env python
+'''
+An in-process backend for the Morpheus DSL, built on pandas.
+
+`PandasMorpheusInterpreter` has the same `eval_*`/`apply_*` methods as `MorpheusInterpreter` in morpheus_enumerator.py, but tables are `Table` objects instead of the names of global R variables, so no R round-trip is needed to evaluate a program or compute its properties.
+Each operation follows what the dplyr/tidyr call of the R backend does, including its quirks: see the docstrings of the `eval_*` methods.
+Values are compared as R would after `as.character()`, which `r_character()` reproduces. Character values are sorted and compared by code point, whereas R uses the collation of its locale.
+
+    $ python morpheus_pandas.py -i0 benchmarks/pldi17/p1_input1.csv -o benchmarks/pldi17/p1_output1.csv -l 3
+'''
+
+import argparse
+import math
+import operator
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+import pandas as pd
+import tyrell.spec as S
+from tyrell.interpreter import PostOrderInterpreter, GeneralError
+from tyrell.enumerator import SmtEnumerator
+from tyrell.decider import Example, ExampleConstraintPruningDecider
+from tyrell.synthesizer import Synthesizer
+from tyrell.logger import get_logger
+
+logger = get_logger('tyrell')
+
+# Default separator of tidyr::separate()
+_SEPARATOR = re.compile(r'[\W_]+')
+# What R's type.convert() accepts as a double
+_DOUBLE = re.compile(r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$')
+_SPECIAL_DOUBLES = {'Inf': math.inf, '+Inf': math.inf, '-Inf': -math.inf, 'NaN': math.nan}
+_LOGICALS = {'T': True, 'TRUE': True, 'true': True, 'True': True,
+             'F': False, 'FALSE': False, 'false': False, 'False': False}
+_NUM_OPS = {'/': operator.truediv, '*': operator.mul, '+': operator.add, '-': operator.sub}
+_BOOL_OPS = {'==': operator.eq, '!=': operator.ne, '>': operator.gt, '<': operator.lt,
+             '>=': operator.ge, '<=': operator.le}
+
+
+def is_na(x: Any) -> bool:
+    return x is None or x is pd.NA or (isinstance(x, float) and math.isnan(x))
+
+
+def r_number(x: float) -> str:
+    '''
+    Format a double like R's `as.character()`: 15 significant digits without trailing zeros, in fixed or scientific notation, whichever is shorter.
+    NaN is formatted as "NA", since pandas does not tell NaN and NA apart.
+    '''
+    if math.isnan(x):
+        return 'NA'
+    if math.isinf(x):
+        return 'Inf' if x > 0 else '-Inf'
+    if x == 0:
+        return '0'
+    mantissa, exponent = '{:.14e}'.format(x).split('e')
+    num_digits = max(len(mantissa.lstrip('-').replace('.', '').rstrip('0')), 1)
+    scientific = '{:.{}e}'.format(x, num_digits - 1)
+    fixed = '{:.{}f}'.format(x, max(num_digits - 1 - int(exponent), 0))
+    return fixed if len(fixed) <= len(scientific) else scientific
+
+
+def column_class(column: pd.Series) -> str:
+    '''Return what R's `class()` would be for the column'''
+    if pd.api.types.is_bool_dtype(column.dtype):
+        return 'logical'
+    elif pd.api.types.is_integer_dtype(column.dtype):
+        return 'integer'
+    elif pd.api.types.is_float_dtype(column.dtype):
+        return 'numeric'
+    else:
+        return 'character'
+
+
+def r_character(column: pd.Series) -> List[Optional[str]]:
+    '''Return the values of `as.character(column)` in R, with None for NA'''
+    cls = column_class(column)
+    ret = []  # type: List[Optional[str]]
+    for x in column.tolist():
+        if is_na(x):
+            ret.append(None)
+        elif cls == 'logical':
+            ret.append('TRUE' if x else 'FALSE')
+        elif cls == 'integer':
+            ret.append(str(int(x)))
+        elif cls == 'numeric':
+            ret.append(r_number(float(x)))
+        else:
+            ret.append(x)
+    return ret
+
+
+def _element_str(x: Any, cls: str) -> str:
+    # What str() gives for an element of an R vector iterated through rpy2
+    if cls == 'numeric':
+        return str(float(x))
+    if is_na(x):
+        return 'NA'
+    return str(x)
+
+
+def _parse_double(x: str) -> Optional[float]:
+    if _DOUBLE.match(x) is not None:
+        return float(x)
+    return _SPECIAL_DOUBLES.get(x)
+
+
+def _convert_column(values: List[str]) -> pd.Series:
+    # Guess the type of a column like R's type.convert(), with "NA" as the only NA string. Blank fields are NA unless the column is character.
+    stripped = [x.strip() for x in values]
+    present = [x for x in stripped if x != 'NA' and x != '']
+    if all(x in _LOGICALS for x in present):
+        return pd.Series([_LOGICALS.get(x) for x in stripped], dtype='boolean')
+    if all(_parse_double(x) is not None for x in present):
+        # Integer columns are turned to doubles by the R backend too
+        return pd.Series([math.nan if x == 'NA' or x == '' else _parse_double(x) for x in stripped],
+                         dtype='float64')
+    return pd.Series([None if x == 'NA' else x for x in values], dtype=object)
+
+
+def _make_column(values: List[Any], cls: str) -> pd.Series:
+    # None stands for NA
+    if cls == 'logical':
+        return pd.Series([None if is_na(x) else x for x in values], dtype='boolean')
+    elif cls == 'numeric' or cls == 'integer':
+        return pd.Series([math.nan if is_na(x) else x for x in values], dtype='float64')
+    else:
+        return pd.Series([None if is_na(x) else x for x in values], dtype=object)
+
+
+def _make_frame(names: Sequence[str], columns: Sequence[pd.Series], num_rows: int) -> pd.DataFrame:
+    # Column names may be duplicated, as in R, hence columns are always addressed by position
+    if len(columns) == 0:
+        return pd.DataFrame(index=range(num_rows))
+    frame = pd.DataFrame({i: x.reset_index(drop=True) for i, x in enumerate(columns)})
+    frame.columns = list(names)
+    return frame
+
+
+def _sort_key(x: Any) -> Tuple[bool, Any]:
+    # NAs come last, like in R's sort(na.last = TRUE)
+    return (True, 0) if is_na(x) else (False, x)
+
+
+def _key_value(x: Any) -> Any:
+    # NA matches NA when joining or grouping
+    return None if is_na(x) else x
+
+
+class Table:
+    '''
+    A table of the Morpheus DSL: a data frame, the columns it is grouped by (see `PandasMorpheusInterpreter.eval_group_by`), and the input table it was computed from.
+    A table is never modified once it has been created, so that the values of programs can be cached and shared.
+    '''
+    __slots__ = ('_frame', '_groups', '_origin', '_content')
+
+    _frame: pd.DataFrame
+    _groups: Tuple[str, ...]
+    _origin: 'Table'
+    _content: Optional[Set[str]]
+
+    def __init__(self, frame: pd.DataFrame, groups: Sequence[str] = (), origin: Optional['Table'] = None):
+        self._frame = frame
+        names = set(frame.columns)
+        # Like dplyr, forget the grouping columns that are gone
+        self._groups = tuple([x for x in groups if x in names])
+        self._origin = origin if origin is not None else self
+        self._content = None
+
+    def derive(self, frame: pd.DataFrame, groups: Optional[Sequence[str]] = None) -> 'Table':
+        '''Return a table computed from this one, which keeps its groups unless `groups` is given'''
+        return Table(frame, self._groups if groups is None else groups, self._origin)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        return self._frame
+
+    @property
+    def groups(self) -> Tuple[str, ...]:
+        return self._groups
+
+    @property
+    def origin(self) -> 'Table':
+        '''The input table this table was computed from. It plays the role of the `input0` R variable.'''
+        return self._origin
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._frame.columns)
+
+    @property
+    def num_rows(self) -> int:
+        return len(self._frame.index)
+
+    @property
+    def num_cols(self) -> int:
+        return len(self._frame.columns)
+
+    def column(self, index: int) -> pd.Series:
+        '''Return the column at the 1-based position `index`, as in R'''
+        return self._frame.iloc[:, index - 1]
+
+    def column_class(self, index: int) -> Optional[str]:
+        '''Return the class of the column at the 1-based position `index`, or None if there is no such column, as R gives NA'''
+        if not 1 <= index <= self.num_cols:
+            return None
+        return column_class(self.column(index))
+
+    def head(self) -> Set[str]:
+        return set(self._frame.columns)
+
+    def content(self) -> Set[str]:
+        '''Return the values of the table as strings, the way `get_content()` of the R backend sees them'''
+        if self._content is None:
+            content = set()
+            for i in range(self.num_cols):
+                column = self._frame.iloc[:, i]
+                cls = column_class(column)
+                content.update(_element_str(x, cls) for x in column.tolist())
+            self._content = content
+        return self._content
+
+    def cells(self) -> Counter:
+        '''Return the multiset of the values of the table after `as.character()`'''
+        ret = Counter()  # type: Counter
+        for i in range(self.num_cols):
+            ret.update(r_character(self._frame.iloc[:, i]))
+        return ret
+
+    def __repr__(self) -> str:
+        return 'Table(rows={}, cols={}, groups={})'.format(
+            self.num_rows, self.num_cols, list(self._groups))
+
+
+def read_table(csv_loc: str, origin: Optional[Table] = None) -> Table:
+    '''
+    Load a table like `init_tbl()` of the R backend: `read.csv()`, with factors turned into characters and integers into doubles.
+    The `head` and `content` properties of the table are measured against `origin`, which defaults to the table itself. The R backend measures every table against `input0`, so the other inputs and the expected output of an example must be loaded with the first input as their origin.
+    '''
+    raw = pd.read_csv(csv_loc, dtype=str, keep_default_na=False, na_filter=False)
+    columns = [_convert_column(raw.iloc[:, i].tolist()) for i in range(len(raw.columns))]
+    return Table(_make_frame(list(raw.columns), columns, len(raw.index)), origin=origin)
+
+
+def eq_pandas(actual: Table, expect: Table) -> bool:
+    '''Like `eq_r()`: the tables have the same shape and the same values as strings, regardless of their order'''
+    if actual.num_rows != expect.num_rows or actual.num_cols != expect.num_cols:
+        return False
+    return actual.cells() == expect.cells()
+
+
+def get_collist(sel: Sequence[str]) -> str:
+    return 'c(' + ','.join(sel) + ')'
+
+
+class PandasMorpheusInterpreter(PostOrderInterpreter):
+    '''
+    The interpreter of the Morpheus DSL on `Table`s.
+    Columns are referred to by their 1-based position, as in the R backend. Fresh column names are numbered per interpreter.
+    '''
+    _counter: int
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._counter = 1
+
+    def get_fresh_col(self) -> str:
+        self._counter += 1
+        return 'COL' + str(self._counter)
+
+    ## Concrete interpreter
+    def eval_ColInt(self, v):
+        return int(v)
+
+    def eval_ColList(self, v):
+        return v
+
+    def eval_const(self, node, args):
+        return args[0]
+
+    def eval_select(self, node, args):
+        '''Like dplyr, the grouping columns are kept in front of the selected ones'''
+        table = args[0]
+        n_cols = table.num_cols
+        self.assertArg(node, args,
+                index=1,
+                cond=lambda x: max(list(map(lambda y: int(y), x))) <= n_cols,
+                capture_indices=[0])
+
+        names = table.names
+        positions = [int(x) - 1 for x in args[1]]
+        selected = set([names[x] for x in positions])
+        missing = [names.index(x) for x in table.groups if x not in selected]
+        return table.derive(table.frame.iloc[:, missing + positions].reset_index(drop=True))
+
+    def eval_unite(self, node, args):
+        '''The united column replaces the first of the two columns, and joins their values with "_"'''
+        table = args[0]
+        n_cols = table.num_cols
+        first_idx = int(args[1])
+        self.assertArg(node, args,
+                index=1,
+                cond=lambda x: x <= n_cols,
+                capture_indices=[0])
+        self.assertArg(node, args,
+                index=2,
+                cond=lambda x: x <= n_cols and x != first_idx,
+                capture_indices=[0, 1])
+
+        values = ['{}_{}'.format('NA' if x is None else x, 'NA' if y is None else y)
+                  for x, y in zip(r_character(table.column(args[1])), r_character(table.column(args[2])))]
+        united = pd.Series(values, dtype=object)
+        removed = (args[1] - 1, args[2] - 1)
+        names, columns = [], []
+        for i, name in enumerate(table.names):
+            if i == min(removed):
+                names.append(self.get_fresh_col())
+                columns.append(united)
+            if i not in removed:
+                names.append(name)
+                columns.append(table.frame.iloc[:, i])
+        return table.derive(_make_frame(names, columns, table.num_rows))
+
+    def eval_filter(self, node, args):
+        '''
+        Rows are compared against the constant as a number, or as a string if the column holds characters. Rows where the comparison is NA are dropped.
+        '''
+        table = args[0]
+        n_cols = table.num_cols
+        self.assertArg(node, args,
+                index=2,
+                cond=lambda x: x <= n_cols,
+                capture_indices=[0])
+        self.assertArg(node, args,
+                index=2,
+                cond=lambda x: table.column_class(x) != 'factor',
+                capture_indices=[0])
+
+        op = _BOOL_OPS.get(args[1])
+        if op is None:
+            logger.error('Error in interpreting filter...')
+            raise GeneralError()
+        column = table.column(args[2])
+        if column_class(column) == 'character':
+            const = r_number(float(args[3]))  # type: Any
+        else:
+            const = float(args[3])
+        keep = [i for i, x in enumerate(column.tolist()) if not is_na(x) and op(x, const)]
+        return table.derive(table.frame.iloc[keep].reset_index(drop=True))
+
+    def eval_separate(self, node, args):
+        '''The column is split on non-alphanumeric characters into two character columns. Extra pieces are dropped and missing ones are NA.'''
+        table = args[0]
+        n_cols = table.num_cols
+        self.assertArg(node, args,
+                index=1,
+                cond=lambda x: x <= n_cols,
+                capture_indices=[0])
+
+        firsts, seconds = [], []
+        for x in r_character(table.column(args[1])):
+            pieces = [None, None] if x is None else _SEPARATOR.split(x)[:2]
+            pieces += [None] * (2 - len(pieces))
+            firsts.append(pieces[0])
+            seconds.append(pieces[1])
+        names, columns = [], []
+        for i, name in enumerate(table.names):
+            if i == args[1] - 1:
+                names.extend([self.get_fresh_col(), self.get_fresh_col()])
+                columns.extend([pd.Series(firsts, dtype=object), pd.Series(seconds, dtype=object)])
+            else:
+                names.append(name)
+                columns.append(table.frame.iloc[:, i])
+        return table.derive(_make_frame(names, columns, table.num_rows))
+
+    def eval_spread(self, node, args):
+        '''
+        There is one row per combination of the other columns and one column per value of the key, both in sorted order. Missing cells are NA.
+        Two rows with the same key and the same other columns are an error.
+        '''
+        table = args[0]
+        n_cols = table.num_cols
+        first_idx = int(args[1])
+        self.assertArg(node, args,
+                index=1,
+                cond=lambda x: x <= n_cols,
+                capture_indices=[0])
+        self.assertArg(node, args,
+                index=2,
+                cond=lambda x: x <= n_cols and x > first_idx,
+                capture_indices=[0, 1])
+
+        key_col, value_col = table.column(args[1]), table.column(args[2])
+        id_positions = [i for i in range(n_cols) if i not in (args[1] - 1, args[2] - 1)]
+        keys = [_key_value(x) for x in key_col.tolist()]
+        levels = sorted(set(keys), key=_sort_key)
+        level_ids = {x: i for i, x in enumerate(levels)}
+        rows = list(zip(*[[_key_value(x) for x in table.frame.iloc[:, i].tolist()]
+                          for i in id_positions])) if len(id_positions) > 0 else [()] * table.num_rows
+        row_levels = sorted(set(rows), key=lambda row: [_sort_key(x) for x in row])
+        row_ids = {x: i for i, x in enumerate(row_levels)}
+        if table.num_rows == 0:
+            row_levels = [] if len(id_positions) > 0 else [()]
+
+        cells = dict()  # type: Dict[Tuple[int, int], int]
+        for i, (row, key) in enumerate(zip(rows, keys)):
+            cell = (row_ids[row], level_ids[key])
+            if cell in cells:
+                logger.error('Error in interpreting spread...')
+                raise GeneralError('Duplicate identifiers for rows {} and {}'.format(cells[cell] + 1, i + 1))
+            cells[cell] = i
+
+        first_rows = dict()  # type: Dict[int, int]
+        for i, row in enumerate(rows):
+            first_rows.setdefault(row_ids[row], i)
+        names = [table.names[i] for i in id_positions]
+        columns = [table.frame.iloc[[first_rows[x] for x in range(len(row_levels))], i] for i in id_positions]
+        key_names = r_character(pd.Series(levels, dtype=key_col.dtype)) if len(levels) > 0 else []
+        values = value_col.tolist()
+        for j, key_name in enumerate(key_names):
+            names.append('<NA>' if key_name is None else key_name)
+            column = [None] * len(row_levels)  # type: List[Any]
+            for x in range(len(row_levels)):
+                pos = cells.get((x, j))
+                if pos is not None:
+                    column[x] = values[pos]
+            columns.append(_make_column(column, column_class(value_col)))
+        return table.derive(_make_frame(names, columns, len(row_levels)))
+
+    def eval_gather(self, node, args):
+        '''
+        The selected columns are stacked, in the given order, into a KEY column of their names and a VALUE column of their values.
+        VALUE holds characters if the selected columns do not have the same type.
+        '''
+        table = args[0]
+        n_cols = table.num_cols
+        self.assertArg(node, args,
+                index=1,
+                cond=lambda x: max(list(map(lambda y: int(y), x))) <= n_cols,
+                capture_indices=[0])
+
+        positions = [int(x) - 1 for x in args[1]]
+        id_positions = [i for i in range(n_cols) if i not in positions]
+        gathered = [table.frame.iloc[:, i] for i in positions]
+        classes = set([column_class(x) for x in gathered])
+        num_rows = table.num_rows
+        if len(classes) == 1:
+            value = pd.concat(gathered, ignore_index=True)
+        elif 'character' in classes:
+            value = pd.Series([x for column in gathered for x in r_character(column)], dtype=object)
+        else:
+            # Logical and numeric columns give a numeric column
+            value = pd.Series([math.nan if is_na(x) else float(x)
+                               for column in gathered for x in column.tolist()], dtype='float64')
+        key = pd.Series([table.names[i] for i in positions for _ in range(num_rows)], dtype=object)
+        names = [table.names[i] for i in id_positions] + ['KEY', 'VALUE']
+        columns = [pd.concat([table.frame.iloc[:, i]] * len(positions), ignore_index=True)
+                   for i in id_positions] + [key, value]
+        return table.derive(_make_frame(names, columns, num_rows * len(positions)))
+
+    def eval_group_by(self, node, args):
+        '''
+        Like the R backend, which passes `c(...)` to `group_by()` as an expression: this adds a constant column named after that expression, and groups the table by it.
+        '''
+        table = args[0]
+        n_cols = table.num_cols
+        self.assertArg(node, args,
+                index=1,
+                cond=lambda x: max(list(map(lambda y: int(y), x))) <= n_cols,
+                capture_indices=[0])
+        self.assertArg(node, args,
+                index=1,
+                       cond=lambda x: len(x) == 1,
+                capture_indices=[0])
+
+        name = get_collist(args[1])
+        value = pd.Series([float(args[1][0])] * table.num_rows, dtype='float64')
+        names = table.names
+        columns = [table.frame.iloc[:, i] for i in range(n_cols)]
+        if name in names:
+            columns[names.index(name)] = value
+        else:
+            names.append(name)
+            columns.append(value)
+        return table.derive(_make_frame(names, columns, table.num_rows), groups=[name])
+
+    def eval_summarise(self, node, args):
+        '''
+        The aggregate is computed over the whole column, as `.[[col]]` refers to the whole table in the R backend, and repeated for each group. The last grouping column is dropped.
+        '''
+        table = args[0]
+        n_cols = table.num_cols
+        self.assertArg(node, args,
+                index=2,
+                cond=lambda x: x <= n_cols,
+                capture_indices=[0])
+        self.assertArg(node, args,
+                index=2,
+                cond=lambda x: table.column_class(x) == 'integer' or table.column_class(x) == 'numeric',
+                capture_indices=[0])
+
+        values = [float(x) for x in table.column(args[2]).tolist()]
+        if any(math.isnan(x) for x in values):
+            result = math.nan
+        elif args[1] == 'min':
+            result = min(values, default=math.inf)
+        elif args[1] == 'max':
+            result = max(values, default=-math.inf)
+        elif args[1] == 'sum':
+            result = math.fsum(values)
+        else:
+            logger.error('Error in interpreting summarise...')
+            raise GeneralError()
+
+        names = table.names
+        group_positions = [names.index(x) for x in table.groups]
+        groups = list(zip(*[[_key_value(x) for x in table.frame.iloc[:, i].tolist()]
+                            for i in group_positions])) if len(group_positions) > 0 else [()]
+        first_rows = dict()  # type: Dict[Tuple[Any, ...], int]
+        for i, group in enumerate(groups):
+            first_rows.setdefault(group, i)
+        group_rows = [first_rows[x] for x in sorted(first_rows, key=lambda g: [_sort_key(x) for x in g])]
+        columns = [table.frame.iloc[group_rows, i] for i in group_positions] + \
+            [pd.Series([result] * len(group_rows), dtype='float64')]
+        frame = _make_frame(list(table.groups) + [self.get_fresh_col()], columns, len(group_rows))
+        return table.derive(frame, groups=table.groups[:-1])
+
+    def eval_mutate(self, node, args):
+        table = args[0]
+        n_cols = table.num_cols
+        self.assertArg(node, args,
+                index=2,
+                cond=lambda x: x <= n_cols,
+                capture_indices=[0])
+        self.assertArg(node, args,
+                index=3,
+                cond=lambda x: x <= n_cols,
+                capture_indices=[0])
+        self.assertArg(node, args,
+                index=2,
+                cond=lambda x: table.column_class(x) == 'numeric',
+                capture_indices=[0])
+        self.assertArg(node, args,
+                index=3,
+                cond=lambda x: table.column_class(x) == 'numeric',
+                capture_indices=[0])
+
+        op = _NUM_OPS.get(args[1])
+        if op is None:
+            logger.error('Error in interpreting mutate...')
+            raise GeneralError()
+        # Division by zero gives Inf or NaN, as in R
+        value = op(table.column(args[2]), table.column(args[3]))
+        columns = [table.frame.iloc[:, i] for i in range(n_cols)] + [value]
+        return table.derive(_make_frame(table.names + [self.get_fresh_col()], columns, table.num_rows))
+
+    def eval_inner_join(self, node, args):
+        '''Tables are joined on all the columns they have in common, and NA matches NA'''
+        left, right = args[0], args[1]
+        left_names, right_names = left.names, right.names
+        by = [x for x in left_names if x in right_names]
+        if len(by) == 0 or len(set(left_names)) != len(left_names) or len(set(right_names)) != len(right_names):
+            logger.error('Error in interpreting innerjoin...')
+            raise GeneralError()
+        left_by = [left_names.index(x) for x in by]
+        right_by = [right_names.index(x) for x in by]
+        if any(column_class(left.frame.iloc[:, i]) != column_class(right.frame.iloc[:, j])
+               for i, j in zip(left_by, right_by)):
+            logger.error('Error in interpreting innerjoin...')
+            raise GeneralError()
+
+        def keys(table, positions):
+            return list(zip(*[[_key_value(x) for x in table.frame.iloc[:, i].tolist()] for i in positions]))
+        right_rows = dict()  # type: Dict[Tuple[Any, ...], List[int]]
+        for i, key in enumerate(keys(right, right_by)):
+            right_rows.setdefault(key, []).append(i)
+        left_matches, right_matches = [], []
+        for i, key in enumerate(keys(left, left_by)):
+            for j in right_rows.get(key, []):
+                left_matches.append(i)
+                right_matches.append(j)
+        right_positions = [i for i in range(right.num_cols) if i not in right_by]
+        names = left_names + [right_names[i] for i in right_positions]
+        columns = [left.frame.iloc[left_matches, i] for i in range(left.num_cols)] + \
+            [right.frame.iloc[right_matches, i] for i in right_positions]
+        return left.derive(_make_frame(names, columns, len(left_matches)))
+
+    ## Abstract interpreter
+    def apply_row(self, val):
+        return val.num_rows
+
+    def apply_col(self, val):
+        return val.num_cols
+
+    def apply_head(self, val):
+        input_df = val.origin
+        return len(val.head() - input_df.head() - input_df.content())
+
+    def apply_content(self, val):
+        return len(val.content() - val.origin.content())
+
+
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-i0', '--input0', type=str)
+    parser.add_argument('-i1', '--input1', type=str)
+    parser.add_argument('-o', '--output', type=str)
+    parser.add_argument('-l', '--length', type=int)
+    args = parser.parse_args()
+    loc_val = args.length
+    depth_val = loc_val + 1
+
+    logger.info('Parsing Spec...')
+    spec = S.parse_file('example/morpheus.tyrell')
+    logger.info('Parsing succeeded')
+
+    # Input and Output must be in CSV format.
+    input_locs = [x for x in [args.input0, args.input1] if x is not None]
+    if len(input_locs) != spec.num_input():
+        parser.error('the spec takes {} input table(s), got {}'.format(spec.num_input(), len(input_locs)))
+    input0 = read_table(input_locs[0])
+    inputs = [input0] + [read_table(x, origin=input0) for x in input_locs[1:]]
+    output = read_table(args.output, origin=input0)
+
+    logger.info('Building synthesizer...')
+    synthesizer = Synthesizer(
+        enumerator=SmtEnumerator(spec, depth=depth_val, loc=loc_val),
+        decider=ExampleConstraintPruningDecider(
+            spec=spec,
+            interpreter=PandasMorpheusInterpreter(),
+            examples=[Example(input=inputs, output=output)],
+            equal_output=eq_pandas
+        )
+    )
+    logger.info('Synthesizing programs...')
+
+    prog = synthesizer.synthesize()
+    if prog is not None:
+        logger.info('Solution found: {}'.format(prog))
+    else:
+        logger.info('Solution not found!')
+
+
+if __name__ == '__main__':
+    logger.setLevel('DEBUG')
+    main()
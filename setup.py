@@ -9,6 +9,7 @@ install_dependencies = [
 develop_dependencies = [
     'mypy',  # for type checking
     'rpy2',  # for Morpheus. TODO: This should really belong to the client package
+    'pandas',  # for the in-process Morpheus backend. Same TODO as above
     'lark-parser',  # for parsing
     'sphinx',  # for documentation generation
 ]
@@ -0,0 +1,229 @@
+import os
+import re
+import tempfile
+import unittest
+from collections import Counter
+import tyrell.spec as S
+from tyrell.dsl import Builder
+from tyrell.enumerator import SmtEnumerator
+from tyrell.decider import Example, ExampleConstraintPruningDecider
+from tyrell.interpreter import InterpreterError, GeneralError, AssertionViolation
+
+try:
+    import morpheus_pandas as P
+except ImportError:
+    P = None
+try:
+    # This needs rpy2, R, and the compare, dplyr and tidyr R libraries
+    import morpheus_enumerator as R
+    import rpy2.robjects as robjects
+except Exception:
+    R = None
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+SUITE_DIR = os.path.join(ROOT_DIR, 'benchmarks', 'pldi17')
+SPEC_FILE = os.path.join(ROOT_DIR, 'example', 'morpheus.tyrell')
+FRESH_NAME = re.compile(r'^COL\d+$')
+
+
+def pldi17_tasks():
+    '''Return the (name, first input, output) of the pldi17 tasks with a single output'''
+    tasks = []
+    for name in sorted(os.listdir(SUITE_DIR)):
+        m = re.match(r'^p(\d+)_input1\.csv$', name)
+        output = os.path.join(SUITE_DIR, 'p{}_output1.csv'.format(m.group(1))) if m else None
+        if output is not None and os.path.exists(output):
+            tasks.append(('p' + m.group(1), os.path.join(SUITE_DIR, name), output))
+    return tasks
+
+
+@unittest.skipUnless(P is not None, 'pandas is not installed')
+class TestPandasMorpheus(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._spec = S.parse_file(SPEC_FILE)
+
+    def setUp(self):
+        self._builder = Builder(self._spec)
+        self._interp = P.PandasMorpheusInterpreter()
+        self._input = P.read_table(os.path.join(SUITE_DIR, 'p1_input1.csv'))
+
+    def eval(self, sexp):
+        prog = self._builder.from_sexp_string(sexp.replace('X', '(@param 0)'))
+        return self._interp.eval(prog, [self._input])
+
+    def rows(self, table):
+        columns = [P.r_character(table.frame.iloc[:, i]) for i in range(table.num_cols)]
+        return sorted(zip(*columns), key=lambda row: [str(x) for x in row])
+
+    def test_r_number(self):
+        cases = [(22.0, '22'), (-11.0, '-11'), (0.169122009770945, '0.169122009770945'),
+                 (0.1 + 0.2, '0.3'), (100000.0, '1e+05'), (123456.0, '123456'), (0.0001, '1e-04'),
+                 (1234.5, '1234.5'), (1.5e-07, '1.5e-07'), (-0.0, '0'), (float('inf'), 'Inf'),
+                 (float('-inf'), '-Inf'), (float('nan'), 'NA'), (1 / 3, '0.333333333333333')]
+        for x, expected in cases:
+            self.assertEqual(P.r_number(x), expected)
+
+    def test_read_table(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'table.csv')
+            with open(path, 'w') as f:
+                f.write('"a","b","c","d","e"\n1,"x",TRUE,NA,\n2.5,"NA",F,NA,\n,"",NA,NA,3\n')
+            table = P.read_table(path)
+        self.assertListEqual(table.names, ['a', 'b', 'c', 'd', 'e'])
+        self.assertListEqual([table.column_class(i) for i in range(1, 6)],
+                             ['numeric', 'character', 'logical', 'logical', 'numeric'])
+        # R gives NA for a column that does not exist, so type checks on it fail instead of raising
+        self.assertIsNone(table.column_class(6))
+        self.assertListEqual(P.r_character(table.column(1)), ['1', '2.5', None])
+        self.assertListEqual(P.r_character(table.column(2)), ['x', None, ''])
+        self.assertListEqual(P.r_character(table.column(3)), ['TRUE', 'FALSE', None])
+        self.assertSetEqual(table.content(), {'1.0', '2.5', 'nan', 'x', 'NA', '', 'True', 'False', '3.0'})
+
+    def test_unite_separate(self):
+        united = self.eval('(unite X (ColInt 4) (ColInt 2))')
+        self.assertListEqual(united.names[:2], ['round', 'COL2'])
+        self.assertListEqual(P.r_character(united.column(2)), ['foo_22', 'foo_11', 'bar_22', 'bar_11'])
+        separated = self.eval('(separate X (ColInt 5))')
+        self.assertEqual(separated.num_cols, 6)
+        self.assertListEqual(P.r_character(separated.column(5)), ['0', '0', '0', '0'])
+        self.assertEqual(P.r_character(separated.column(6))[3], '0325823465827852')
+        with self.assertRaises(AssertionViolation):
+            self.eval('(unite X (ColInt 6) (ColInt 2))')
+
+    def test_spread_gather(self):
+        spread = self.eval('(spread X (ColInt 4) (ColInt 5))')
+        self.assertListEqual(spread.names, ['round', 'var1', 'var2', 'bar', 'foo'])
+        self.assertListEqual(self.rows(spread), [
+            ('round1', '22', '33', '0.124105813913047', '0.169122009770945'),
+            ('round2', '11', '44', '0.0325823465827852', '0.185708264587447')])
+        gathered = self.eval('(gather X (ColList ("4" "5")))')
+        self.assertListEqual(gathered.names, ['round', 'var1', 'var2', 'KEY', 'VALUE'])
+        self.assertEqual(gathered.num_rows, 8)
+        # Mixed types are gathered as characters
+        self.assertEqual(gathered.column_class(5), 'character')
+        self.assertListEqual(P.r_character(gathered.column(5))[3:5], ['bar', '0.169122009770945'])
+        # Without the other columns, the two rows of round1 go to the same cell
+        with self.assertRaises(GeneralError):
+            self.eval('(spread (select X (ColList ("1" "2"))) (ColInt 1) (ColInt 2))')
+
+    def test_group_by_summarise(self):
+        grouped = self.eval('(group_by X (ColList ("3")))')
+        self.assertEqual(grouped.names[-1], 'c(3)')
+        self.assertTupleEqual(grouped.groups, ('c(3)',))
+        selected = self.eval('(select (group_by X (ColList ("3"))) (ColList ("1")))')
+        self.assertListEqual(selected.names, ['c(3)', 'round'])
+        summary = self.eval('(summarise (group_by X (ColList ("3"))) (Aggr "max") (ColInt 2))')
+        self.assertListEqual(self.rows(summary), [('3', '22')])
+        self.assertTupleEqual(summary.groups, ())
+        with self.assertRaises(AssertionViolation):
+            self.eval('(summarise X (Aggr "sum") (ColInt 1))')
+
+    def test_filter_mutate_join(self):
+        self.assertEqual(self.eval('(filter X (BoolFunc "<") (ColInt 2) (SmallInt "3"))').num_rows, 0)
+        # Characters are compared with the constant as a string
+        self.assertEqual(self.eval('(filter X (BoolFunc ">") (ColInt 1) (SmallInt "3"))').num_rows, 4)
+        mutated = self.eval('(mutate (mutate X (NumFunc "/") (ColInt 2) (ColInt 3)) (NumFunc "/") (ColInt 5) (ColInt 6))')
+        self.assertListEqual(P.r_character(mutated.column(6)),
+                             ['0.666666666666667', '0.25', '0.666666666666667', '0.25'])
+        joined = self.eval('(inner_join X X)')
+        self.assertListEqual(self.rows(joined), self.rows(self._input))
+
+    def test_abstract(self):
+        self.assertEqual(self._interp.apply_row(self._input), 4)
+        self.assertEqual(self._interp.apply_col(self._input), 5)
+        self.assertEqual(self._interp.apply_head(self._input), 0)
+        self.assertEqual(self._interp.apply_content(self._input), 0)
+        spread = self.eval('(spread X (ColInt 4) (ColInt 5))')
+        self.assertIs(spread.origin, self._input)
+        # "foo" and "bar" are headers now, but they were values of the input
+        self.assertEqual(self._interp.apply_head(spread), 0)
+        united = self.eval('(unite X (ColInt 4) (ColInt 2))')
+        self.assertEqual(self._interp.apply_head(united), 1)
+        self.assertEqual(self._interp.apply_content(united), 4)
+
+    def test_eq(self):
+        output = P.read_table(os.path.join(SUITE_DIR, 'p1_output1.csv'))
+        self.assertTrue(P.eq_pandas(self._input, self.eval('(inner_join X X)')))
+        self.assertFalse(P.eq_pandas(self._input, output))
+        self.assertFalse(P.eq_pandas(self._input, self.eval('(select X (ColList ("1" "2")))')))
+
+    def test_decider(self):
+        input_table = P.read_table(os.path.join(SUITE_DIR, 'p3_input1.csv'))
+        output = P.read_table(os.path.join(SUITE_DIR, 'p3_output1.csv'), origin=input_table)
+        # Like in R, the output is measured against the input, not against itself
+        self.assertEqual(self._interp.apply_head(output), 4)
+        decider = ExampleConstraintPruningDecider(
+            spec=self._spec,
+            interpreter=self._interp,
+            examples=[Example(input=[input_table], output=output)],
+            equal_output=P.eq_pandas)
+        prog = self._builder.from_sexp_string(
+            '(spread (unite (gather (@param 0) (ColList ("3" "4"))) (ColInt 2) (ColInt 3)) (ColInt 2) (ColInt 3))')
+        self.assertTrue(decider.analyze(prog).is_ok())
+
+
+@unittest.skipUnless(P is not None and R is not None, 'pandas, rpy2 or R is not available')
+class TestDifferential(unittest.TestCase):
+    '''Evaluate programs with both backends on the pldi17 benchmarks and compare the results'''
+    NUM_PROGRAMS = 50
+
+    @staticmethod
+    def normalize_name(name):
+        # Fresh names are numbered differently by the two backends
+        return FRESH_NAME.sub('COL', name)
+
+    def r_canonical(self, name):
+        ncol = int(robjects.r('ncol({})'.format(name))[0])
+        names = [self.normalize_name(x) for x in robjects.r('colnames({})'.format(name))]
+        columns = []
+        for i in range(ncol):
+            values = robjects.r('as.character({}[[{}]])'.format(name, i + 1))
+            # pandas does not tell NaN and NA apart
+            columns.append([None if x is robjects.NA_Character or x == 'NaN' else x for x in values])
+        return names, Counter(zip(*columns))
+
+    def pandas_canonical(self, table):
+        names = [self.normalize_name(x) for x in table.names]
+        columns = [P.r_character(table.frame.iloc[:, i]) for i in range(table.num_cols)]
+        return names, Counter(zip(*columns))
+
+    @staticmethod
+    def evaluate(interp, prog, inputs):
+        try:
+            return interp.eval(prog, inputs), None
+        except InterpreterError as e:
+            return None, type(e)
+
+    def test_pldi17(self):
+        spec = S.parse_file(SPEC_FILE)
+        progs = SmtEnumerator(spec, depth=4, loc=3).next_batch(self.NUM_PROGRAMS)
+        for task, input_file, output_file in pldi17_tasks():
+            R.init_tbl('input0', input_file)
+            R.init_tbl('output', output_file)
+            r_interp = R.MorpheusInterpreter()
+            pandas_interp = P.PandasMorpheusInterpreter()
+            pandas_input = P.read_table(input_file)
+            pandas_output = P.read_table(output_file, origin=pandas_input)
+            self.assertEqual(self.r_canonical('input0'), self.pandas_canonical(pandas_input))
+            # The deciders compare the properties of the programs with the ones of the expected output
+            for prop in ['row', 'col', 'head', 'content']:
+                self.assertEqual(getattr(r_interp, 'apply_' + prop)('output'),
+                                 getattr(pandas_interp, 'apply_' + prop)(pandas_output))
+            for prog in progs:
+                with self.subTest(task=task, prog=str(prog)):
+                    r_value, r_error = self.evaluate(r_interp, prog, ['input0'])
+                    pandas_value, pandas_error = self.evaluate(pandas_interp, prog, [pandas_input])
+                    self.assertEqual(r_error, pandas_error)
+                    if r_error is not None:
+                        continue
+                    self.assertEqual(self.r_canonical(r_value), self.pandas_canonical(pandas_value))
+                    for prop in ['row', 'col', 'head', 'content']:
+                        self.assertEqual(getattr(r_interp, 'apply_' + prop)(r_value),
+                                         getattr(pandas_interp, 'apply_' + prop)(pandas_value))
+                    self.assertEqual(R.eq_r(r_value, 'output'), P.eq_pandas(pandas_value, pandas_output))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,5 @@
+__version__ = '0.1dev'
+
 from . import logger
 from . import visitor
 from . import spec
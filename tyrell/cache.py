@@ -0,0 +1,78 @@
+from typing import Any, Optional
+import hashlib
+import os
+import pickle
+import tempfile
+from .logger import get_logger
+
+logger = get_logger('tyrell.cache')
+
+
+def default_cache_dir() -> str:
+    '''
+    Return the directory named by the `TYRELL_CACHE_DIR` environment variable, or `~/.cache/tyrell` by default.
+    '''
+    path = os.environ.get('TYRELL_CACHE_DIR')
+    if path is None:
+        path = os.path.join(os.path.expanduser('~'), '.cache', 'tyrell')
+    return path
+
+
+def content_hash(*parts: str) -> str:
+    '''Return a hex digest identifying the given strings, in order'''
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part.encode('utf-8')
+        digest.update(str(len(data)).encode('ascii'))
+        digest.update(b':')
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    '''
+    A directory of pickled values, grouped by namespace and looked up by a string key (usually a `content_hash()`).
+    Entries are written atomically, so several processes may share a cache. An entry that cannot be read is treated as missing.
+    '''
+    _directory: str
+
+    def __init__(self, directory: Optional[str] = None):
+        self._directory = directory if directory is not None else default_cache_dir()
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def _path(self, namespace: str, key: str) -> str:
+        return os.path.join(self._directory, namespace, key + '.pickle')
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        '''Return the value stored under `key`, or None if there is none'''
+        path = self._path(namespace, key)
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning('Ignoring unreadable cache entry {}: {}'.format(path, e))
+            return None
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        '''Store `value` under `key`. Failing to write the entry is not an error.'''
+        path = self._path(namespace, key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning('Cannot write cache entry {}: {}'.format(path, e))
+
+    def __repr__(self) -> str:
+        return 'DiskCache({!r})'.format(self._directory)
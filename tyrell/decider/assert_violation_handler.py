@@ -33,7 +33,9 @@ class AssertionViolationHandler:
         blames = list()
         arg_node = error.arg
         blame_base = self._compute_blame_base(error)
-        for alt_prod in self._spec.get_productions_with_lhs(prod.lhs):
+        index = self._spec.index
+        alt_prods = (x for p in index.productions_with_lhs_id(index.lhs_ids[prod.id]) for x in p.instances())
+        for alt_prod in alt_prods:
             alt_node = AtomNode(alt_prod)
             # Inputs doesn't matter here as we don't have any ParamNode
             value = self._interp.eval(alt_node, [])
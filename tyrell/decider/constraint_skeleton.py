@@ -0,0 +1,85 @@
+from typing import cast, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import z3
+
+from ..dsl import Node, NodeIndexer
+from ..spec.expr import *
+from .constraint_encoder import ConstraintEncoder
+
+# Name of the tracking literal, the clause and the (node ID, constraint index) it comes from
+SkeletonClause = Tuple[str, z3.BoolRef, Tuple[int, int]]
+
+
+def get_z3_var(node_id: int, pname: str, ptype: ExprType):
+    var_name = '{}_n{}'.format(pname, node_id)
+    if ptype is ExprType.INT:
+        return z3.Int(var_name)
+    elif ptype is ExprType.BOOL:
+        return z3.Bool(var_name)
+    else:
+        raise RuntimeError('Unrecognized ExprType: {}'.format(ptype))
+
+
+def get_constraint_var(node_id: int, index: int) -> str:
+    return '@n{}_c{}'.format(node_id, index)
+
+
+class SkeletonCache:
+    '''
+    Memoize the z3 clauses encoding the constraints of the productions in a program.
+    The variables of the clauses are named after the IDs given by `NodeIndexer`, so two programs with the same productions at the same positions share the same clauses, whatever their parameters and enum values are.
+    The least recently used skeletons are evicted once there are more than `max_entries` of them.
+    '''
+    _max_entries: int
+    _skeletons: 'OrderedDict[Tuple[int, ...], List[SkeletonClause]]'
+
+    def __init__(self, max_entries: int = 4096):
+        if max_entries <= 0:
+            raise ValueError(
+                'Max entries cannot be non-positive: {}'.format(max_entries))
+        self._max_entries = max_entries
+        self._skeletons = OrderedDict()
+
+    @staticmethod
+    def _shape(indexer: NodeIndexer) -> Tuple[int, ...]:
+        # Nodes are indexed in BFS order, and the production of an apply node determines its number of children
+        return tuple([x.production.id if x.is_apply() else -1 for x in indexer.nodes])
+
+    @staticmethod
+    def _encode(indexer: NodeIndexer) -> List[SkeletonClause]:
+        clauses = []
+        for node_id, node in enumerate(indexer.nodes):
+            if not node.is_apply():
+                continue
+            arg_ids = [indexer.get_id_or_raise(x) for x in node.children]
+
+            def encode_property(prop_expr):
+                param_expr = cast(ParamExpr, prop_expr.operand)
+                if param_expr.index == 0:
+                    prop_id = node_id
+                else:
+                    prop_id = arg_ids[param_expr.index - 1]
+                return get_z3_var(prop_id, prop_expr.name, prop_expr.type)
+            constraint_visitor = ConstraintEncoder(encode_property)
+            for index, constraint in enumerate(node.production.constraints):
+                clauses.append((get_constraint_var(node_id, index),
+                                constraint_visitor.visit(constraint),
+                                (node_id, index)))
+        return clauses
+
+    def get(self, indexer: NodeIndexer) -> List[SkeletonClause]:
+        '''Return the clauses of the program indexed by `indexer`'''
+        shape = self._shape(indexer)
+        clauses = self._skeletons.get(shape)
+        if clauses is not None:
+            self._skeletons.move_to_end(shape)
+            return clauses
+        clauses = self._encode(indexer)
+        self._skeletons[shape] = clauses
+        if len(self._skeletons) > self._max_entries:
+            self._skeletons.popitem(last=False)
+        return clauses
+
+    @property
+    def num_entries(self) -> int:
+        return len(self._skeletons)
@@ -9,11 +9,15 @@ from typing import (
     MutableMapping,
     Any,
     Callable,
+    Dict,
     Iterator
 )
 from collections import defaultdict
-from itertools import permutations
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
 import z3
+from ..cache import DiskCache, content_hash
 from ..interpreter import Interpreter, InterpreterError
 from ..dsl import Node, AtomNode, ParamNode, ApplyNode, NodeIndexer
 from ..spec import Production, ValueType, TyrellSpec
@@ -25,41 +29,118 @@ from .blame import Blame
 from .assert_violation_handler import AssertionViolationHandler
 from .eval_expr import eval_expr
 from .constraint_encoder import ConstraintEncoder
+from .constraint_skeleton import SkeletonCache, get_z3_var
 from .result import ok, bad
 
 logger = get_logger('tyrell.synthesizer.constraint')
 ImplyMap = Mapping[Tuple[Production, Expr], List[Production]]
 MutableImplyMap = MutableMapping[Tuple[Production, Expr], List[Production]]
+# An imply map that refers to productions by name and to constraints by index, so that it can be stored
+StoredImplyMap = Dict[Tuple[str, int], List[str]]
+
+# Imply maps computed by this process, keyed by `imply_map_key()`
+_imply_maps: Dict[str, StoredImplyMap] = dict()
+
+
+def _check_implies(pre: Expr, post: Expr) -> bool:
+    def encode_property(prop_expr: PropertyExpr):
+        param_expr = cast(ParamExpr, prop_expr.operand)
+        var_name = '{}_p{}'.format(prop_expr.name, param_expr.index)
+        ptype = prop_expr.type
+        if ptype is ExprType.INT:
+            return z3.Int(var_name)
+        elif ptype is ExprType.BOOL:
+            return z3.Bool(var_name)
+        else:
+            raise RuntimeError('Unrecognized ExprType: {}'.format(ptype))
+    constraint_visitor = ConstraintEncoder(encode_property)
+
+    z3_solver = z3.Solver()
+    z3_pre = constraint_visitor.visit(pre)
+    z3_post = constraint_visitor.visit(post)
+    z3_solver.add(z3.Not(z3.Implies(z3_pre, z3_post)))
+    return z3_solver.check() == z3.unsat
+
+
+def _find_implied(constraints: Tuple[List[Expr], List[Expr]]) -> List[int]:
+    '''Return the indices of the constraints in the first list that are implied by some constraint in the second one'''
+    constraints0, constraints1 = constraints
+    return [index for index, c0 in enumerate(constraints0)
+            if any(_check_implies(c1, c0) for c1 in constraints1)]
+
+
+def imply_map_key(spec: TyrellSpec) -> str:
+    '''
+    Return a hash of the parts of `spec` the imply map depends on: the name, arity and constraints of every constrained function.
+    '''
+    parts = ['imply_map/1']
+    for prod in spec.get_function_productions():
+        if len(prod.constraints) > 0:
+            parts.append('{}/{}/{}'.format(prod.name, len(prod.rhs), len(prod.constraints)))
+            parts.extend([repr(x) for x in prod.constraints])
+    return content_hash(*parts)
+
+
+def compute_imply_map(spec: TyrellSpec, num_processes: Optional[int] = 1) -> StoredImplyMap:
+    '''
+    Find, for every constraint of every function, the other functions of the same arity with a constraint that implies it.
+    The z3 queries run in this process by default. If `num_processes` is greater than 1, they are spread over a pool of that many processes instead, or as many as there are CPUs if it is None.
+    Daemonic processes (e.g. the workers of a `multiprocessing.Pool`) cannot have children, so they always run the queries themselves.
+    '''
+    arity = spec.index.arity
+    constrained_prods = [x for x in spec.get_function_productions() if len(x.constraints) > 0]
+    by_arity = defaultdict(list)
+    for prod in constrained_prods:
+        by_arity[arity[prod.id]].append(prod)
+    # Same order as the pairs of permutations(constrained_prods, r=2) that have the same arity
+    pairs = [(prod0, prod1) for prod0 in constrained_prods for prod1 in by_arity[arity[prod0.id]]
+             if prod1 is not prod0]
+    tasks = [(prod0.constraints, prod1.constraints) for prod0, prod1 in pairs]
+    if num_processes is None:
+        num_processes = os.cpu_count() or 1
+    if num_processes > 1 and multiprocessing.current_process().daemon:
+        logger.debug('Computing the imply map serially in a daemonic process')
+        num_processes = 1
+    if num_processes > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=num_processes) as pool:
+            chunksize = max(1, len(tasks) // (4 * num_processes))
+            results = list(pool.map(_find_implied, tasks, chunksize=chunksize))
+    else:
+        results = [_find_implied(x) for x in tasks]
+
+    ret: StoredImplyMap = defaultdict(list)
+    for (prod0, prod1), indices in zip(pairs, results):
+        for index in indices:
+            ret[(prod0.name, index)].append(prod1.name)
+    return dict(ret)
 
 
 class Z3Encoder(GenericVisitor):
+    '''
+    Encode the constraints of a program into a solver shared by all the programs a decider checks.
+    The constraints go into a scope that lasts until `close()`. The alignment of each example goes into a nested scope that lasts until `check_example()` returns.
+    '''
     _interp: Interpreter
     _indexer: NodeIndexer
     _example: Example
     _unsat_map: Dict[str, Tuple[Node, int]]
     _solver: z3.Solver
 
-    def __init__(self, interp: Interpreter, indexer: NodeIndexer, example: Example):
+    def __init__(self, interp: Interpreter, indexer: NodeIndexer, solver: z3.Solver, skeletons: SkeletonCache):
         self._interp = interp
         self._indexer = indexer
-        self._example = example
         self._unsat_map = dict()
-        self._solver = z3.Solver()
+        self._solver = solver
+        self._solver.push()
+        for cname, z3_clause, (node_id, index) in skeletons.get(indexer):
+            self._unsat_map[cname] = (indexer.get_node_or_raise(node_id), index)
+            self._solver.assert_and_track(z3_clause, cname)
 
-    def get_z3_var(self, node: Node, pname: str, ptype: ExprType):
-        node_id = self._indexer.get_id(node)
-        var_name = '{}_n{}'.format(pname, node_id)
-        if ptype is ExprType.INT:
-            return z3.Int(var_name)
-        elif ptype is ExprType.BOOL:
-            return z3.Bool(var_name)
-        else:
-            raise RuntimeError('Unrecognized ExprType: {}'.format(ptype))
+    def close(self):
+        self._solver.pop()
 
-    def _get_constraint_var(self, node: Node, index: int):
-        node_id = self._indexer.get_id(node)
-        var_name = '@n{}_c{}'.format(node_id, index)
-        return var_name
+    def get_z3_var(self, node: Node, pname: str, ptype: ExprType):
+        return get_z3_var(self._indexer.get_id(node), pname, ptype)
 
     def encode_param_alignment(self, node: Node, ty: ValueType, index: int):
         if not isinstance(ty, ValueType):
@@ -85,24 +166,20 @@ class Z3Encoder(GenericVisitor):
         pass
 
     def visit_apply_node(self, apply_node: ApplyNode):
-        def encode_property(prop_expr):
-            param_expr = cast(ParamExpr, prop_expr.operand)
-            if param_expr.index == 0:
-                node = apply_node
-            else:
-                node = apply_node.args[param_expr.index - 1]
-            pname = prop_expr.name
-            pty = prop_expr.type
-            return self.get_z3_var(node, pname, pty)
-        constraint_visitor = ConstraintEncoder(encode_property)
-        for index, constraint in enumerate(apply_node.production.constraints):
-            cname = self._get_constraint_var(apply_node, index)
-            z3_clause = constraint_visitor.visit(constraint)
-            self._unsat_map[cname] = (apply_node, index)
-            self._solver.assert_and_track(z3_clause, cname)
         for arg in apply_node.args:
             self.visit(arg)
 
+    def check_example(self, prog: Node, example: Example):
+        '''Return the constraints of each node that conflict with `example`, or None if there is no conflict'''
+        self._example = example
+        self._solver.push()
+        try:
+            self.encode_output_alignment(prog)
+            self.visit(prog)
+            return self.get_blame_nodes()
+        finally:
+            self._solver.pop()
+
     def get_blame_nodes(self):
         if self._solver.check() != z3.unsat:
             # Abstract semantics is satisfiable or unknown. Cannot learn anything.
@@ -125,12 +202,18 @@ class BlameFinder:
     _indexer: NodeIndexer
     _blames_collection: Set[FrozenSet[Blame]]
 
-    def __init__(self, interp: Interpreter, imply_map: ImplyMap, prog: Node):
+    _solver: z3.Solver
+    _skeletons: SkeletonCache
+
+    def __init__(self, interp: Interpreter, imply_map: ImplyMap, prog: Node,
+                 solver: Optional[z3.Solver] = None, skeletons: Optional[SkeletonCache] = None):
         self._interp = interp
         self._imply_map = imply_map
         self._prog = prog
         self._indexer = NodeIndexer(prog)
         self._blames_collection = set()
+        self._solver = solver if solver is not None else z3.Solver()
+        self._skeletons = skeletons if skeletons is not None else SkeletonCache()
 
     def _get_raw_blames(self) -> List[List[Blame]]:
         return [list(x) for x in self._blames_collection]
@@ -150,14 +233,18 @@ class BlameFinder:
         return [list(x) for x in self._blames_collection]
 
     def process_examples(self, examples: List[Example]):
-        for example in examples:
-            self.process_example(example)
+        z3_encoder = Z3Encoder(self._interp, self._indexer, self._solver, self._skeletons)
+        try:
+            for example in examples:
+                self._process_example(z3_encoder, example)
+        finally:
+            z3_encoder.close()
 
     def process_example(self, example: Example):
-        z3_encoder = Z3Encoder(self._interp, self._indexer, example)
-        z3_encoder.encode_output_alignment(self._prog)
-        z3_encoder.visit(self._prog)
-        blame_nodes = z3_encoder.get_blame_nodes()
+        self.process_examples([example])
+
+    def _process_example(self, z3_encoder: Z3Encoder, example: Example):
+        blame_nodes = z3_encoder.check_example(self._prog, example)
         if blame_nodes is not None:
             base_nodes = list(blame_nodes.keys())
             for node, exprs in blame_nodes.items():
@@ -171,48 +258,43 @@ class BlameFinder:
 class ExampleConstraintDecider(ExampleDecider):
     _imply_map: ImplyMap
     _assert_handler: AssertionViolationHandler
+    _solver: z3.Solver
+    _skeletons: SkeletonCache
 
     def __init__(self,
                  spec: TyrellSpec,
                  interpreter: Interpreter,
                  examples: List[Example],
-                 equal_output: Callable[[Any, Any], bool]=lambda x, y: x == y):
+                 equal_output: Callable[[Any, Any], bool]=lambda x, y: x == y,
+                 cache: Optional[DiskCache] = None,
+                 num_processes: Optional[int] = 1):
+        '''
+        The imply map between the constraints of `spec` is computed once per process, and once in total if a `cache` is given.
+        When it is missing, it is computed in this process by default. `num_processes` opts into a process pool, as in `compute_imply_map()`.
+        '''
         super().__init__(interpreter, examples, equal_output)
-        self._imply_map = self._build_imply_map(spec)
+        self._imply_map = self._build_imply_map(spec, cache, num_processes)
         self._assert_handler = AssertionViolationHandler(spec, interpreter)
+        self._solver = z3.Solver()
+        self._skeletons = SkeletonCache()
 
-    def _check_implies(self, pre, post) -> bool:
-        def encode_property(prop_expr: PropertyExpr):
-            param_expr = cast(ParamExpr, prop_expr.operand)
-            var_name = '{}_p{}'.format(prop_expr.name, param_expr.index)
-            ptype = prop_expr.type
-            if ptype is ExprType.INT:
-                return z3.Int(var_name)
-            elif ptype is ExprType.BOOL:
-                return z3.Bool(var_name)
-            else:
-                raise RuntimeError('Unrecognized ExprType: {}'.format(ptype))
-        constraint_visitor = ConstraintEncoder(encode_property)
-
-        z3_solver = z3.Solver()
-        z3_pre = constraint_visitor.visit(pre)
-        z3_post = constraint_visitor.visit(post)
-        z3_solver.add(z3.Not(z3.Implies(z3_pre, z3_post)))
-        return z3_solver.check() == z3.unsat
-
-    def _build_imply_map(self, spec: TyrellSpec) -> ImplyMap:
-        ret: MutableImplyMap = defaultdict(list)
-        constrained_prods = filter(
-            lambda prod: prod.is_function() and len(prod.constraints) > 0,
-            spec.productions())
-        for prod0, prod1 in permutations(constrained_prods, r=2):
-            if len(prod0.rhs) != len(prod1.rhs):
-                continue
-            for c0 in prod0.constraints:
-                for c1 in prod1.constraints:
-                    if self._check_implies(c1, c0):
-                        ret[(prod0, c0)].append(prod1)
-                        break
+    def _build_imply_map(self, spec: TyrellSpec, cache: Optional[DiskCache], num_processes: Optional[int]) -> ImplyMap:
+        key = imply_map_key(spec)
+        stored = _imply_maps.get(key)
+        if stored is None and cache is not None:
+            stored = cache.get('imply_map', key)
+        if stored is None:
+            logger.debug('Computing the imply map of spec {}'.format(key))
+            stored = compute_imply_map(spec, num_processes)
+            if cache is not None:
+                cache.put('imply_map', key, stored)
+        _imply_maps[key] = stored
+
+        ret: MutableImplyMap = dict()
+        for (name, index), names in stored.items():
+            prod = spec.get_function_production_or_raise(name)
+            ret[(prod, prod.constraints[index])] = [
+                spec.get_function_production_or_raise(x) for x in names]
         return ret
 
     def analyze(self, prog):
@@ -223,7 +305,8 @@ class ExampleConstraintDecider(ExampleDecider):
         if len(failed_examples) == 0:
             return ok()
         else:
-            blame_finder = BlameFinder(self.interpreter, self._imply_map, prog)
+            blame_finder = BlameFinder(
+                self.interpreter, self._imply_map, prog, self._solver, self._skeletons)
             blame_finder.process_examples(failed_examples)
             blames = blame_finder.get_blames()
             if len(blames) == 0:
@@ -1,10 +1,10 @@
 from collections import defaultdict
-from typing import cast, Any, Callable, Dict, List, Tuple, Set, FrozenSet
+from typing import cast, Any, Callable, Dict, List, Optional, Tuple, Set, FrozenSet
 import z3
 
 from .assert_violation_handler import AssertionViolationHandler
 from .blame import Blame
-from .constraint_encoder import ConstraintEncoder
+from .constraint_skeleton import SkeletonCache, get_z3_var
 from .example_base import Example, ExampleDecider
 from .eval_expr import eval_expr
 from .result import ok, bad
@@ -19,33 +19,40 @@ logger = get_logger('tyrell.decider.example_constraint_pruning')
 
 
 class Z3Encoder(GenericVisitor):
+    '''
+    Encode the constraints of a program into a solver shared by all the programs a decider checks.
+    The constraints go into a scope that lasts until `close()`. The facts about each example go into a nested scope, opened by `begin_example()` and closed by `end_example()`.
+    '''
     _interp: Interpreter
     _indexer: NodeIndexer
     _example: Example
     _unsat_map: Dict[str, Tuple[Node, int]]
     _solver: z3.Solver
 
-    def __init__(self, interp: Interpreter, indexer: NodeIndexer, example: Example):
+    def __init__(self, interp: Interpreter, indexer: NodeIndexer, solver: z3.Solver, skeletons: SkeletonCache):
         self._interp = interp
         self._indexer = indexer
-        self._example = example
         self._unsat_map = dict()
-        self._solver = z3.Solver()
+        self._solver = solver
+        self._solver.push()
+        for cname, z3_clause, (node_id, index) in skeletons.get(indexer):
+            self._unsat_map[cname] = (indexer.get_node_or_raise(node_id), index)
+            self._solver.assert_and_track(z3_clause, cname)
 
-    def get_z3_var(self, node: Node, pname: str, ptype: ExprType):
-        node_id = self._indexer.get_id(node)
-        var_name = '{}_n{}'.format(pname, node_id)
-        if ptype is ExprType.INT:
-            return z3.Int(var_name)
-        elif ptype is ExprType.BOOL:
-            return z3.Bool(var_name)
-        else:
-            raise RuntimeError('Unrecognized ExprType: {}'.format(ptype))
+    def close(self):
+        self._solver.pop()
+
+    def begin_example(self, prog: Node, example: Example):
+        self._example = example
+        self._solver.push()
+        self.encode_output_alignment(prog)
+        self.visit(prog)
 
-    def _get_constraint_var(self, node: Node, index: int):
-        node_id = self._indexer.get_id(node)
-        var_name = '@n{}_c{}'.format(node_id, index)
-        return var_name
+    def end_example(self):
+        self._solver.pop()
+
+    def get_z3_var(self, node: Node, pname: str, ptype: ExprType):
+        return get_z3_var(self._indexer.get_id(node), pname, ptype)
 
     def encode_param_alignment(self, node: Node, ty: ValueType, index: int):
         if not isinstance(ty, ValueType):
@@ -73,21 +80,6 @@ class Z3Encoder(GenericVisitor):
         pass
 
     def visit_apply_node(self, apply_node: ApplyNode):
-        def encode_property(prop_expr):
-            param_expr = cast(ParamExpr, prop_expr.operand)
-            if param_expr.index == 0:
-                node = apply_node
-            else:
-                node = apply_node.args[param_expr.index - 1]
-            pname = prop_expr.name
-            pty = prop_expr.type
-            return self.get_z3_var(node, pname, pty)
-        constraint_visitor = ConstraintEncoder(encode_property)
-        for index, constraint in enumerate(apply_node.production.constraints):
-            cname = self._get_constraint_var(apply_node, index)
-            z3_clause = constraint_visitor.visit(constraint)
-            self._unsat_map[cname] = (apply_node, index)
-            self._solver.assert_and_track(z3_clause, cname)
         for arg in apply_node.args:
             self.visit(arg)
 
@@ -219,11 +211,17 @@ class BlameFinder:
     _indexer: NodeIndexer
     _blames_collection: Set[FrozenSet[Blame]]
 
-    def __init__(self, interp: Interpreter, prog: Node):
+    _solver: z3.Solver
+    _skeletons: SkeletonCache
+
+    def __init__(self, interp: Interpreter, prog: Node,
+                 solver: Optional[z3.Solver] = None, skeletons: Optional[SkeletonCache] = None):
         self._interp = interp
         self._prog = prog
         self._indexer = NodeIndexer(prog)
         self._blames_collection = set()
+        self._solver = solver if solver is not None else z3.Solver()
+        self._skeletons = skeletons if skeletons is not None else SkeletonCache()
 
     def _get_raw_blames(self) -> List[List[Blame]]:
         return [list(x) for x in self._blames_collection]
@@ -232,8 +230,9 @@ class BlameFinder:
         return [list(x) for x in self._blames_collection]
 
     def process_examples(self, examples: List[Example], equal_output: Callable[[Any, Any], bool]):
+        z3_encoder = Z3Encoder(self._interp, self._indexer, self._solver, self._skeletons)
         try:
-            all_ok = all([self.process_example(example, equal_output) for example in examples])
+            all_ok = all([self._process_example(z3_encoder, example, equal_output) for example in examples])
             if all_ok:
                 return ok()
             else:
@@ -253,12 +252,24 @@ class BlameFinder:
                 elif prog_node.is_apply() and len(prog_node.production.constraints) > 0:
                     blame_nodes.add(node)
             return bad([[Blame(node, node.production) for node in blame_nodes]])
+        finally:
+            z3_encoder.close()
 
     def process_example(self, example: Example, equal_output: Callable[[Any, Any], bool]):
-        z3_encoder = Z3Encoder(self._interp, self._indexer, example)
-        z3_encoder.encode_output_alignment(self._prog)
-        z3_encoder.visit(self._prog)
+        z3_encoder = Z3Encoder(self._interp, self._indexer, self._solver, self._skeletons)
+        try:
+            return self._process_example(z3_encoder, example, equal_output)
+        finally:
+            z3_encoder.close()
+
+    def _process_example(self, z3_encoder: Z3Encoder, example: Example, equal_output: Callable[[Any, Any], bool]):
+        z3_encoder.begin_example(self._prog, example)
+        try:
+            return self._check_example(z3_encoder, example, equal_output)
+        finally:
+            z3_encoder.end_example()
 
+    def _check_example(self, z3_encoder: Z3Encoder, example: Example, equal_output: Callable[[Any, Any], bool]):
         if z3_encoder.is_unsat():
             # If abstract semantics cannot be satisfiable, perform blame analysis
             blame_nodes = z3_encoder.get_blame_nodes()
@@ -277,6 +288,8 @@ class BlameFinder:
 
 class ExampleConstraintPruningDecider(ExampleDecider):
     assert_handler: AssertionViolationHandler
+    _solver: z3.Solver
+    _skeletons: SkeletonCache
 
     def __init__(self,
                  spec: TyrellSpec,
@@ -285,10 +298,12 @@ class ExampleConstraintPruningDecider(ExampleDecider):
                  equal_output: Callable[[Any, Any], bool]=lambda x, y: x == y):
         super().__init__(interpreter, examples, equal_output)
         self._assert_handler = AssertionViolationHandler(spec, interpreter)
+        self._solver = z3.Solver()
+        self._skeletons = SkeletonCache()
 
     def analyze_interpreter_error(self, error: InterpreterError):
         return self._assert_handler.handle_interpreter_error(error)
 
     def analyze(self, prog):
-        blame_finder = BlameFinder(self.interpreter, prog)
+        blame_finder = BlameFinder(self.interpreter, prog, self._solver, self._skeletons)
         return blame_finder.process_examples(self.examples, self.equal_output)
@@ -1,9 +1,14 @@
 import unittest
+import tempfile
+from multiprocessing import Pool
+from ..cache import DiskCache
 from ..spec import parse
 from ..dsl import Builder
 from ..interpreter import PostOrderInterpreter
 from .example_base import Example
-from .example_constraint import ExampleConstraintDecider
+from . import example_constraint
+from .example_constraint import ExampleConstraintDecider, compute_imply_map, imply_map_key
+from .example_constraint_pruning import ExampleConstraintPruningDecider
 
 
 spec_str = r'''
@@ -39,6 +44,13 @@ class FooInterpreter(PostOrderInterpreter):
         return arg < 0
 
 
+def build_imply_map_in_worker(num_processes):
+    example_constraint._imply_maps.clear()
+    ExampleConstraintDecider(spec, FooInterpreter(), [Example(input=[1, -1], output=-1)],
+                             num_processes=num_processes)
+    return example_constraint._imply_maps[imply_map_key(spec)]
+
+
 class TestExampleConstraint(unittest.TestCase):
 
     @staticmethod
@@ -98,6 +110,96 @@ class TestExampleConstraint(unittest.TestCase):
         mult_prod = builder.get_function_production_or_raise('mult')
         self.assertNotIn([(prog, mult_prod)], reason)
 
+    def test_shared_solver(self):
+        decider = ExampleConstraintDecider(
+            spec=spec,
+            interpreter=FooInterpreter(),
+            examples=[Example(input=[1, -1], output=2), Example(input=[-2, 1], output=2)]
+        )
+        progs = [builder.from_sexp_string(x) for x in [
+            '(mult (@param 0) (@param 1))',
+            '(div (@param 0) (@param 1))',
+            '(mult (@param 1) (@param 0))',
+            '(div (@param 0) (@param 1))',
+        ]]
+        for prog in progs:
+            expected = self.do_analyze(prog, decider.examples)
+            res = decider.analyze(prog)
+            self.assertTrue(res.is_bad())
+            self.assertCountEqual(
+                [sorted(x, key=str) for x in res.why()],
+                [sorted(x, key=str) for x in expected.why()])
+        # Programs with the same productions at the same positions share their constraints
+        self.assertEqual(decider._skeletons.num_entries, 2)
+        # Every scope has been popped
+        self.assertEqual(decider._solver.num_scopes(), 0)
+        self.assertEqual(len(decider._solver.assertions()), 0)
+
+
+class TestImplyMap(unittest.TestCase):
+
+    def setUp(self):
+        example_constraint._imply_maps.clear()
+
+    def test_compute(self):
+        imply_map = compute_imply_map(spec, num_processes=1)
+        # The second constraint of div is implied by none of the constraints of mult
+        self.assertDictEqual(imply_map, {('mult', 0): ['div'], ('div', 0): ['mult']})
+        self.assertDictEqual(compute_imply_map(spec, num_processes=2), imply_map)
+
+    def test_daemonic_worker(self):
+        # Workers of a Pool cannot start a pool of their own, so the map is computed serially there
+        with Pool(1) as pool:
+            imply_map = pool.apply_async(build_imply_map_in_worker, (2,)).get(timeout=60)
+        self.assertDictEqual(imply_map, {('mult', 0): ['div'], ('div', 0): ['mult']})
+
+    def test_key(self):
+        self.assertEqual(imply_map_key(spec), imply_map_key(parse(spec_str)))
+        other_spec = parse(spec_str.replace('pos(b) && neg(a)', 'pos(b) && pos(a)'))
+        self.assertNotEqual(imply_map_key(spec), imply_map_key(other_spec))
+
+    def test_disk_cache(self):
+        examples = [Example(input=[1, -1], output=-1)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = DiskCache(tmp_dir)
+            key = imply_map_key(spec)
+            ExampleConstraintDecider(spec, FooInterpreter(), examples, cache=cache, num_processes=1)
+            self.assertDictEqual(cache.get('imply_map', key), {('mult', 0): ['div'], ('div', 0): ['mult']})
+
+            # A map found on disk is used as is
+            example_constraint._imply_maps.clear()
+            cache.put('imply_map', key, {('div', 1): ['mult']})
+            decider = ExampleConstraintDecider(spec, FooInterpreter(), examples, cache=cache)
+            mult = spec.get_function_production_or_raise('mult')
+            div = spec.get_function_production_or_raise('div')
+            self.assertDictEqual(decider._imply_map, {(div, div.constraints[1]): [mult]})
+
+
+class TestExampleConstraintPruning(unittest.TestCase):
+
+    def test_shared_solver(self):
+        decider = ExampleConstraintPruningDecider(
+            spec=spec,
+            interpreter=FooInterpreter(),
+            examples=[Example(input=[1, -1], output=-1)]
+        )
+        good = builder.from_sexp_string('(mult (@param 0) (@param 1))')
+        bad = builder.from_sexp_string('(mult (@param 0) (@param 0))')
+        self.assertTrue(decider.analyze(good).is_ok())
+        self.assertTrue(decider.analyze(bad).is_bad())
+        self.assertTrue(decider.analyze(good).is_ok())
+
+        decider = ExampleConstraintPruningDecider(
+            spec=spec,
+            interpreter=FooInterpreter(),
+            examples=[Example(input=[1, -1], output=2)]
+        )
+        res = decider.analyze(good)
+        self.assertTrue(res.is_bad())
+        self.assertIn([(good, good.production)], res.why())
+        self.assertTrue(decider.analyze(good).is_bad())
+        self.assertEqual(decider._solver.num_scopes(), 0)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,6 @@
 from .node import Node, AtomNode, ParamNode, ApplyNode
 from .builder import Builder
+from .bank import ProgramBank
 from .iterator import bfs, dfs
 from .indexer import NodeIndexer
 from .parent_finder import ParentFinder
@@ -0,0 +1,124 @@
+from typing import Dict, List, Union
+from array import array
+from .node import Node
+from .builder import Builder
+from ..spec import TyrellSpec, Production
+
+
+class ProgramBank:
+    '''
+    A compact, append-only store of ASTs.
+    Every node is a row made of its production id and the rows of its children, kept in flat `array` buffers rather than in `Node` objects: the children of row `r` are `children[offsets[r]:offsets[r+1]]`. A program is identified by the row of its root.
+    Children are stored before their parents, and a row may be the child of several others. This suits bottom-up enumeration, where new programs are built from the rows of smaller ones.
+    The rows of enumset values hold the id of the symbolic production of their type, and their choice is kept aside.
+    '''
+
+    _builder: Builder
+    _prods: array
+    _choices: Dict[int, int]
+    _offsets: array
+    _children: array
+
+    def __init__(self, spec: TyrellSpec):
+        self._builder = Builder(spec)
+        self._prods = array('i')
+        self._choices = dict()
+        self._offsets = array('I', [0])
+        self._children = array('I')
+
+    def _check_row(self, row: int) -> None:
+        if row < 0 or row >= len(self._prods):
+            raise KeyError('Row is not assigned: {}'.format(row))
+
+    def add_node(self, production: Union[int, Production], children: List[int] = []) -> int:
+        '''
+        Store a node with the given production or production id, whose children are the given rows. Return the row of the new node.
+        An enumset value must be given as a production, since its id does not tell which value it is.
+        Raise `KeyError` or `ValueError` if an error occurs
+        '''
+        if isinstance(production, Production):
+            prod = production
+            self._builder.get_production_or_raise(prod.id)
+        else:
+            prod = self._builder.get_production_or_raise(production)
+        if prod.is_enum_set() and prod.is_symbolic():
+            raise ValueError(
+                'An enumset value must be given as an instance of its production: {}'.format(prod))
+        if prod.is_function():
+            if len(prod.rhs) != len(children):
+                msg = 'Argument count mismatch: expected {} but found {}'.format(
+                    len(prod.rhs), len(children))
+                raise ValueError(msg)
+            for index, (decl_ty, child) in enumerate(zip(prod.rhs, children)):
+                self._check_row(child)
+                actual_ty = self._builder.get_production_or_raise(
+                    self._prods[child]).lhs
+                if decl_ty != actual_ty:
+                    msg = 'Argument {} type mismatch: expected {} but found {}'.format(
+                        index, decl_ty, actual_ty)
+                    raise ValueError(msg)
+        elif len(children) != 0:
+            raise ValueError(
+                'Leaf production cannot have children: {}'.format(prod))
+        row = self._append(prod)
+        self._children.extend(children)
+        self._offsets.append(len(self._children))
+        return row
+
+    def add(self, prog: Node) -> int:
+        '''
+        Store the AST `prog` and return the row of its root. Subtrees that are shared by identity in `prog` are stored once.
+        '''
+        rows: Dict[Node, int] = dict()
+
+        def add_subtree(node: Node) -> int:
+            row = rows.get(node)
+            if row is None:
+                child_rows = [add_subtree(x) for x in node.children]
+                row = self._append(node.production)
+                self._children.extend(child_rows)
+                self._offsets.append(len(self._children))
+                rows[node] = row
+            return row
+        return add_subtree(prog)
+
+    def _append(self, prod: Production) -> int:
+        row = len(self._prods)
+        self._prods.append(prod.id)
+        if prod.is_enum_set():
+            self._choices[row] = prod.choice
+        return row
+
+    def get(self, row: int) -> Node:
+        '''
+        Rebuild the AST rooted at `row`. Shared rows are rebuilt as distinct nodes, so the result is a tree.
+        Raise `KeyError` if the row is not assigned
+        '''
+        self._check_row(row)
+
+        def build(row: int) -> Node:
+            children = [build(x) for x in self.children(row)]
+            return self._builder.make_node(self.production(row), children)
+        return build(row)
+
+    def production(self, row: int) -> Production:
+        '''Return the production of `row`, with its value if it is an enumset'''
+        prod = self._builder.get_production_or_raise(self.production_id(row))
+        choice = self._choices.get(row)
+        return prod if choice is None else prod.with_choice(choice)
+
+    def production_id(self, row: int) -> int:
+        self._check_row(row)
+        return self._prods[row]
+
+    def children(self, row: int) -> List[int]:
+        self._check_row(row)
+        return self._children[self._offsets[row]:self._offsets[row + 1]].tolist()
+
+    @property
+    def nbytes(self) -> int:
+        '''Number of bytes taken by the rows'''
+        return sum(x.itemsize * len(x) for x in (self._prods, self._offsets, self._children))
+
+    def __len__(self) -> int:
+        return len(self._prods)
@@ -1,4 +1,5 @@
-from typing import Union
+from typing import Any, Optional, Tuple, Union
+from weakref import WeakValueDictionary
 import sexpdata
 from .node import *
 from ..spec import TyrellSpec, Production, EnumType
@@ -14,6 +15,9 @@ class ProductionVisitor(GenericVisitor):
     def visit_enum_production(self, prod) -> Node:
         return AtomNode(prod)
 
+    def visit_enum_set_production(self, prod) -> Node:
+        return AtomNode(prod)
+
     def visit_param_production(self, prod) -> Node:
         return ParamNode(prod)
 
@@ -22,15 +26,41 @@ class ProductionVisitor(GenericVisitor):
 
 
 class Builder:
-    '''A factory class to build AST node'''
+    '''
+    A factory class to build AST node.
+    If `intern` is set, the builder hash-conses its nodes: building a node with the same production and the same children twice returns the same instance. Structurally equal ASTs are then identical, so they can be compared with `is` and used as keys of identity-based dicts at O(1) cost.
+    Note that an interned AST may share a subtree at several positions, so it is a DAG rather than a tree. Utilities that identify positions by node identity, e.g. `NodeIndexer`, `ParentFinder` or the blames given to `SmtEnumerator.update()`, expect non-interned ASTs.
+    '''
 
     _spec: TyrellSpec
+    _nodes: Optional['WeakValueDictionary[Tuple[Any, ...], Node]']
 
-    def __init__(self, spec: TyrellSpec):
+    def __init__(self, spec: TyrellSpec, intern: bool = False):
         self._spec = spec
+        # Canonical nodes, keyed by production and the ids of their (canonical) children. Productions are unique per id, except the instances of enumset productions, which compare by value. An entry goes away with its node, and a node keeps its children alive, so the ids in a key cannot be reused while the key is in use
+        self._nodes = WeakValueDictionary() if intern else None
+
+    @property
+    def interning(self) -> bool:
+        return self._nodes is not None
 
     def _make_node(self, prod: Production, children: List[Node] = []) -> Node:
-        return ProductionVisitor(children).visit(prod)
+        if self._nodes is None:
+            return ProductionVisitor(children).visit(prod)
+        children = [self._canonical(x) for x in children]
+        key = (prod,) + tuple(id(x) for x in children)
+        node = self._nodes.get(key)
+        if node is None:
+            node = ProductionVisitor(children).visit(prod)
+            self._nodes[key] = node
+        return node
+
+    def _canonical(self, node: Node) -> Node:
+        key = (node.production,) + tuple(id(x) for x in node.children)
+        if self._nodes.get(key) is node:
+            return node
+        # The node was built elsewhere
+        return self.make_node(node.production, node.children)
 
     def make_node(self, src: Union[int, Production], children: List[Node] = []) -> Node:
         '''
@@ -42,6 +72,9 @@ class Builder:
         elif isinstance(src, Production):
             # Sanity check first
             prod = self._spec.get_production_or_raise(src.id)
+            if src.is_enum_set() and prod.is_enum_set() and src.lhs == prod.lhs:
+                # An instance of the symbolic production, which is the one registered in the spec
+                prod = src
             if src != prod:
                 raise ValueError(
                     'DSL Builder found inconsistent production instance')
@@ -50,6 +83,23 @@ class Builder:
             raise ValueError(
                 'make_node() only accepts int or production, but found {}'.format(src))
 
+    def unshare(self, node: Node) -> Node:
+        '''
+        Return `node` if no node object occurs twice in it. Otherwise, return a copy of it where every position holds a distinct node object, so that the result is a tree.
+        '''
+        seen = set()
+        stack = [node]
+        while len(stack) > 0:
+            x = stack.pop()
+            if id(x) in seen:
+                return self._copy(node)
+            seen.add(id(x))
+            stack.extend(x.children)
+        return node
+
+    def _copy(self, node: Node) -> Node:
+        return ProductionVisitor([self._copy(x) for x in node.children]).visit(node.production)
+
     def make_enum(self, name: str, value: str) -> Node:
         '''
         Convenient method to create an enum node.
@@ -57,7 +107,7 @@ class Builder:
         '''
         ty = self.get_type_or_raise(name)
         prod = self.get_enum_production_or_raise(ty, value)
-        return self.make_node(prod.id)
+        return self.make_node(prod)
 
     def make_param(self, index: int) -> Node:
         '''
@@ -5,9 +5,15 @@ from ..spec import Type, Production, EnumProduction, ParamProduction, FunctionPr
 
 
 class Node(ABC):
-    '''Generic and abstract AST Node'''
+    '''
+    Generic and abstract AST Node.
+    Nodes must not be modified once constructed: their structural hash is computed at construction time.
+    '''
+
+    __slots__ = ('_prod', '_hash', '__weakref__')
 
     _prod: Production
+    _hash: int
 
     @abstractmethod
     def __init__(self, prod: Production):
@@ -49,6 +55,8 @@ class Node(ABC):
 
 class LeafNode(Node):
     '''Generic and abstract class for AST nodes that have no children'''
+    __slots__ = ()
+
     @abstractmethod
     def __init__(self, prod: Production):
         super().__init__(prod)
@@ -65,12 +73,17 @@ class LeafNode(Node):
 
 class AtomNode(LeafNode):
     '''Leaf AST node that holds string data'''
+    __slots__ = ()
 
     def __init__(self, prod: Production):
         if not prod.is_enum():
             raise ValueError(
                 'Cannot construct an AST atom node from a non-enum production')
+        if len(prod.rhs) == 0:
+            raise ValueError(
+                'Cannot construct an AST atom node from a symbolic enumset production')
         super().__init__(prod)
+        self._hash = hash((self.type, str(self.data)))
 
     @property
     def data(self) -> Any:
@@ -94,15 +107,17 @@ class AtomNode(LeafNode):
         '''
         Test whether this node is the same with ``other``. This function performs deep comparison rather than just comparing the object identity.
         '''
+        if self is other:
+            return True
         if isinstance(other, AtomNode):
             return self.type == other.type and self.data == other.data
         return False
 
     def deep_hash(self) -> int:
         '''
-        This function performs deep hash rather than just hashing the object identity.
+        This function performs deep hash rather than just hashing the object identity. The hash is computed once, when the node is constructed.
         '''
-        return hash((self.type, str(self.data)))
+        return self._hash
 
     def __repr__(self) -> str:
         return 'AtomNode({})'.format(self.data)
@@ -113,12 +128,14 @@ class AtomNode(LeafNode):
 
 class ParamNode(LeafNode):
     '''Leaf AST node that holds a param'''
+    __slots__ = ()
 
     def __init__(self, prod: Production):
         if not prod.is_param():
             raise ValueError(
                 'Cannot construct an AST param node from a non-param production')
         super().__init__(prod)
+        self._hash = hash(self.index)
 
     @property
     def index(self) -> int:
@@ -142,15 +159,17 @@ class ParamNode(LeafNode):
         '''
         Test whether this node is the same with ``other``. This function performs deep comparison rather than just comparing the object identity.
         '''
+        if self is other:
+            return True
         if isinstance(other, ParamNode):
             return self.index == other.index
         return False
 
     def deep_hash(self) -> int:
         '''
-        This function performs deep hash rather than just hashing the object identity.
+        This function performs deep hash rather than just hashing the object identity. The hash is computed once, when the node is constructed.
         '''
-        return hash(self.index)
+        return self._hash
 
     def __repr__(self) -> str:
         return 'ParamNode({})'.format(self.index)
@@ -161,6 +180,8 @@ class ParamNode(LeafNode):
 
 class ApplyNode(Node):
     '''Internal AST node that represent function application'''
+    __slots__ = ('_args',)
+
     _args: List[Node]
 
     def __init__(self, prod: Production, args: List[Node]):
@@ -174,11 +195,12 @@ class ApplyNode(Node):
             raise ValueError(msg)
         for index, (decl_ty, node) in enumerate(zip(prod.rhs, args)):
             actual_ty = node.type
-            if decl_ty != actual_ty:
+            if decl_ty is not actual_ty and decl_ty != actual_ty:
                 msg = 'Argument {} type mismatch: expected {} but found {}'.format(
                     index, decl_ty, actual_ty)
                 raise ValueError(msg)
         self._args = args
+        self._hash = hash((self.name, tuple([x._hash for x in args])))
 
     @property
     def name(self) -> str:
@@ -212,8 +234,11 @@ class ApplyNode(Node):
         '''
         Test whether this node is the same with ``other``. This function performs deep comparison rather than just comparing the object identity.
         '''
+        if self is other:
+            return True
         if isinstance(other, ApplyNode):
-            return self.name == other.name and \
+            return self._hash == other._hash and \
+                self.name == other.name and \
                 len(self.args) == len(other.args) and \
                 all(x.deep_eq(y)
                     for x, y in zip(self.args, other.args))
@@ -221,9 +246,9 @@ class ApplyNode(Node):
 
     def deep_hash(self) -> int:
         '''
-        This function performs deep hash rather than just hashing the object identity.
+        This function performs deep hash rather than just hashing the object identity. The hash is computed once, when the node is constructed.
         '''
-        return hash((self.name, tuple([x.deep_hash() for x in self.args])))
+        return self._hash
 
     def __repr__(self) -> str:
         return 'ApplyNode({}, {})'.format(self.name, self._args)
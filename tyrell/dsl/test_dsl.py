@@ -2,6 +2,7 @@ import unittest
 from .. import spec as S
 from .node import AtomNode, ParamNode, ApplyNode
 from .builder import Builder
+from .bank import ProgramBank
 from .iterator import bfs, dfs
 from .indexer import NodeIndexer
 from .parent_finder import ParentFinder
@@ -99,6 +100,111 @@ class TestDSL(unittest.TestCase):
         with self.assertRaises(ValueError):
             builder.make_apply('f', [])
 
+    def test_builder_intern(self):
+        builder = Builder(self._spec, intern=True)
+        self.assertTrue(builder.interning)
+        self.assertFalse(Builder(self._spec).interning)
+        sexp = '(g (f (EType0 e0) (@param 0)) (EType0 e1))'
+        node0 = builder.from_sexp_string(sexp)
+        node1 = builder.from_sexp_string(sexp)
+        self.assertIs(node0, node1)
+        self.assertIs(node0.args[0], builder.make_apply(
+            'f', [builder.make_enum('EType0', 'e0'), builder.make_param(0)]))
+        self.assertIsNot(node0.args[1], node0.args[0].args[0])
+
+        # Nodes from another builder are replaced by their canonical instances
+        foreign = Builder(self._spec).from_sexp_string(sexp)
+        self.assertIsNot(foreign, node0)
+        node2 = builder.make_apply('g', [foreign.args[0], foreign.args[1]])
+        self.assertIs(node2, node0)
+
+        # Canonical nodes do not outlive their users
+        num_nodes = len(builder._nodes)
+        builder.from_sexp_string('(g (f (EType0 e1) (@param 0)) (EType0 e0))')
+        self.assertEqual(len(builder._nodes), num_nodes)
+
+    def test_deep_hash(self):
+        builder = Builder(self._spec)
+        node0 = builder.from_sexp_string('(g (f (EType0 e0) (@param 0)) (EType0 e1))')
+        node1 = builder.from_sexp_string('(g (f (EType0 e1) (@param 0)) (EType0 e1))')
+        self.assertTrue(node0.deep_eq(node0))
+        self.assertFalse(node0.deep_eq(node1))
+        self.assertNotEqual(node0.deep_hash(), node1.deep_hash())
+        self.assertFalse(node0.deep_eq(node0.args[0]))
+
+    def test_slots(self):
+        builder = Builder(self._spec)
+        node = builder.from_sexp_string('(g (f (EType0 e0) (@param 0)) (EType0 e1))')
+        for x in dfs(node):
+            self.assertFalse(hasattr(x, '__dict__'))
+            self.assertFalse(hasattr(x.production, '__dict__'))
+
+    def test_program_bank(self):
+        builder = Builder(self._spec)
+        bank = ProgramBank(self._spec)
+        sexp = '(g (f (EType0 e0) (@param 0)) (EType0 e1))'
+        row0 = bank.add(builder.from_sexp_string(sexp))
+        self.assertEqual(len(bank), 5)
+        self.assertEqual(str(bank.get(row0)), str(builder.from_sexp_string(sexp)))
+        self.assertEqual(bank.production_id(row0), self._prod3.id)
+
+        # Build g(g(f(e0, @param0), e1), e0) from the rows of the first program
+        f_row, e1_row = bank.children(row0)
+        e0_row = bank.children(f_row)[0]
+        row1 = bank.add_node(self._prod3.id, [row0, e0_row])
+        self.assertEqual(len(bank), 6)
+        self.assertEqual(str(bank.get(row1)), 'g(g(f(e0, @param0), e1), e0)')
+        self.assertGreater(bank.nbytes, 0)
+
+        # Shared subtrees are stored once
+        intern_builder = Builder(self._spec, intern=True)
+        prog = intern_builder.from_sexp_string('(g (g (f (EType0 e0) (@param 0)) (EType0 e0)) (EType0 e0))')
+        num_rows = len(bank)
+        bank.add(prog)
+        self.assertEqual(len(bank) - num_rows, 5)
+
+        with self.assertRaises(ValueError):
+            bank.add_node(self._prod3.id, [row0])
+        with self.assertRaises(ValueError):
+            bank.add_node(self._prod3.id, [e0_row, e1_row])
+        with self.assertRaises(ValueError):
+            bank.add_node(self._prod0.id, [row0])
+        with self.assertRaises(KeyError):
+            bank.add_node(self._prod3.id, [row0, len(bank)])
+        with self.assertRaises(KeyError):
+            bank.get(len(bank))
+
+    def test_enum_set(self):
+        spec = S.parse(r'''
+            enumset Cols[2] {
+              "a", "b", "c"
+            }
+            value Table;
+            program P(Table) -> Table;
+            func select: Table -> Table, Cols;
+        ''')
+        cols = spec.get_productions_with_lhs('Cols')[0]
+        builder = Builder(spec, intern=True)
+        node0 = builder.make_enum('Cols', ['a', 'c'])
+        self.assertListEqual(node0.data, ['a', 'c'])
+        self.assertEqual(node0.production, cols.with_choice(4))
+        self.assertIs(builder.make_node(cols.with_choice(4)), node0)
+        self.assertIsNot(builder.make_enum('Cols', ['b', 'c']), node0)
+        with self.assertRaises(ValueError):
+            builder.make_node(cols)
+        with self.assertRaises(ValueError):
+            AtomNode(cols)
+
+        bank = ProgramBank(spec)
+        row0 = bank.add(builder.from_sexp_string('(select (@param 0) (Cols ("a" "c")))'))
+        self.assertEqual(str(bank.get(row0)), 'select(@param0, [\'a\', \'c\'])')
+        param_row = bank.children(row0)[0]
+        row1 = bank.add_node(spec.get_function_production_or_raise('select'),
+                             [param_row, bank.add_node(cols.with_choice(0))])
+        self.assertEqual(str(bank.get(row1)), 'select(@param0, [\'a\'])')
+        with self.assertRaises(ValueError):
+            bank.add_node(cols.id)
+
     def test_iterator(self):
         builder = Builder(self._spec)
         node0 = builder.make_enum('EType0', 'e0')
@@ -1,5 +1,6 @@
 from .enumerator import Enumerator
 from .smt import SmtEnumerator
-from .random import RandomEnumerator
-from .exhaustive import ExhaustiveEnumerator
+from .random import RandomEnumerator, WeightedRandomEnumerator
+from .exhaustive import ExhaustiveEnumerator, SizedExhaustiveEnumerator
+from .bottom_up import BottomUpEnumerator
 from .from_iterator import FromIteratorEnumerator, make_empty_enumerator, make_singleton_enumerator, make_list_enumerator
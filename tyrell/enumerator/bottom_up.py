@@ -0,0 +1,158 @@
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+from itertools import product
+from ..spec import TyrellSpec, ProductionIndex
+from ..dsl import Node, Builder
+from ..interpreter import Interpreter, PostOrderInterpreter, InterpreterError
+from .from_iterator import FromIteratorEnumerator
+from .util import compositions
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(_freeze(x) for x in value))
+    try:
+        hash(value)
+    except TypeError:
+        return (type(value), repr(value))
+    # The type tells apart values that compare equal, such as 1, 1.0 and True
+    return (type(value), value)
+
+
+def default_fingerprint(values: List[Any]) -> Hashable:
+    '''
+    Turn a list of values into a hashable key, comparing lists and tuples element-wise and other values with `==`. Unhashable values other than lists and tuples are compared by `repr`.
+    '''
+    return tuple(_freeze(x) for x in values)
+
+
+class BottomUpIterator:
+    '''
+    Build programs by increasing size (number of nodes), for every type, from the programs of smaller sizes.
+    Each new program is evaluated on all the inputs. It is dropped if evaluation fails, or if a program of the same type already has the same fingerprint of values, since both programs are interchangeable on the inputs (observational equivalence). Only the programs of the output type are yielded.
+    '''
+
+    _builder: Builder
+    _interpreter: Interpreter
+    _inputs: List[List[Any]]
+    _max_size: int
+    _fingerprint: Callable[[List[Any]], Hashable]
+    _index: ProductionIndex
+    # For each type ID, the kept programs of each size together with their values on the inputs
+    _programs: List[List[List[Tuple[Node, List[Any]]]]]
+    _fingerprints: List[Set[Hashable]]
+    _num_pruned: int
+
+    def __init__(self,
+                 spec: TyrellSpec,
+                 interpreter: Interpreter,
+                 inputs: List[List[Any]],
+                 max_size: int,
+                 fingerprint: Optional[Callable[[List[Any]], Hashable]] = None):
+        if max_size <= 0:
+            raise ValueError(
+                'Max size cannot be non-positive: {}'.format(max_size))
+        if len(inputs) == 0:
+            raise ValueError('BottomUpIterator needs at least one input')
+        self._builder = Builder(spec)
+        self._interpreter = interpreter
+        self._inputs = inputs
+        self._max_size = max_size
+        self._fingerprint = fingerprint if fingerprint is not None else default_fingerprint
+        self._index = spec.index
+        self._programs = [[[]] for _ in range(self._index.num_types())]
+        self._fingerprints = [set() for _ in range(self._index.num_types())]
+        self._num_pruned = 0
+
+    @property
+    def num_pruned(self) -> int:
+        '''Number of programs dropped because they were equivalent to a smaller one, or failed to evaluate'''
+        return self._num_pruned
+
+    @property
+    def num_programs(self) -> int:
+        '''Number of programs kept so far, of all types'''
+        return sum(len(x) for sizes in self._programs for x in sizes)
+
+    def _evaluate(self, node: Node, children: Tuple[Tuple[Node, List[Any]], ...]) -> Optional[List[Any]]:
+        try:
+            if isinstance(self._interpreter, PostOrderInterpreter):
+                # Reuse the values of the children
+                return [self._interpreter.step(node, [x[1][i] for x in children], inputs)
+                        for i, inputs in enumerate(self._inputs)]
+            return [self._interpreter.eval(node, inputs) for inputs in self._inputs]
+        except InterpreterError:
+            return None
+
+    def _candidates(self, child_type_ids: Tuple[int, ...], size: int) -> Iterator[Tuple[Tuple[Node, List[Any]], ...]]:
+        if len(child_type_ids) == 0:
+            if size == 1:
+                yield ()
+            return
+        for sizes in compositions(size - 1, len(child_type_ids)):
+            if any(x >= len(self._programs[ty]) for ty, x in zip(child_type_ids, sizes)):
+                continue
+            yield from product(*[self._programs[ty][x] for ty, x in zip(child_type_ids, sizes)])
+
+    def iter(self) -> Iterator[Node]:
+        index = self._index
+        output = index.type_id(self._builder.output)
+        # Each production with the type IDs of its LHS and children, leaves first
+        leaves, functions = [], []
+        for prod in self._builder.productions():
+            lhs_id = index.lhs_ids[prod.id]
+            if index.is_leaf[prod.id]:
+                # Every value of an enumset is a program of size 1
+                leaves.extend((x, lhs_id, ()) for x in prod.instances())
+            else:
+                functions.append((prod, lhs_id, index.child_type_ids(prod.id)))
+        prods = leaves + functions
+        for size in range(1, self._max_size + 1):
+            for sizes in self._programs:
+                sizes.append([])
+            for prod, lhs_id, child_type_ids in prods:
+                if len(child_type_ids) > size - 1:
+                    continue
+                for children in self._candidates(child_type_ids, size):
+                    node = self._builder.make_node(prod, [x[0] for x in children])
+                    values = self._evaluate(node, children)
+                    if values is None:
+                        self._num_pruned += 1
+                        continue
+                    key = self._fingerprint(values)
+                    fingerprints = self._fingerprints[lhs_id]
+                    if key in fingerprints:
+                        self._num_pruned += 1
+                        continue
+                    fingerprints.add(key)
+                    self._programs[lhs_id][size].append((node, values))
+                    if lhs_id == output:
+                        # A kept program may reuse another one several times, e.g. plus(x, x), but clients expect trees
+                        yield self._builder.unshare(node)
+
+
+class BottomUpEnumerator(FromIteratorEnumerator):
+    '''
+    Enumerate the programs of the output type by increasing size, up to `max_size` nodes, keeping only one program per distinct behavior on the example `inputs`. See `BottomUpIterator`.
+    With a `PostOrderInterpreter`, a new program is evaluated from the values of its subprograms, so each program costs one DSL operation per input. Other interpreters evaluate whole programs.
+    `fingerprint` maps the list of values of a program on the inputs to a hashable key. Two programs of the same type whose keys are equal are considered equivalent. It defaults to `default_fingerprint`; pass a custom one for values that do not compare meaningfully with `==` or `repr` (e.g. data frames in an external runtime), or to compare values up to some tolerance.
+    '''
+
+    _iterator: BottomUpIterator
+
+    def __init__(self,
+                 spec: TyrellSpec,
+                 interpreter: Interpreter,
+                 inputs: List[List[Any]],
+                 max_size: int,
+                 fingerprint: Optional[Callable[[List[Any]], Hashable]] = None):
+        self._iterator = BottomUpIterator(
+            spec, interpreter, inputs, max_size, fingerprint)
+        super().__init__(self._iterator.iter())
+
+    @property
+    def num_pruned(self) -> int:
+        return self._iterator.num_pruned
+
+    @property
+    def num_programs(self) -> int:
+        return self._iterator.num_programs
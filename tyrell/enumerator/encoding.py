@@ -0,0 +1,205 @@
+from abc import ABC, abstractmethod
+from typing import Any, Iterable, List, Tuple
+from z3 import *
+
+
+def id_ranges(ids: Iterable[int]) -> List[Tuple[int, int]]:
+    '''Return the sorted, inclusive ranges of consecutive integers that make up `ids`'''
+    ranges: List[Tuple[int, int]] = []
+    for x in sorted(set(ids)):
+        if len(ranges) > 0 and ranges[-1][1] == x - 1:
+            ranges[-1] = (ranges[-1][0], x)
+        else:
+            ranges.append((x, x))
+    return ranges
+
+
+class ProductionEncoding(ABC):
+    '''
+    Describe how the SMT enumerator represents the production chosen at a k-tree node, as well as the flag that tells whether a node is a function.
+    The variable handles returned by `mk_var()` and `mk_flag()` are opaque: the enumerator and the optimizer only access them through the methods of this class.
+    '''
+    _num_productions: int
+
+    def __init__(self, num_productions: int):
+        self._num_productions = num_productions
+
+    @property
+    def num_productions(self) -> int:
+        return self._num_productions
+
+    @abstractmethod
+    def mk_var(self, solver, name: str) -> Any:
+        '''Create the variable(s) for a node named `name`, add their domain constraints to `solver` and return a handle'''
+        raise NotImplementedError
+
+    @abstractmethod
+    def eq(self, var, pid: int):
+        '''Return a z3 formula that holds iff `var` is assigned production `pid`'''
+        raise NotImplementedError
+
+    def ne(self, var, pid: int):
+        '''Return a z3 formula that holds iff `var` is not assigned production `pid`'''
+        return Not(self.eq(var, pid))
+
+    def in_ranges(self, var, ranges: List[Tuple[int, int]]):
+        '''
+        Return a z3 formula that holds iff `var` is assigned a production whose id is in one of the inclusive `ranges` (see `id_ranges()`).
+        Productions of the same type have consecutive ids, so encodings that can compare ids need one constraint per type rather than one per production.
+        '''
+        return Or([self.eq(var, pid) for lo, hi in ranges for pid in range(lo, hi + 1)])
+
+    @abstractmethod
+    def decode(self, model, var) -> int:
+        '''Return the production id assigned to `var` in `model`'''
+        raise NotImplementedError
+
+    @abstractmethod
+    def same(self, var0, var1):
+        '''Return a z3 formula that holds iff `var0` and `var1` are assigned the same production'''
+        raise NotImplementedError
+
+    @abstractmethod
+    def lt(self, var0, var1):
+        '''Return a z3 formula that holds iff the production id of `var0` is smaller than the one of `var1`'''
+        raise NotImplementedError
+
+    def mk_flag(self, solver, name: str) -> Any:
+        '''Create the function flag of a node named `name`'''
+        return Bool(name)
+
+    def flag_is(self, flag, value: bool):
+        '''Return a z3 formula that holds iff `flag` has the given truth value'''
+        return flag if value else Not(flag)
+
+    def count_flags(self, flags: List[Any], k: int):
+        '''Return a z3 formula that holds iff exactly `k` of the `flags` are set'''
+        return PbEq([(f, 1) for f in flags], k)
+
+
+class IntEncoding(ProductionEncoding):
+    '''Each node is an integer variable ranging over the production ids, and each flag an integer in [0, 1]'''
+
+    def __init__(self, num_productions: int):
+        super().__init__(num_productions)
+
+    def mk_var(self, solver, name: str):
+        v = Int(name)
+        solver.add(And(v >= 0, v < self._num_productions))
+        return v
+
+    def eq(self, var, pid: int):
+        return var == pid
+
+    def ne(self, var, pid: int):
+        return var != pid
+
+    def in_ranges(self, var, ranges: List[Tuple[int, int]]):
+        return Or([var == lo if lo == hi else And(var >= lo, var <= hi) for lo, hi in ranges])
+
+    def decode(self, model, var) -> int:
+        return model.eval(var, model_completion=True).as_long()
+
+    def same(self, var0, var1):
+        return var0 == var1
+
+    def lt(self, var0, var1):
+        return var0 < var1
+
+    def mk_flag(self, solver, name: str):
+        h = Int(name)
+        solver.add(And(h >= 0, h <= 1))
+        return h
+
+    def flag_is(self, flag, value: bool):
+        return flag == (1 if value else 0)
+
+    def count_flags(self, flags: List[Any], k: int):
+        return Sum(flags) == k
+
+
+class OneHotEncoding(ProductionEncoding):
+    '''Each node is a list of boolean variables, one per production, exactly one of which is true'''
+
+    def __init__(self, num_productions: int):
+        super().__init__(num_productions)
+
+    def mk_var(self, solver, name: str):
+        bs = [Bool('{}_p{}'.format(name, x)) for x in range(self._num_productions)]
+        solver.add(PbEq([(b, 1) for b in bs], 1))
+        return bs
+
+    def eq(self, var, pid: int):
+        return var[pid]
+
+    def decode(self, model, var) -> int:
+        for pid, b in enumerate(var):
+            if is_true(model.eval(b, model_completion=True)):
+                return pid
+        raise RuntimeError('No production is selected in the model')
+
+    def same(self, var0, var1):
+        return And([b0 == b1 for b0, b1 in zip(var0, var1)])
+
+    def lt(self, var0, var1):
+        def value(var):
+            return Sum([If(b, pid, 0) for pid, b in enumerate(var)])
+        return value(var0) < value(var1)
+
+
+class BitVecEncoding(ProductionEncoding):
+    '''Each node is a bit-vector of ceil(log2(P)) bits holding the production id'''
+    _width: int
+
+    def __init__(self, num_productions: int):
+        super().__init__(num_productions)
+        self._width = max(1, (num_productions - 1).bit_length())
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    def mk_var(self, solver, name: str):
+        v = BitVec(name, self._width)
+        if self._num_productions < (1 << self._width):
+            solver.add(ULT(v, self._num_productions))
+        return v
+
+    def eq(self, var, pid: int):
+        return var == BitVecVal(pid, self._width)
+
+    def ne(self, var, pid: int):
+        return var != BitVecVal(pid, self._width)
+
+    def in_ranges(self, var, ranges: List[Tuple[int, int]]):
+        return Or([self.eq(var, lo) if lo == hi else
+                   And(ULE(BitVecVal(lo, self._width), var), ULE(var, BitVecVal(hi, self._width)))
+                   for lo, hi in ranges])
+
+    def decode(self, model, var) -> int:
+        return model.eval(var, model_completion=True).as_long()
+
+    def same(self, var0, var1):
+        return var0 == var1
+
+    def lt(self, var0, var1):
+        return ULT(var0, var1)
+
+
+_encodings = {
+    'int': IntEncoding,
+    'onehot': OneHotEncoding,
+    'bitvec': BitVecEncoding,
+}
+
+
+def make_encoding(name: str, num_productions: int) -> ProductionEncoding:
+    '''
+    Create the encoding called `name`, which is one of "int", "onehot" or "bitvec".
+    Raise `ValueError` if the name is not recognized.
+    '''
+    cls = _encodings.get(name)
+    if cls is None:
+        raise ValueError('Unknown production encoding: {}. Expected one of {}'.format(
+            name, ', '.join(sorted(_encodings.keys()))))
+    return cls(num_productions)
@@ -1,6 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Any
+from typing import Optional, Any, List, Sequence
 from ..dsl import Node
+from ..spec import Predicate
+
+
+def check_predicate_arg_types(pred: Predicate, python_tys: Sequence[Any]) -> None:
+    '''
+    Check that the leading arguments of `pred` are instances of the given python types, as enumerators expect before they resolve a predicate.
+    Raise `ValueError` otherwise.
+    '''
+    if pred.num_args() < len(python_tys):
+        msg = 'Predicate "{}" must have at least {} arugments. Only {} is found.'.format(
+            pred.name, len(python_tys), pred.num_args())
+        raise ValueError(msg)
+    for index, (arg, python_ty) in enumerate(zip(pred.args, python_tys)):
+        if not isinstance(arg, python_ty):
+            msg = 'Argument {} of predicate {} has unexpected type.'.format(
+                index, pred.name)
+            raise ValueError(msg)
 
 
 class Enumerator(ABC):
@@ -17,6 +34,20 @@ class Enumerator(ABC):
         '''
         raise NotImplementedError
 
+    def next_batch(self, k: int) -> List[Node]:
+        '''
+        Enumerate up to `k` ASTs at once. The returned list is shorter than `k` only if the enumerator is exhausted.
+        `update()` may be called on any of the returned ASTs afterwards.
+        By default, it calls `next()` repeatedly. Subclasses may override it with a faster implementation.
+        '''
+        progs = []
+        while len(progs) < k:
+            prog = self.next()
+            if prog is None:
+                break
+            progs.append(prog)
+        return progs
+
     def update(self, info: Any=None) -> None:
         '''
         Update the internal state of the enumerator. This can be useful when trying to prune the search space.
@@ -1,14 +1,17 @@
-from typing import Iterator
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from itertools import product
-from ..spec import TyrellSpec, Type
+from ..spec import TyrellSpec, Production
 from ..dsl import Node, Builder
 from .enumerator import Enumerator
 from .from_iterator import FromIteratorEnumerator
+from .util import compositions, split_productions
 
 
 class ExhaustiveIterator:
     _builder: Builder
     _max_depth: int
+    _leaves: List[List[Production]]
+    _functions: List[List[Tuple[Production, Tuple[int, ...]]]]
 
     def __init__(self, spec: TyrellSpec, max_depth: int):
         self._builder = Builder(spec)
@@ -16,25 +19,16 @@ class ExhaustiveIterator:
             raise ValueError(
                 'Max depth cannot be non-positive: {}'.format(max_depth))
         self._max_depth = max_depth
+        self._leaves, self._functions = split_productions(spec.index)
 
-    def _do_iter(self, ty: Type, curr_depth: int) -> Iterator[Node]:
-        prods = self._builder.get_productions_with_lhs(ty)
-        enum_prods, param_prods, func_prods = [], [], []
-        force_leaf = curr_depth >= self._max_depth - 1
-        for prod in prods:
-            if prod.is_enum():
-                enum_prods.append(prod)
-            elif prod.is_param():
-                param_prods.append(prod)
-            elif not force_leaf and prod.is_function():
-                func_prods.append(prod)
-
-        for prod in enum_prods:
-            yield self._builder.make_node(prod)
-        for prod in param_prods:
-            yield self._builder.make_node(prod)
-        for prod in func_prods:
-            child_iters = [self._do_iter(x, curr_depth + 1) for x in prod.rhs]
+    def _do_iter(self, type_id: int, curr_depth: int) -> Iterator[Node]:
+        for prod in self._leaves[type_id]:
+            for inst in prod.instances():
+                yield self._builder.make_node(inst)
+        if curr_depth >= self._max_depth - 1:
+            return
+        for prod, child_type_ids in self._functions[type_id]:
+            child_iters = [self._do_iter(x, curr_depth + 1) for x in child_type_ids]
             for children in product(*child_iters):
                 yield self._builder.make_node(prod, children)
 
@@ -42,10 +36,125 @@ class ExhaustiveIterator:
         if self._builder.num_productions() == 0:
             return iter(())
         else:
-            return self._do_iter(self._builder.output, 0)
+            return self._do_iter(self._builder.index.type_id(self._builder.output), 0)
 
 
 class ExhaustiveEnumerator(FromIteratorEnumerator):
 
     def __init__(self, spec: TyrellSpec, max_depth: int):
         super().__init__(ExhaustiveIterator(spec, max_depth).iter())
+
+
+class SizedExhaustiveIterator:
+    '''
+    Enumerate all the programs of the output type with at most `max_size` nodes, in order of increasing size.
+    The programs of each (type, size) pair are generated once and kept in a table that is shared by all the parents that need them. Once `max_cached` programs are kept, the tables that do not fit anymore are regenerated every time they are needed instead, trading time for memory.
+    '''
+
+    _builder: Builder
+    _max_size: int
+    _max_cached: int
+    _num_cached: int
+    # Tables are keyed by type ID and size
+    _tables: Dict[Tuple[int, int], List[Node]]
+    _spilled: Set[Tuple[int, int]]
+    _pending: Set[Tuple[int, int]]
+    _leaves: List[List[Production]]
+    _functions: List[List[Tuple[Production, Tuple[int, ...]]]]
+
+    def __init__(self, spec: TyrellSpec, max_size: int, max_cached: int = 1 << 20):
+        self._builder = Builder(spec)
+        if max_size <= 0:
+            raise ValueError(
+                'Max size cannot be non-positive: {}'.format(max_size))
+        if max_cached < 0:
+            raise ValueError(
+                'Max cached cannot be negative: {}'.format(max_cached))
+        self._max_size = max_size
+        self._max_cached = max_cached
+        self._num_cached = 0
+        self._tables = dict()
+        self._spilled = set()
+        self._pending = set()
+        self._leaves, self._functions = split_productions(spec.index)
+
+    @property
+    def num_cached(self) -> int:
+        '''Number of programs kept in the tables'''
+        return self._num_cached
+
+    def _generate(self, type_id: int, size: int) -> Iterator[Node]:
+        if size == 1:
+            for prod in self._leaves[type_id]:
+                for inst in prod.instances():
+                    yield self._builder.make_node(inst)
+            return
+        for prod, child_type_ids in self._functions[type_id]:
+            if len(child_type_ids) <= size - 1:
+                for sizes in compositions(size - 1, len(child_type_ids)):
+                    for children in self._product(child_type_ids, sizes):
+                        yield self._builder.make_node(prod, list(children))
+
+    def _product(self, types: Tuple[int, ...], sizes: Tuple[int, ...]) -> Iterator[Tuple[Node, ...]]:
+        # Unlike itertools.product, this does not hold the programs of a spilled table in memory, but iterates over them again for each prefix
+        if len(types) == 0:
+            yield ()
+            return
+        for rest in self._product(types[1:], sizes[1:]):
+            for first in self._iter(types[0], sizes[0]):
+                yield (first,) + rest
+
+    def _iter(self, type_id: int, size: int) -> Iterator[Node]:
+        key = (type_id, size)
+        table = self._tables.get(key)
+        if table is not None:
+            yield from table
+            return
+        if key in self._spilled or key in self._pending:
+            # A table that is being filled, e.g. for the first argument of plus(x, y) while iterating over y, is generated again
+            yield from self._generate(type_id, size)
+            return
+        table = []
+        self._pending.add(key)
+        try:
+            for node in self._generate(type_id, size):
+                if table is not None:
+                    if self._num_cached < self._max_cached:
+                        table.append(node)
+                        self._num_cached += 1
+                    else:
+                        self._num_cached -= len(table)
+                        table = None
+                        self._spilled.add(key)
+                yield node
+            if table is not None:
+                self._tables[key] = table
+                table = None
+        finally:
+            self._pending.discard(key)
+            # The iteration stopped early, so the table is incomplete
+            if table is not None:
+                self._num_cached -= len(table)
+
+    def iter(self) -> Iterator[Node]:
+        output = self._builder.index.type_id(self._builder.output)
+        for size in range(1, self._max_size + 1):
+            for node in self._iter(output, size):
+                # Programs share the subtrees of the tables, and a program may hold the same subtree twice
+                yield self._builder.unshare(node)
+
+
+class SizedExhaustiveEnumerator(FromIteratorEnumerator):
+    '''
+    Enumerate all the programs with at most `max_size` nodes, smallest first. See `SizedExhaustiveIterator`.
+    '''
+
+    _iterator: SizedExhaustiveIterator
+
+    def __init__(self, spec: TyrellSpec, max_size: int, max_cached: int = 1 << 20):
+        self._iterator = SizedExhaustiveIterator(spec, max_size, max_cached)
+        super().__init__(self._iterator.iter())
+
+    @property
+    def num_cached(self) -> int:
+        return self._iterator.num_cached
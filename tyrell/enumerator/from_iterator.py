@@ -1,5 +1,6 @@
 from .enumerator import Enumerator
 from typing import Optional, List, Iterator
+from itertools import islice
 from ..dsl import Node
 
 
@@ -19,6 +20,9 @@ class FromIteratorEnumerator(Enumerator):
         except StopIteration:
             return None
 
+    def next_batch(self, k: int) -> List[Node]:
+        return list(islice(self._iter, k))
+
 
 def make_empty_enumerator() -> Enumerator:
     '''Return an enumerator that enumerates nothing.'''
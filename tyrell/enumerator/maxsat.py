@@ -0,0 +1,203 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List
+from z3 import *
+
+
+class MaxSatEngine(ABC):
+    '''
+    Algorithm used by the `Optimizer` to find a model of minimum cost.
+    The soft constraints are described by `optimizer.soft_literals`: assuming the i-th literal forces the i-th boolean relaxation variable to false, and violating it costs `optimizer.weights[i]`.
+    Soft constraints may be added to the optimizer after the engine is created, so engines must not assume the set of soft literals is fixed.
+    '''
+
+    @abstractmethod
+    def optimize(self, optimizer, solver, assumptions):
+        '''
+        Return a model of `solver` of minimum cost that satisfies `assumptions`, or `None` if no such model exists.
+        The solver must be left with no open scope.
+        '''
+        raise NotImplementedError
+
+    def reset(self):
+        '''Forget whatever was learned about the optimum under the previous assumptions'''
+        pass
+
+
+class LinearSearchEngine(MaxSatEngine):
+    '''
+    Linear search from below (LSU) on the pseudo-boolean constraint `Sum(weight * relax) <= bound`.
+    Since the enumerator only ever blocks models, the optimum never decreases and the search resumes from the cost of the last model.
+    '''
+    _bound: int
+    _reachable: int
+    _num_weights: int
+
+    def __init__(self):
+        self._bound = 0
+        # bit i is set iff some subset of the weights sums to i
+        self._reachable = 1
+        self._num_weights = 0
+
+    @property
+    def bound(self) -> int:
+        return self._bound
+
+    def reset(self):
+        self._bound = 0
+
+    def _update_reachable(self, weights: List[int]):
+        for w in weights[self._num_weights:]:
+            if w != int(w):
+                raise ValueError(
+                    'Linear search requires integer weights: {}'.format(w))
+            self._reachable |= self._reachable << int(w)
+        self._num_weights = len(weights)
+
+    def _next_bound(self, bound: int) -> int:
+        '''Return the smallest cost greater than `bound` that some subset of the weights can reach'''
+        higher = self._reachable >> (bound + 1)
+        assert higher != 0
+        return bound + (higher & -higher).bit_length()
+
+    def optimize(self, optimizer, solver, assumptions):
+        self._update_reachable(optimizer.weights)
+        solver.set(unsat_core=True)
+        obj = Bool('obj')
+        while True:
+            solver.push()
+            ctr = PbLe([(v, int(w)) for v, w in zip(optimizer.relax_vars, optimizer.weights)],
+                       self._bound)
+            solver.assert_and_track(ctr, obj)
+            res = optimizer.check(solver, assumptions)
+            if res == sat:
+                model = solver.model()
+                solver.pop()
+                cost = optimizer.computeCost(model)
+                assert cost == self._bound
+                return model
+            core = solver.unsat_core()
+            solver.pop()
+            # Without the objective in the core, the constraints (and assumptions) are unsat by themselves
+            if not any(eq(obj, x) for x in core) or self._bound >= optimizer.ub:
+                return None
+            self._bound = self._next_bound(self._bound)
+
+
+class CoreGuidedEngine(MaxSatEngine):
+    '''
+    Stratified core-guided search (OLL).
+    Soft literals are assumed in decreasing order of weight. Each unsatisfiable core raises the lower bound by the minimum weight in the core and is relaxed with a cardinality constraint that allows one more of its literals to be violated.
+    The cardinality constraints are only enforced when their literal is assumed, and blocking models only adds hard constraints, hence the relaxed soft literals remain valid across calls as long as the assumptions do not change.
+    '''
+
+    def __init__(self):
+        # number of cardinality literals created so far, used to name them
+        self._num_cards = 0
+        self.reset()
+
+    def reset(self):
+        self._assumptions = None
+        # soft literal id -> [literal, remaining weight]
+        self._softs: Dict[int, list] = {}
+        # cardinality literal id -> (inputs, bound)
+        self._cards: Dict[int, tuple] = {}
+        self._num_softs = 0
+
+    def _sync(self, optimizer, assumptions):
+        key = [x.get_id() for x in assumptions]
+        if key != self._assumptions:
+            # The cores learned so far may depend on the previous assumptions
+            self.reset()
+            self._assumptions = key
+        for i in range(self._num_softs, len(optimizer.soft_literals)):
+            lit = optimizer.soft_literals[i]
+            self._softs[lit.get_id()] = [lit, optimizer.weights[i]]
+        self._num_softs = len(optimizer.soft_literals)
+
+    def optimize(self, optimizer, solver, assumptions):
+        self._sync(optimizer, assumptions)
+        softs = self._softs
+        threshold = max((w for _, w in softs.values()), default=0)
+        while True:
+            active = [lit for lit, w in softs.values() if w >= threshold]
+            res = optimizer.check(solver, assumptions + active)
+            if res == sat:
+                lower = [w for _, w in softs.values() if w < threshold]
+                if len(lower) == 0:
+                    return solver.model()
+                threshold = max(lower)
+                continue
+
+            core = [softs[x.get_id()] for x in solver.unsat_core()
+                    if x.get_id() in softs]
+            # The hard constraints (and assumptions) are unsat by themselves
+            if len(core) == 0:
+                return None
+            m = min(w for _, w in core)
+            for entry in core:
+                lit = entry[0]
+                entry[1] -= m
+                if entry[1] == 0:
+                    del softs[lit.get_id()]
+                # Allow one more input of a relaxed core to be violated
+                card = self._cards.get(lit.get_id())
+                if card is not None and card[1] + 1 < len(card[0]):
+                    self._add_card(solver, card[0], card[1] + 1, m)
+            inputs = [lit for lit, _ in core]
+            if len(inputs) > 1:
+                self._add_card(solver, inputs, 1, m)
+
+    def _add_card(self, solver, inputs, k, weight):
+        '''Create a soft literal of cost `weight` that holds when at most `k` of the `inputs` are false'''
+        lit = Bool('card' + str(self._num_cards))
+        self._num_cards += 1
+        solver.add(Implies(lit, AtMost(*[Not(x) for x in inputs], k)))
+        self._softs[lit.get_id()] = [lit, weight]
+        self._cards[lit.get_id()] = (inputs, k)
+
+
+class Z3OptimizeEngine(MaxSatEngine):
+    '''
+    Delegate the optimization to z3's own MaxSAT solver.
+    The constraints of `solver` are copied into a persistent `Optimize` instance as they are added.
+    '''
+
+    def __init__(self):
+        self._opt = Optimize()
+        self._num_assertions = 0
+        self._num_softs = 0
+
+    def _sync(self, optimizer, solver):
+        # Only the assertions at the base level are permanent
+        assert solver.num_scopes() == 0
+        assertions = solver.assertions()
+        for i in range(self._num_assertions, len(assertions)):
+            self._opt.add(assertions[i])
+        self._num_assertions = len(assertions)
+        for i in range(self._num_softs, len(optimizer.soft_literals)):
+            self._opt.add_soft(optimizer.soft_literals[i], optimizer.weights[i])
+        self._num_softs = len(optimizer.soft_literals)
+
+    def optimize(self, optimizer, solver, assumptions):
+        self._sync(optimizer, solver)
+        res = optimizer.check(self._opt, assumptions)
+        return self._opt.model() if res == sat else None
+
+
+_engines = {
+    'lsu': LinearSearchEngine,
+    'core': CoreGuidedEngine,
+    'z3': Z3OptimizeEngine,
+}
+
+
+def make_engine(name: str) -> MaxSatEngine:
+    '''
+    Create the optimization engine called `name`, which is one of "lsu", "core" or "z3".
+    Raise `ValueError` if the name is not recognized.
+    '''
+    cls = _engines.get(name)
+    if cls is None:
+        raise ValueError('Unknown MaxSAT engine: {}. Expected one of {}'.format(
+            name, ', '.join(sorted(_engines.keys()))))
+    return cls()
@@ -1,6 +1,6 @@
-from typing import Set, Optional
+from typing import Any, Dict, List, Set, Optional, Tuple
 from random import Random
-from .enumerator import Enumerator
+from .enumerator import Enumerator, check_predicate_arg_types
 from .. import dsl as D
 from .. import spec as S
 
@@ -9,6 +9,9 @@ class RandomEnumerator(Enumerator):
     _rand: Random
     _max_depth: int
     _builder: D.Builder
+    _index: S.ProductionIndex
+    # The leaf productions of each type ID, in the same order as all its productions
+    _leaves: List[List[S.Production]]
 
     def __init__(self, spec: S.TyrellSpec, max_depth: int, seed: Optional[int]=None):
         self._rand = Random(seed)
@@ -17,31 +20,249 @@ class RandomEnumerator(Enumerator):
             raise ValueError(
                 'Max depth cannot be non-positive: {}'.format(max_depth))
         self._max_depth = max_depth
+        self._index = spec.index
+        self._leaves = [[x for x in self._index.productions_with_lhs_id(t) if self._index.is_leaf[x.id]]
+                        for t in range(self._index.num_types())]
 
-    def _do_generate(self, curr_type: S.Type, curr_depth: int, force_leaf: bool):
+    def _do_generate(self, curr_type: int, curr_depth: int, force_leaf: bool):
         # First, get all the relevant production rules for current type
-        productions = self._builder.get_productions_with_lhs(curr_type)
         if force_leaf:
-            productions = list(
-                filter(lambda x: not x.is_function(), productions))
+            productions = self._leaves[curr_type]
+        else:
+            productions = self._index.productions_with_lhs_id(curr_type)
         if len(productions) == 0:
             raise RuntimeError('RandomASTGenerator ran out of productions to try for type {} at depth {}'.format(
-                curr_type, curr_depth))
+                self._index.types[curr_type], curr_depth))
 
         # Pick a production rule uniformly at random
         prod = self._rand.choice(productions)
-        if not prod.is_function():
+        if prod.is_enum_set():
+            # Pick one of the values of the enumset uniformly at random
+            prod = prod.with_choice(self._rand.randrange(len(prod.lhs.domain)))
+        if not self._index.is_function[prod.id]:
             # make_node() will produce a leaf node
             return self._builder.make_node(prod)
         else:
             # Recursively expand the right-hand-side (generating children first)
-            children = [self._generate(x, curr_depth + 1) for x in prod.rhs]
+            children = [self._generate(x, curr_depth + 1) for x in self._index.child_type_ids(prod.id)]
             # make_node() will produce an internal node
             return self._builder.make_node(prod, children)
 
-    def _generate(self, curr_type: S.Type, curr_depth: int):
+    def _generate(self, curr_type: int, curr_depth: int):
         return self._do_generate(curr_type, curr_depth,
                                  force_leaf=(curr_depth >= self._max_depth - 1))
 
     def next(self):
-        return self._generate(self._builder.output, 0)
+        return self._generate(self._index.type_id(self._builder.output), 0)
+
+
+class BloomFilter:
+    '''
+    A fixed-size set of integers (e.g. structural hashes of ASTs) that may report false positives, but never false negatives.
+    '''
+    _bits: bytearray
+    _num_bits: int
+    _num_hashes: int
+
+    def __init__(self, num_bits: int = 1 << 23, num_hashes: int = 4):
+        if num_bits <= 0:
+            raise ValueError(
+                'Number of bits cannot be non-positive: {}'.format(num_bits))
+        if num_hashes <= 0:
+            raise ValueError(
+                'Number of hashes cannot be non-positive: {}'.format(num_hashes))
+        self._bits = bytearray((num_bits + 7) // 8)
+        self._num_bits = num_bits
+        self._num_hashes = num_hashes
+
+    def _positions(self, key: int) -> List[int]:
+        # Double hashing: the i-th position is h1 + i * h2
+        h1 = key & 0xffffffff
+        h2 = ((key >> 32) & 0xffffffff) | 1
+        return [(h1 + i * h2) % self._num_bits for i in range(self._num_hashes)]
+
+    def add(self, key: int) -> bool:
+        '''Add `key` to the set. Return whether it may have been there already'''
+        found = True
+        for pos in self._positions(key):
+            mask = 1 << (pos & 7)
+            if not self._bits[pos >> 3] & mask:
+                found = False
+                self._bits[pos >> 3] |= mask
+        return found
+
+    def __contains__(self, key: int) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class WeightedRandomEnumerator(Enumerator):
+    '''
+    Sample programs from a probabilistic grammar derived from the predicates of the spec, skipping the programs that were already sampled.
+    Every production starts with weight 1. `occurs(f, w)` multiplies the weight of `f` by `1 + w`, and `is_parent(f, g, w)` does the same for `g` when it is chosen as an argument of `f`. `not_occurs` and `is_not_parent` divide instead.
+    Predicates of weight 100 are hard constraints, as in SmtEnumerator. `not_occurs` and `is_not_parent` then rule the production out of the grammar, while the sampled programs that violate `occurs` or `is_parent` are rejected.
+    The productions of the nodes blamed in the information passed to `update()` have their weights multiplied by `blame_factor`.
+    Duplicates are detected with a Bloom filter of `bloom_bits` bits over structural hashes, so a few programs that were never sampled may be skipped as well. `next()` gives up and returns `None` after `max_attempts` rejected or duplicate samples in a row. So does `next_batch()`, which returns fewer programs than asked in that case.
+    '''
+    _rand: Random
+    _max_depth: int
+    _builder: D.Builder
+    _index: S.ProductionIndex
+    _weights: Dict[int, float]
+    _parent_factors: Dict[Tuple[int, int], float]
+    _penalties: Dict[int, float]
+    _blame_factor: float
+    _max_attempts: int
+    _seen: BloomFilter
+    _num_duplicates: int
+    _num_rejected: int
+    # Productions that must occur, and the productions one of which must be an argument of each occurrence of a parent
+    _required: Set[int]
+    _required_children: Dict[int, Set[int]]
+    # Cumulative weights of the candidate productions, keyed by type ID, parent production id and whether only leaves are allowed
+    _choices: Dict[Tuple[int, Optional[int], bool], Tuple[List[S.Production], List[float]]]
+
+    _hard_weight = 100
+    _min_penalty = 1e-3
+
+    def __init__(self,
+                 spec: S.TyrellSpec,
+                 max_depth: int,
+                 seed: Optional[int] = None,
+                 blame_factor: float = 0.5,
+                 max_attempts: int = 1000,
+                 bloom_bits: int = 1 << 23):
+        self._rand = Random(seed)
+        self._builder = D.Builder(spec)
+        self._index = spec.index
+        if max_depth <= 0:
+            raise ValueError(
+                'Max depth cannot be non-positive: {}'.format(max_depth))
+        if not 0 < blame_factor <= 1:
+            raise ValueError(
+                'Blame factor must be in (0, 1]: {}'.format(blame_factor))
+        if max_attempts <= 0:
+            raise ValueError(
+                'Max attempts cannot be non-positive: {}'.format(max_attempts))
+        self._max_depth = max_depth
+        self._blame_factor = blame_factor
+        self._max_attempts = max_attempts
+        self._seen = BloomFilter(bloom_bits)
+        self._num_duplicates = 0
+        self._num_rejected = 0
+        self._required = set()
+        self._required_children = dict()
+        self._weights = {x.id: 1.0 for x in spec.productions()}
+        self._parent_factors = dict()
+        self._penalties = dict()
+        self._choices = dict()
+        self._resolve_predicates(spec)
+
+    def _factor(self, weight: float, positive: bool) -> float:
+        if positive:
+            return 1.0 + weight
+        if weight == self._hard_weight:
+            return 0.0
+        return 1.0 / (1.0 + weight)
+
+    def _resolve_predicates(self, spec: S.TyrellSpec) -> None:
+        for pred in spec.predicates():
+            args = list(pred.args)
+            if pred.name in ('occurs', 'not_occurs'):
+                check_predicate_arg_types(pred, [str, (int, float)])
+                prod = spec.get_function_production_or_raise(args[0])
+                self._weights[prod.id] *= self._factor(
+                    args[1], pred.name == 'occurs')
+                if pred.name == 'occurs' and args[1] == self._hard_weight:
+                    self._required.add(prod.id)
+            elif pred.name in ('is_parent', 'is_not_parent'):
+                check_predicate_arg_types(pred, [str, str, (int, float)])
+                parent = spec.get_function_production_or_raise(args[0])
+                child = spec.get_function_production_or_raise(args[1])
+                key = (parent.id, child.id)
+                self._parent_factors[key] = self._parent_factors.get(key, 1.0) * \
+                    self._factor(args[2], pred.name == 'is_parent')
+                if pred.name == 'is_parent' and args[2] == self._hard_weight:
+                    self._required_children.setdefault(parent.id, set()).add(child.id)
+
+    @property
+    def num_duplicates(self) -> int:
+        '''Number of sampled programs that were skipped because they had been sampled before'''
+        return self._num_duplicates
+
+    @property
+    def num_rejected(self) -> int:
+        '''Number of sampled programs that were skipped because they violate a hard `occurs` or `is_parent` predicate'''
+        return self._num_rejected
+
+    def _get_choices(self, type_id: int, parent: Optional[int], force_leaf: bool):
+        key = (type_id, parent, force_leaf)
+        choices = self._choices.get(key)
+        if choices is None:
+            is_function = self._index.is_function
+            prods, cum_weights, total = [], [], 0.0
+            for prod in self._index.productions_with_lhs_id(type_id):
+                if force_leaf and is_function[prod.id]:
+                    continue
+                weight = self._weights[prod.id] * self._penalties.get(prod.id, 1.0) * \
+                    self._parent_factors.get((parent, prod.id), 1.0)
+                if weight > 0:
+                    total += weight
+                    prods.append(prod)
+                    cum_weights.append(total)
+            choices = (prods, cum_weights)
+            self._choices[key] = choices
+        return choices
+
+    def _generate(self, type_id: int, parent: Optional[int], curr_depth: int) -> D.Node:
+        prods, cum_weights = self._get_choices(
+            type_id, parent, curr_depth >= self._max_depth - 1)
+        if len(prods) == 0:
+            raise RuntimeError('WeightedRandomEnumerator ran out of productions to try for type {} at depth {}'.format(
+                self._index.types[type_id], curr_depth))
+        prod = self._rand.choices(prods, cum_weights=cum_weights)[0]
+        if prod.is_enum_set():
+            prod = prod.with_choice(self._rand.randrange(len(prod.lhs.domain)))
+        if not self._index.is_function[prod.id]:
+            return self._builder.make_node(prod)
+        children = [self._generate(x, prod.id, curr_depth + 1)
+                    for x in self._index.child_type_ids(prod.id)]
+        return self._builder.make_node(prod, children)
+
+    def _satisfies_hard_predicates(self, prog: D.Node) -> bool:
+        if len(self._required) == 0 and len(self._required_children) == 0:
+            return True
+        used = set()
+        for node in D.dfs(prog):
+            pid = node.production.id
+            used.add(pid)
+            children = self._required_children.get(pid)
+            if children is not None and not any(x.production.id in children for x in node.children):
+                return False
+        return self._required <= used
+
+    def next(self) -> Optional[D.Node]:
+        for _ in range(self._max_attempts):
+            prog = self._generate(self._index.type_id(self._builder.output), None, 0)
+            if not self._satisfies_hard_predicates(prog):
+                self._num_rejected += 1
+            elif self._seen.add(prog.deep_hash()):
+                self._num_duplicates += 1
+            else:
+                return prog
+        return None
+
+    def update(self, info: Any = None) -> None:
+        '''
+        Lower the weights of the productions of the blamed nodes, if `info` is a list of blames as given by the deciders.
+        '''
+        if info is None or isinstance(info, str):
+            return
+        blamed = set()
+        for core in info:
+            for _, prod in core:
+                blamed.add(prod.id)
+        for pid in blamed:
+            self._penalties[pid] = max(
+                self._penalties.get(pid, 1.0) * self._blame_factor, self._min_penalty)
+        if len(blamed) > 0:
+            self._choices.clear()
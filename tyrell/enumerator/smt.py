@@ -1,7 +1,10 @@
 from z3 import *
 from collections import deque
-from .enumerator import Enumerator
+from weakref import WeakKeyDictionary
+from .enumerator import Enumerator, check_predicate_arg_types
 from .optimizer import Optimizer
+from .encoding import make_encoding, id_ranges
+from .maxsat import make_engine
 
 from .. import dsl as D
 from ..logger import get_logger
@@ -36,111 +39,202 @@ class SmtEnumerator(Enumerator):
     # z3 variables to denote if a node is a function or not
     variables_fun = []
 
-    # map from internal k-tree to nodes of program
-    program2tree = {}
+    # map from nodes of program to internal k-tree
+    program2tree = WeakKeyDictionary()
+
+    # map from loc values to the literals that enable the corresponding loc constraint
+    loc_literals = {}
+
+    # lemmas learned from blames that have not been exported yet
+    lemmas = []
+
+    # map from (variable index, production id) to the literal that forbids the production at that node
+    ne_literals = {}
+
+    # symbolic productions of the enumset types
+    enum_set_productions = []
+
+    # map from (variable index, production id) to the bit-vector that holds the value of the enumset at that node, as a bitmask
+    masks = {}
 
     def initLeafProductions(self):
+        index = self.spec.index
         for p in self.spec.productions():
-            # FIXME: improve empty integration
-            if not p.is_function() or str(p).find('Empty') != -1:
+            if index.is_leaf[p.id] or index.is_empty[p.id]:
                 self.leaf_productions.append(p)
 
     def createVariables(self, solver):
         for x in range(0, len(self.nodes)):
             name = 'n' + str(x + 1)
-            v = Int(name)
+            # the encoding also adds the variable range constraints
+            v = self.encoding.mk_var(solver, name)
             self.variables.append(v)
-            # variable range constraints
-            solver.add(And(v >= 0, v < self.spec.num_productions()))
             hname = 'h' + str(x + 1)
-            h = Int(hname)
+            h = self.encoding.mk_flag(solver, hname)
             self.variables_fun.append(h)
-            # high variables range constraints
-            solver.add(And(h >= 0, h <= 1))
 
     def createOutputConstraints(self, solver):
         '''The output production matches the output type'''
-        ctr = None
-        for p in self.spec.get_productions_with_lhs(self.spec.output):
-            if ctr is None:
-                # variables[0] is the root of the tree
-                ctr = self.variables[0] == p.id
-            else:
-                ctr = Or(ctr, self.variables[0] == p.id)
-        solver.add(ctr)
+        # variables[0] is the root of the tree
+        index = self.spec.index
+        ids = index.ids_with_lhs_id(index.type_id(self.spec.output))
+        solver.add(self.encoding.in_ranges(self.variables[0], id_ranges(ids)))
 
     def createLocConstraints(self, solver):
         '''Exactly k functions are used in the program'''
-        ctr = self.variables_fun[0]
-        for x in range(1, len(self.variables_fun)):
-            ctr += self.variables_fun[x]
-        ctr_fun = ctr == self.loc
-        solver.add(ctr_fun)
+        self.getLocLiteral(solver, self.loc)
+
+    def getLocLiteral(self, solver, loc):
+        '''
+        Return the assumption literal that forces exactly `loc` functions to be used in the program.
+        The constraint is guarded by the literal so that it can be retracted by simply not assuming it.
+        '''
+        lit = self.loc_literals.get(loc)
+        if lit is None:
+            lit = Bool('loc' + str(loc))
+            ctr = self.encoding.count_flags(self.variables_fun, loc)
+            solver.add(Implies(lit, ctr))
+            self.loc_literals[loc] = lit
+        return lit
 
     def createInputConstraints(self, solver):
         '''Each input will appear at least once in the program'''
         input_productions = self.spec.get_param_productions()
         for x in range(0, len(input_productions)):
-            ctr = None
-            for y in range(0, len(self.nodes)):
-                if ctr is None:
-                    ctr = self.variables[y] == input_productions[x].id
-                else:
-                    ctr = Or(self.variables[y] == input_productions[x].id, ctr)
-            solver.add(ctr)
+            ctr = [self.encoding.eq(self.variables[y], input_productions[x].id)
+                   for y in range(0, len(self.nodes))]
+            solver.add(Or(ctr))
 
     def createFunctionConstraints(self, solver):
         '''If a function occurs then set the function variable to 1 and 0 otherwise'''
         assert len(self.nodes) == len(self.variables_fun)
+        index = self.spec.index
+        ids = {True: [], False: []}
+        for pid in range(index.num_productions()):
+            ids[bool(index.is_function[pid] and not index.is_empty[pid])].append(pid)
         for x in range(0, len(self.nodes)):
-            for p in self.spec.productions():
-                # FIXME: improve empty integration
-                if p.is_function() and str(p).find('Empty') == -1:
-                    ctr = Implies(
-                        self.variables[x] == p.id, self.variables_fun[x] == 1)
-                    solver.add(ctr)
-                else:
-                    ctr = Implies(
-                        self.variables[x] == p.id, self.variables_fun[x] == 0)
-                    solver.add(ctr)
+            for is_function, group in ids.items():
+                if len(group) == 0:
+                    continue
+                ctr = Implies(
+                    self.encoding.in_ranges(self.variables[x], id_ranges(group)),
+                    self.encoding.flag_is(self.variables_fun[x], is_function))
+                solver.add(ctr)
+
+    def createEnumSetConstraints(self, solver):
+        '''
+        Each enumset type has one symbolic production, whose value at a node is a bitmask over the elements of the type: it must have between 1 and `max_len` bits set when the node holds the production, and no bit set otherwise.
+        '''
+        self.enum_set_productions = [p for p in self.spec.productions() if p.is_enum_set()]
+        for x in range(0, len(self.nodes)):
+            for p in self.enum_set_productions:
+                num_elems = len(p.lhs.elements)
+                mask = BitVec('m{}_{}'.format(x + 1, p.id), num_elems)
+                self.masks[(x, p.id)] = mask
+                bits = [Extract(i, i, mask) == 1 for i in range(num_elems)]
+                ctr = Or(bits)
+                if p.lhs.max_len < num_elems:
+                    ctr = And(ctr, AtMost(*bits, p.lhs.max_len))
+                solver.add(Implies(self.encoding.eq(self.variables[x], p.id), ctr))
+                solver.add(Implies(self.neLiteral(x, p.id), mask == 0))
 
     def createLeafConstraints(self, solver):
+        ranges = id_ranges([p.id for p in self.leaf_productions])
         for x in range(0, len(self.nodes)):
             n = self.nodes[x]
             if n.children is None:
-                ctr = self.variables[x] == self.leaf_productions[0].id
-                for y in range(1, len(self.leaf_productions)):
-                    ctr = Or(self.variables[x] ==
-                             self.leaf_productions[y].id, ctr)
-                solver.add(ctr)
+                solver.add(self.encoding.in_ranges(self.variables[x], ranges))
+
+    def buildChildrenTable(self):
+        '''
+        Precompute, for each production and each child slot of the k-tree, the ids of the productions allowed in that slot.
+        Slots that are not used by a production can only hold productions of type Empty.
+        '''
+        index = self.spec.index
+        empty_type_id = index.empty_type_id
+        empty_ids = [] if empty_type_id is None else index.ids_with_lhs_id(empty_type_id)
+        table = []
+        for pid in range(index.num_productions()):
+            slots = []
+            for y in range(0, self.max_children):
+                if y < index.arity[pid]:
+                    slots.append(index.ids_with_lhs_id(index.child_type_id(pid, y)))
+                else:
+                    slots.append(empty_ids)
+            table.append(slots)
+        return table
 
     def createChildrenConstraints(self, solver):
+        '''If a node uses production p, then its children must be consistent with the rhs of p'''
+        table = self.buildChildrenTable()
+        # Productions that allow the same children in every slot (e.g. all the leaves) share their constraints
+        groups = dict()
+        for p in self.spec.productions():
+            key = tuple([id(allowed) for allowed in table[p.id]])
+            group = groups.get(key)
+            if group is None:
+                group = (table[p.id], [])
+                groups[key] = group
+            group[1].append(p.id)
+        groups = [(slots, id_ranges(ids)) for slots, ids in groups.values()]
+        allowed_ranges = dict()
+        for slots, _ in groups:
+            for allowed in slots:
+                allowed_ranges.setdefault(id(allowed), id_ranges(allowed))
         for x in range(0, len(self.nodes)):
             n = self.nodes[x]
             if n.children is not None:
-                for p in self.spec.productions():
-                    assert len(n.children) > 0
-                    for y in range(0, len(n.children)):
-                        ctr = None
-                        child_type = 'Empty'
-                        if p.is_function() and y < len(p.rhs):
-                            child_type = str(p.rhs[y])
-                        for t in self.spec.get_productions_with_lhs(child_type):
-                            if ctr is None:
-                                ctr = self.variables[n.children[y].id - 1] == t.id
-                            else:
-                                ctr = Or(
-                                    ctr, self.variables[n.children[y].id - 1] == t.id)
-                            ctr = Implies(self.variables[x] == p.id, ctr)
-                        solver.add(ctr)
+                assert len(n.children) > 0
+                child_vars = [self.variables[c.id - 1] for c in n.children]
+                # productions of different parents often allow the same children: build each disjunction once
+                child_ctrs = [dict() for _ in child_vars]
+                for slots, ranges in groups:
+                    head = self.encoding.in_ranges(self.variables[x], ranges)
+                    for y, allowed in enumerate(slots):
+                        key = id(allowed)
+                        ctr = child_ctrs[y].get(key)
+                        if ctr is None:
+                            ctr = self.encoding.in_ranges(child_vars[y], allowed_ranges[key])
+                            child_ctrs[y][key] = ctr
+                        solver.add(Implies(head, ctr))
+
+    def subtreeVariables(self, node):
+        '''Return the variables of the k-tree rooted at `node`, in BFS order'''
+        ret = []
+        d = deque([node])
+        while len(d) != 0:
+            current = d.popleft()
+            ret.append(self.variables[current.id - 1])
+            if current.children is not None:
+                d.extend(current.children)
+        return ret
+
+    def lexLessOrEqual(self, vars0, vars1):
+        '''The production ids of `vars0` are lexicographically smaller than or equal to the ones of `vars1`'''
+        ctr = BoolVal(True)
+        for v0, v1 in reversed(list(zip(vars0, vars1))):
+            ctr = Or(self.encoding.lt(v0, v1), And(self.encoding.same(v0, v1), ctr))
+        return ctr
+
+    def createSymmetryBreakingConstraints(self, solver, prod, positions):
+        '''
+        If `prod` is used at a node, the subtrees at the given argument positions are sorted lexicographically.
+        Since the k-tree is uniform, those subtrees have the same shape and each of them encodes a unique subprogram.
+        '''
+        for x in range(0, len(self.nodes)):
+            n = self.nodes[x]
+            if n.children is None:
+                continue
+            head = self.encoding.eq(self.variables[x], prod.id)
+            for pos0, pos1 in zip(positions, positions[1:]):
+                vars0 = self.subtreeVariables(n.children[pos0])
+                vars1 = self.subtreeVariables(n.children[pos1])
+                solver.add(Implies(head, self.lexLessOrEqual(vars0, vars1)))
 
     def maxChildren(self) -> int:
         '''Finds the maximum number of children in the productions'''
-        max = 0
-        for p in self.spec.productions():
-            if len(p.rhs) > max:
-                max = len(p.rhs)
-        return max
+        # Every node of the k-tree has at least one child slot, as leaves are encoded with one rhs element
+        return max(self.spec.index.max_arity, 1)
 
     def buildKTree(self, children, depth):
         '''Builds a K-tree that will contain the program'''
@@ -164,44 +258,56 @@ class SmtEnumerator(Enumerator):
                     d.append(c)
         return tree, nodes
 
-    @staticmethod
-    def _check_arg_types(pred, python_tys):
-        if pred.num_args() < len(python_tys):
-            msg = 'Predicate "{}" must have at least {} arugments. Only {} is found.'.format(
-                pred.name, len(python_tys), pred.num_args())
-            raise ValueError(msg)
-        for index, (arg, python_ty) in enumerate(zip(pred.args, python_tys)):
-            if not isinstance(arg, python_ty):
-                msg = 'Argument {} of predicate {} has unexpected type.'.format(
-                    index, pred.name)
-                raise ValueError(msg)
-
     def _resolve_occurs_predicate(self, pred):
-        self._check_arg_types(pred, [str, (int, float)])
+        check_predicate_arg_types(pred, [str, (int, float)])
         prod = self.spec.get_function_production_or_raise(pred.args[0])
         weight = pred.args[1]
         self.optimizer.mk_occurs(prod, weight)
 
     def _resolve_not_occurs_predicate(self, pred):
-        self._check_arg_types(pred, [str, (int, float)])
+        check_predicate_arg_types(pred, [str, (int, float)])
         prod = self.spec.get_function_production_or_raise(pred.args[0])
         weight = pred.args[1]
         self.optimizer.mk_not_occurs(prod, weight)
 
     def _resolve_is_not_parent_predicate(self, pred):
-        self._check_arg_types(pred, [str, str, (int, float)])
+        check_predicate_arg_types(pred, [str, str, (int, float)])
         prod0 = self.spec.get_function_production_or_raise(pred.args[0])
         prod1 = self.spec.get_function_production_or_raise(pred.args[1])
         weight = pred.args[2]
         self.optimizer.mk_is_not_parent(prod0, prod1, weight)
 
     def _resolve_is_parent_predicate(self, pred):
-        self._check_arg_types(pred, [str, str, (int, float)])
+        check_predicate_arg_types(pred, [str, str, (int, float)])
         prod0 = self.spec.get_function_production_or_raise(pred.args[0])
         prod1 = self.spec.get_function_production_or_raise(pred.args[1])
         weight = pred.args[2]
         self.optimizer.mk_is_parent(prod0, prod1, weight)
 
+    def _resolve_commutative_predicate(self, pred):
+        check_predicate_arg_types(pred, [str])
+        prod = self.spec.get_function_production_or_raise(pred.args[0])
+        # The remaining arguments, if any, are the positions of the arguments that can be swapped
+        positions = list(pred.args)[1:]
+        if len(positions) == 0:
+            positions = list(range(len(prod.rhs)))
+        for pos in positions:
+            if not isinstance(pos, int) or pos < 0 or pos >= len(prod.rhs):
+                msg = 'Predicate "{}" refers to an invalid argument position: {}'.format(
+                    pred.name, pos)
+                raise ValueError(msg)
+        if len(positions) < 2:
+            msg = 'Predicate "{}" needs at least 2 arguments to be swapped'.format(
+                pred.name)
+            raise ValueError(msg)
+        if any(prod.rhs[pos] != prod.rhs[positions[0]] for pos in positions):
+            msg = 'Arguments of "{}" cannot be swapped since they have different types'.format(
+                prod.name)
+            raise ValueError(msg)
+        if self.break_symmetries:
+            self.createSymmetryBreakingConstraints(
+                self.z3_solver, prod, positions)
+
     def resolve_predicates(self):
         try:
             for pred in self.spec.predicates():
@@ -213,18 +319,36 @@ class SmtEnumerator(Enumerator):
                     self._resolve_not_occurs_predicate(pred)
                 elif pred.name == 'is_not_parent':
                     self._resolve_is_not_parent_predicate(pred)
+                elif pred.name == 'commutative':
+                    self._resolve_commutative_predicate(pred)
                 else:
                     logger.warning('Predicate not handled: {}'.format(pred))
         except (KeyError, ValueError) as e:
             msg = 'Failed to resolve predicates. {}'.format(e)
             raise RuntimeError(msg) from None
 
-    def __init__(self, spec, depth=None, loc=None):
+    def __init__(self, spec, depth=None, loc=None, max_loc=None, encoding='int', break_symmetries=True, maxsat='lsu'):
+        '''
+        Build an enumerator for programs of depth at most `depth` that use exactly `loc` functions.
+        If `max_loc` is given, the enumerator deepens iteratively: once all programs with `loc` functions have been enumerated, it moves on to `loc + 1` and so on until `max_loc`.
+        The k-tree and the solver are shared among all loc values, hence anything learned through `update()` carries forward.
+        `encoding` selects how the production of each node is represented in the solver: "int" (integer variables), "onehot" (one boolean per production) or "bitvec" (a bit-vector of ceil(log2(P)) bits).
+        If `break_symmetries` is set, only one ordering of the arguments of productions declared with `predicate commutative(...)` is enumerated.
+        `maxsat` selects the algorithm that minimizes the cost of the soft predicates: "lsu" (linear search on the cost), "core" (stratified core-guided search) or "z3" (z3's Optimize).
+        '''
         self.z3_solver = Solver()
         self.leaf_productions = []
         self.variables = []
         self.variables_fun = []
-        self.program2tree = {}
+        # entries go away together with the programs, so blames can refer to any program that is still alive
+        self.program2tree = WeakKeyDictionary()
+        self.loc_literals = {}
+        self.lemmas = []
+        self.ne_literals = {}
+        self.enum_set_productions = []
+        self.masks = {}
+        # the current model and the production ids it assigns to the variables
+        self.decoded = (None, None)
         self.spec = spec
         if depth <= 0:
             raise ValueError(
@@ -234,6 +358,15 @@ class SmtEnumerator(Enumerator):
             raise ValueError(
                 'LOC cannot be non-positive: {}'.format(loc))
         self.loc = loc
+        if max_loc is None:
+            max_loc = loc
+        elif max_loc < loc:
+            raise ValueError(
+                'Max LOC cannot be smaller than LOC: {} < {}'.format(max_loc, loc))
+        self.max_loc = max_loc
+        self.encoding = make_encoding(encoding, spec.num_productions())
+        self.break_symmetries = break_symmetries
+        engine = make_engine(maxsat)
         self.max_children = self.maxChildren()
         self.tree, self.nodes = self.buildKTree(self.max_children, self.depth)
         self.model = None
@@ -245,65 +378,140 @@ class SmtEnumerator(Enumerator):
         self.createFunctionConstraints(self.z3_solver)
         self.createLeafConstraints(self.z3_solver)
         self.createChildrenConstraints(self.z3_solver)
+        self.createEnumSetConstraints(self.z3_solver)
         self.optimizer = Optimizer(
-            self.z3_solver, spec, self.variables, self.nodes)
+            self.z3_solver, spec, self.variables, self.nodes, self.encoding, engine)
         self.resolve_predicates()
 
-    def blockModel(self):
+    @property
+    def num_solver_calls(self):
+        '''Number of times the solver has been called to enumerate programs'''
+        return self.optimizer.num_solver_calls
+
+    def set_loc(self, loc):
+        '''
+        Change the number of functions used in the enumerated programs.
+        This only swaps the assumption passed to the solver: the k-tree, the encoding and all the learned constraints are kept.
+        '''
+        if loc <= 0:
+            raise ValueError(
+                'LOC cannot be non-positive: {}'.format(loc))
+        self.loc = loc
+        self.max_loc = max(self.max_loc, loc)
+        self.getLocLiteral(self.z3_solver, loc)
+        # The optimum for a different loc is unrelated to the current one
+        self.optimizer.reset_bound()
+
+    def decodeModel(self):
+        '''Return the production id of each variable in the current model. Models are decoded once, for the program and for the blocking clause.'''
         assert(self.model is not None)
-        # m = self.z3_solver.model()
-        block = []
-        # block the model using only the variables that correspond to productions
-        for x in self.variables:
-            block.append(x != self.model[x])
-        ctr = Or(block)
-        self.z3_solver.add(ctr)
+        model, values = self.decoded
+        if model is not self.model:
+            values = [self.encoding.decode(self.model, x) for x in self.variables]
+            self.decoded = (self.model, values)
+        return values
+
+    def decodeProduction(self, x, pid):
+        '''Return the production of variable `x` in the current model, given its id `pid`. The value of an enumset is decoded from its bitmask.'''
+        prod = self.spec.get_production_or_raise(pid)
+        if prod.is_enum_set():
+            mask = self.model.eval(self.masks[(x, pid)], model_completion=True).as_long()
+            prod = prod.with_mask(mask)
+        return prod
+
+    def neLiteral(self, x, pid):
+        '''Return the literal that holds iff variable `x` is not assigned production `pid`'''
+        lit = self.ne_literals.get((x, pid))
+        if lit is None:
+            lit = self.encoding.ne(self.variables[x], pid)
+            self.ne_literals[(x, pid)] = lit
+        return lit
+
+    def blockingClause(self):
+        '''
+        Return a clause that forbids the program of the current model.
+        Only the nodes that do not hold an Empty production are blocked: each of them fixes the type of its children slots, so the Empty nodes follow from the others, and models that only differ on Empty nodes build the same program anyway.
+        A node that holds an enumset is blocked on its value too.
+        '''
+        is_empty = self.spec.index.is_empty
+        lits = []
+        for x, pid in enumerate(self.decodeModel()):
+            if not is_empty[pid]:
+                lits.append(self.neLiteral(x, pid))
+                mask = self.masks.get((x, pid))
+                if mask is not None:
+                    lits.append(mask != self.model.eval(mask, model_completion=True))
+        return Or(lits)
+
+    def blockModel(self):
+        self.z3_solver.add(self.blockingClause())
 
     def update(self, info=None):
         # TODO: block more than one model
         # self.blockModel() # do I need to block the model anyway?
         if info is not None and not isinstance(info, str):
             for core in info:
-                ctr = None
-                for constraint in core:
-                    if ctr is None:
-                        ctr = self.variables[self.program2tree[constraint[0]
-                                                               ].id - 1] != constraint[1].id
-                    else:
-                        ctr = Or(
-                            ctr, self.variables[self.program2tree[constraint[0]].id - 1] != constraint[1].id)
-                self.z3_solver.add(ctr)
-        else:
+                lemma = [self.lemmaItem(self.program2tree[constraint[0]].id, constraint[1])
+                         for constraint in core]
+                self.addLemma(lemma)
+                self.lemmas.append(lemma)
+        elif self.model is not None:
             self.blockModel()
 
-    def buildProgram(self):
-        result = [0] * len(self.model)
-        for x in self.model:
-            c = x()
-            a = str(x)
-            if a[:1] == 'n':
-                result[int(a[1:]) - 1] = int(str(self.model[c]))
+    @staticmethod
+    def lemmaItem(nid, prod):
+        if prod.is_enum_set():
+            return (nid, prod.id, prod.mask)
+        return (nid, prod.id)
+
+    def addLemma(self, lemma):
+        '''Forbid the k-tree nodes of the lemma to be assigned all of their productions at the same time'''
+        lits = []
+        for nid, pid, *mask in lemma:
+            lits.append(self.encoding.ne(self.variables[nid - 1], pid))
+            if len(mask) > 0:
+                lits.append(self.masks[(nid - 1, pid)] != mask[0])
+        self.z3_solver.add(Or(lits))
+
+    def export_lemmas(self):
+        '''
+        Return the lemmas learned from the blames passed to `update()` since the last call, and forget them.
+        A lemma is a list of (k-tree node id, production id) pairs that cannot all hold in a valid program. The item of an enumset value is a (k-tree node id, production id, bitmask) triple.
+        Nodes are numbered in BFS order, so the ids are the same in every enumerator of the same spec regardless of the depth.
+        '''
+        lemmas = self.lemmas
+        self.lemmas = []
+        return lemmas
+
+    def import_lemmas(self, lemmas):
+        '''
+        Add lemmas learned by another enumerator of the same spec for the same problem.
+        A lemma that mentions a node beyond the k-tree of this enumerator always holds here, hence it is skipped.
+        '''
+        for lemma in lemmas:
+            if all(item[0] <= len(self.nodes) for item in lemma):
+                self.addLemma(lemma)
 
-        self.program2tree.clear()
+    def buildProgram(self):
+        result = self.decodeModel()
 
         code = []
         for n in self.nodes:
-            prod = self.spec.get_production_or_raise(result[n.id - 1])
-            code.append(prod)
+            code.append(self.decodeProduction(n.id - 1, result[n.id - 1]))
 
+        is_empty = self.spec.index.is_empty
         builder = D.Builder(self.spec)
         builder_nodes = [None] * len(self.nodes)
         for x in range(0, len(self.nodes)):
             y = len(self.nodes) - x - 1
-            if str(code[self.nodes[y].id - 1]).find('Empty') == -1:
+            if not is_empty[code[self.nodes[y].id - 1].id]:
                 children = []
                 if self.nodes[y].children is not None:
                     for c in self.nodes[y].children:
-                        if str(code[c.id - 1]).find('Empty') == -1:
+                        if not is_empty[code[c.id - 1].id]:
                             assert builder_nodes[c.id - 1] is not None
                             children.append(builder_nodes[c.id - 1])
-                n = code[self.nodes[y].id - 1].id
-                builder_nodes[y] = builder.make_node(n, children)
+                builder_nodes[y] = builder.make_node(code[self.nodes[y].id - 1], children)
                 self.program2tree[builder_nodes[y]] = self.nodes[y]
 
         assert(builder_nodes[0] is not None)
@@ -311,8 +519,53 @@ class SmtEnumerator(Enumerator):
 
     def next(self):
         while True:
-            self.model = self.optimizer.optimize(self.z3_solver)
+            assumptions = [self.getLocLiteral(self.z3_solver, self.loc)]
+            self.model = self.optimizer.optimize(self.z3_solver, assumptions)
             if self.model is not None:
                 return self.buildProgram()
+            elif self.loc < self.max_loc:
+                logger.debug('Search space with loc={} is exhausted'.format(self.loc))
+                self.set_loc(self.loc + 1)
             else:
                 return None
+
+    def next_batch(self, k):
+        '''
+        Enumerate up to `k` programs, in order of increasing cost as successive calls to `next()` would, although programs of the same cost may come out in a different order.
+        Only the first program of each cost goes through the optimizer. The others are all optimal too, so they are found by plain satisfiability checks in a solver scope where the cost is fixed, and their blocking clauses are added permanently together when the scope is closed.
+        Every returned model is blocked, hence `update()` does not need to block them again, although it can still be called with a blame on any of the programs.
+        '''
+        progs = []
+        while len(progs) < k:
+            prog = self.next()
+            if prog is None:
+                break
+            progs.append(prog)
+            blocks = [self.blockingClause()]
+            if len(progs) < k:
+                self.nextOfSameCost(k - len(progs), progs, blocks)
+            # The scope is closed, so the blocks go to the base level where the optimizer expects every constraint
+            self.z3_solver.add(*blocks)
+        # every returned model is already blocked
+        self.model = None
+        return progs
+
+    def nextOfSameCost(self, k, progs, blocks):
+        '''Append to `progs` up to `k` other programs of the same cost as the current model, and the clauses that block them to `blocks`'''
+        cost = self.optimizer.computeCost(self.model)
+        # the loc literal was created by next(), outside of the scope
+        assumptions = [self.loc_literals[self.loc]]
+        self.z3_solver.push()
+        try:
+            if len(self.optimizer.objective) > 0:
+                self.z3_solver.add(Sum(self.optimizer.objective) <= cost)
+            self.z3_solver.add(blocks[0])
+            for _ in range(k):
+                if self.optimizer.check(self.z3_solver, assumptions) != sat:
+                    break
+                self.model = self.z3_solver.model()
+                progs.append(self.buildProgram())
+                blocks.append(self.blockingClause())
+                self.z3_solver.add(blocks[-1])
+        finally:
+            self.z3_solver.pop()
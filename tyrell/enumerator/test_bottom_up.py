@@ -0,0 +1,115 @@
+import unittest
+from .. import spec as S
+from ..dsl import Builder, dfs
+from ..interpreter import Interpreter, PostOrderInterpreter, GeneralError
+from ..decider import Example, ExampleDecider
+from ..synthesizer import Synthesizer
+from .exhaustive import ExhaustiveEnumerator
+from .bottom_up import BottomUpEnumerator
+from .test_smt import spec
+
+
+class ToyInterpreter(PostOrderInterpreter):
+    def eval_SmallInt(self, v):
+        return int(v)
+
+    def eval_const(self, node, args):
+        return args[0]
+
+    def eval_plus(self, node, args):
+        return args[0] + args[1]
+
+    def eval_neg(self, node, args):
+        if args[0] == 0:
+            raise GeneralError('Cannot negate zero')
+        return -args[0]
+
+
+class OpaqueInterpreter(Interpreter):
+    '''Only offers eval()'''
+
+    def __init__(self):
+        self._interp = ToyInterpreter()
+
+    def eval(self, prog, inputs):
+        return self._interp.eval(prog, inputs)
+
+
+inputs = [[1, 2], [3, 5]]
+
+
+def enumerate_all(enumerator):
+    progs = []
+    prog = enumerator.next()
+    while prog is not None:
+        progs.append(prog)
+        prog = enumerator.next()
+    return progs
+
+
+def size(prog):
+    return len(list(dfs(prog)))
+
+
+class TestBottomUpEnumerator(unittest.TestCase):
+
+    def test_distinct_values(self):
+        enumerator = BottomUpEnumerator(spec, ToyInterpreter(), inputs, max_size=6)
+        progs = enumerate_all(enumerator)
+        interp = ToyInterpreter()
+        sizes = [size(x) for x in progs]
+        self.assertListEqual(sizes, sorted(sizes))
+        self.assertLessEqual(sizes[-1], 6)
+        values = [tuple(interp.eval(x, y) for y in inputs) for x in progs]
+        self.assertEqual(len(values), len(set(values)))
+        self.assertGreater(enumerator.num_pruned, 0)
+        for prog in progs:
+            self.assertEqual(prog.type, spec.output)
+            # Every node occurs once
+            self.assertEqual(len(set(map(id, dfs(prog)))), size(prog))
+
+    def test_complete_up_to_equivalence(self):
+        interp = ToyInterpreter()
+
+        def evaluate(prog):
+            try:
+                return tuple(interp.eval(prog, x) for x in inputs)
+            except GeneralError:
+                return None
+        found = dict()
+        for prog in enumerate_all(BottomUpEnumerator(spec, ToyInterpreter(), inputs, max_size=7)):
+            found.setdefault(evaluate(prog), size(prog))
+        for prog in enumerate_all(ExhaustiveEnumerator(spec, max_depth=3)):
+            values = evaluate(prog)
+            if values is not None and size(prog) <= 7:
+                self.assertIn(values, found)
+                self.assertLessEqual(found[values], size(prog))
+
+    def test_opaque_interpreter(self):
+        progs = enumerate_all(BottomUpEnumerator(spec, ToyInterpreter(), inputs, max_size=5))
+        opaque_progs = enumerate_all(BottomUpEnumerator(spec, OpaqueInterpreter(), inputs, max_size=5))
+        self.assertListEqual([str(x) for x in progs], [str(x) for x in opaque_progs])
+
+    def test_synthesize(self):
+        target = Builder(spec).from_sexp_string(
+            '(plus (neg (@param 0)) (plus (@param 1) (@param 1)))')
+        interp = ToyInterpreter()
+        examples = [Example(input=x, output=interp.eval(target, x)) for x in inputs]
+        synthesizer = Synthesizer(
+            enumerator=BottomUpEnumerator(spec, interp, inputs, max_size=8),
+            decider=ExampleDecider(interpreter=interp, examples=examples))
+        prog = synthesizer.synthesize()
+        self.assertIsNotNone(prog)
+        self.assertLessEqual(size(prog), size(target))
+        for example in examples:
+            self.assertEqual(interp.eval(prog, example.input), example.output)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            BottomUpEnumerator(spec, ToyInterpreter(), inputs, max_size=0)
+        with self.assertRaises(ValueError):
+            BottomUpEnumerator(spec, ToyInterpreter(), [], max_size=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from .. import spec as S
+from ..dsl import dfs
+from .exhaustive import ExhaustiveEnumerator, SizedExhaustiveEnumerator
+from .test_smt import spec
+from .test_bottom_up import enumerate_all, size
+
+
+class TestSizedExhaustiveEnumerator(unittest.TestCase):
+
+    def check_all_programs(self, max_cached):
+        enumerator = SizedExhaustiveEnumerator(spec, max_size=4, max_cached=max_cached)
+        progs = enumerate_all(enumerator)
+        sizes = [size(x) for x in progs]
+        self.assertListEqual(sizes, sorted(sizes))
+        strs = [str(x) for x in progs]
+        self.assertEqual(len(strs), len(set(strs)))
+        # Programs of size 4 have depth at most 4
+        expected = [str(x) for x in enumerate_all(ExhaustiveEnumerator(spec, max_depth=4))
+                    if size(x) <= 4]
+        self.assertSetEqual(set(strs), set(expected))
+        for prog in progs:
+            self.assertEqual(len(set(map(id, dfs(prog)))), size(prog))
+        self.assertLessEqual(enumerator.num_cached, max_cached)
+        return progs
+
+    def test_all_programs(self):
+        progs = self.check_all_programs(1 << 20)
+        for max_cached in [0, 5, 20]:
+            spilled = self.check_all_programs(max_cached)
+            self.assertListEqual([str(x) for x in spilled], [str(x) for x in progs])
+
+    def test_spill_larger(self):
+        progs = enumerate_all(SizedExhaustiveEnumerator(spec, max_size=6))
+        spilled = enumerate_all(SizedExhaustiveEnumerator(spec, max_size=6, max_cached=50))
+        self.assertListEqual([str(x) for x in spilled], [str(x) for x in progs])
+
+    def test_early_stop(self):
+        full = SizedExhaustiveEnumerator(spec, max_size=6)
+        expected = [str(x) for x in enumerate_all(full)]
+        enumerator = SizedExhaustiveEnumerator(spec, max_size=6)
+        progs = enumerator.next_batch(30)
+        num_cached = enumerator.num_cached
+        self.assertGreater(num_cached, 0)
+        # Only the tables needed so far are filled
+        self.assertLess(num_cached, full.num_cached)
+        progs += enumerator.next_batch(10)
+        self.assertEqual(len(progs), 40)
+        self.assertListEqual([str(x) for x in progs], expected[:40])
+        self.assertGreaterEqual(enumerator.num_cached, num_cached)
+        self.assertLess(enumerator.num_cached, full.num_cached)
+
+    def test_enumset(self):
+        enumset_spec = S.parse(r'''
+            enumset Cols[2] {
+              "1", "2", "3", "4"
+            }
+            value Table;
+            program P(Table) -> Table;
+            func select: Table -> Table, Cols;
+        ''')
+        cols = enumset_spec.get_type_or_raise('Cols')
+        expected = ['@param0'] + ['select(@param0, {})'.format(x) for x in cols.domain]
+        progs = enumerate_all(SizedExhaustiveEnumerator(enumset_spec, max_size=3))
+        self.assertListEqual([str(x) for x in progs], expected)
+        progs = enumerate_all(ExhaustiveEnumerator(enumset_spec, max_depth=2))
+        self.assertListEqual([str(x) for x in progs], expected)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            SizedExhaustiveEnumerator(spec, max_size=0)
+        with self.assertRaises(ValueError):
+            SizedExhaustiveEnumerator(spec, max_size=3, max_cached=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import unittest
+from collections import Counter
+from .. import spec as S
+from ..dsl import dfs
+from ..decider import Blame
+from .random import BloomFilter, RandomEnumerator, WeightedRandomEnumerator
+from .test_smt import spec, spec_str, soft_spec
+
+
+def count_names(progs):
+    counter = Counter()
+    for prog in progs:
+        for node in dfs(prog):
+            if node.is_apply():
+                counter[node.name] += 1
+    return counter
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_add(self):
+        bloom = BloomFilter(1 << 12, 3)
+        # Fixed keys, spread over both 32-bit halves used by the double hashing, so that the
+        # sequence does not depend on the hash seed. None of them is a false positive.
+        keys = [(x * 0x9e3779b97f4a7c15) & 0xffffffffffffffff for x in range(100)]
+        for key in keys:
+            self.assertNotIn(key, bloom)
+            self.assertFalse(bloom.add(key))
+            self.assertIn(key, bloom)
+        for key in keys:
+            self.assertTrue(bloom.add(key))
+        with self.assertRaises(ValueError):
+            BloomFilter(0)
+        with self.assertRaises(ValueError):
+            BloomFilter(8, 0)
+
+
+class TestWeightedRandomEnumerator(unittest.TestCase):
+
+    def test_no_duplicates(self):
+        enumerator = WeightedRandomEnumerator(spec, max_depth=2, seed=1, max_attempts=200)
+        progs = []
+        while True:
+            prog = enumerator.next()
+            if prog is None:
+                break
+            progs.append(prog)
+        strs = [str(x) for x in progs]
+        self.assertEqual(len(strs), len(set(strs)))
+        # 2 parameters, 2 constants, 4 sums and 2 negations
+        self.assertEqual(len(strs), 10)
+        self.assertGreater(enumerator.num_duplicates, 0)
+
+    def test_batch(self):
+        enumerator = WeightedRandomEnumerator(spec, max_depth=2, seed=2, max_attempts=200)
+        batch = enumerator.next_batch(4)
+        self.assertEqual(len(batch), 4)
+        more = enumerator.next_batch(4)
+        self.assertEqual(len(more), 4)
+        strs = [str(x) for x in batch + more]
+        self.assertEqual(len(strs), len(set(strs)))
+        # A batch larger than the program space stops once it is exhausted
+        rest = enumerator.next_batch(100)
+        self.assertEqual(len(rest), 2)
+
+    def test_same_seed(self):
+        progs0 = WeightedRandomEnumerator(spec, max_depth=3, seed=3).next_batch(20)
+        progs1 = WeightedRandomEnumerator(spec, max_depth=3, seed=3).next_batch(20)
+        self.assertListEqual([str(x) for x in progs0], [str(x) for x in progs1])
+
+    def test_predicate_weights(self):
+        plain = count_names(WeightedRandomEnumerator(spec, max_depth=4, seed=4).next_batch(200))
+        soft = count_names(WeightedRandomEnumerator(soft_spec, max_depth=4, seed=4).next_batch(200))
+        self.assertGreater(soft['neg'], plain['neg'])
+
+        hard_spec = S.parse(spec_str + '''
+            predicate not_occurs(neg, 100);
+            predicate is_not_parent(plus, plus, 100);
+        ''')
+        progs = WeightedRandomEnumerator(hard_spec, max_depth=4, seed=4, max_attempts=100).next_batch(20)
+        for prog in progs:
+            for node in filter(lambda x: x.is_apply(), dfs(prog)):
+                self.assertNotEqual(node.name, 'neg')
+                if node.name == 'plus':
+                    for child in node.children:
+                        self.assertFalse(child.is_apply() and child.name == 'plus')
+
+    def test_hard_predicates(self):
+        hard_spec = S.parse(spec_str + '''
+            predicate occurs(neg, 100);
+            predicate is_parent(plus, const, 100);
+        ''')
+        enumerator = WeightedRandomEnumerator(hard_spec, max_depth=4, seed=4)
+        progs = enumerator.next_batch(20)
+        self.assertEqual(len(progs), 20)
+        self.assertGreater(enumerator.num_rejected, 0)
+        for prog in progs:
+            apply_nodes = [x for x in dfs(prog) if x.is_apply()]
+            self.assertIn('neg', [x.name for x in apply_nodes])
+            for node in apply_nodes:
+                if node.name == 'plus':
+                    self.assertIn('const', [x.name for x in node.children if x.is_apply()])
+
+    def test_invalid_predicate(self):
+        bad_spec = S.parse(spec_str + '''
+            predicate occurs(neg, "a");
+        ''')
+        with self.assertRaises(ValueError):
+            WeightedRandomEnumerator(bad_spec, max_depth=3)
+        unknown_spec = S.parse(spec_str + '''
+            predicate is_parent(neg, minus, 1);
+        ''')
+        with self.assertRaises(KeyError):
+            WeightedRandomEnumerator(unknown_spec, max_depth=3)
+
+    def test_update(self):
+        enumerator = WeightedRandomEnumerator(spec, max_depth=4, seed=5, blame_factor=0.1)
+        before = count_names(enumerator.next_batch(100))
+        neg = spec.get_function_production_or_raise('neg')
+        prog = enumerator.next()
+        enumerator.update([[Blame(prog, neg)]])
+        # Strings and None carry no blames
+        enumerator.update('unsat')
+        enumerator.update(None)
+        after = count_names(enumerator.next_batch(100))
+        self.assertLess(after['neg'], before['neg'])
+
+    def test_enumset(self):
+        enumset_spec = S.parse(r'''
+            enumset Cols[2] {
+              "1", "2", "3", "4"
+            }
+            value Table;
+            program P(Table) -> Table;
+            func select: Table -> Table, Cols;
+        ''')
+        cols = enumset_spec.get_type_or_raise('Cols')
+        for enumerator in [RandomEnumerator(enumset_spec, max_depth=2, seed=0),
+                           WeightedRandomEnumerator(enumset_spec, max_depth=2, seed=0)]:
+            values = set()
+            for prog in enumerator.next_batch(200):
+                if prog.is_apply():
+                    self.assertIn(prog.args[1].data, cols.domain)
+                    values.add(str(prog.args[1].data))
+            # Values are drawn from the whole domain
+            self.assertEqual(len(values), len(cols.domain))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            WeightedRandomEnumerator(spec, max_depth=0)
+        with self.assertRaises(ValueError):
+            WeightedRandomEnumerator(spec, max_depth=3, blame_factor=0)
+        with self.assertRaises(ValueError):
+            WeightedRandomEnumerator(spec, max_depth=3, max_attempts=0)
+
+    def test_fewer_duplicates(self):
+        plain = RandomEnumerator(spec, max_depth=3, seed=6)
+        strs = [str(plain.next()) for _ in range(50)]
+        self.assertLess(len(set(strs)), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
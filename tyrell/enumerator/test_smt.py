@@ -0,0 +1,274 @@
+import unittest
+from .. import spec as S
+from .smt import SmtEnumerator
+from .encoding import id_ranges
+
+spec_str = r'''
+    enum SmallInt {
+      "0", "1"
+    }
+    value Int;
+    value Empty;
+
+    program Toy(Int, Int) -> Int;
+    func const: Int -> SmallInt;
+    func plus: Int -> Int, Int;
+    func neg: Int -> Int;
+    func empty: Empty -> Empty;
+'''
+spec = S.parse(spec_str)
+comm_spec = S.parse(spec_str + '''
+    predicate commutative(plus);
+''')
+soft_spec = S.parse(spec_str + '''
+    predicate occurs(neg, 3);
+    predicate is_parent(plus, const, 2);
+    predicate is_not_parent(neg, neg, 1);
+''')
+
+
+def canonical(prog):
+    if not prog.is_apply():
+        return str(prog)
+    args = [canonical(x) for x in prog.children]
+    if prog.name == 'plus':
+        args = sorted(args)
+    return '{}({})'.format(prog.name, ', '.join(args))
+
+
+def count_functions(prog):
+    if not prog.is_apply():
+        return 0
+    return 1 + sum(count_functions(x) for x in prog.children)
+
+
+def enumerate_all(enumerator):
+    progs = []
+    prog = enumerator.next()
+    while prog is not None:
+        progs.append(prog)
+        enumerator.update()
+        prog = enumerator.next()
+    return progs
+
+
+class TestSmtEnumerator(unittest.TestCase):
+
+    def test_fixed_loc(self):
+        enumerator = SmtEnumerator(spec, depth=3, loc=2)
+        progs = enumerate_all(enumerator)
+        self.assertGreater(len(progs), 0)
+        for prog in progs:
+            self.assertEqual(count_functions(prog), 2)
+        strs = [str(x) for x in progs]
+        self.assertEqual(len(strs), len(set(strs)))
+
+    def test_iterative_loc(self):
+        expected = set()
+        for loc in range(1, 4):
+            progs = enumerate_all(SmtEnumerator(spec, depth=3, loc=loc))
+            expected.update(str(x) for x in progs)
+
+        enumerator = SmtEnumerator(spec, depth=3, loc=1, max_loc=3)
+        progs = enumerate_all(enumerator)
+        locs = [count_functions(x) for x in progs]
+        self.assertListEqual(locs, sorted(locs))
+        self.assertSetEqual(set(str(x) for x in progs), expected)
+        self.assertEqual(enumerator.loc, 3)
+
+    def test_set_loc_keeps_blocked_programs(self):
+        enumerator = SmtEnumerator(spec, depth=3, loc=2)
+        first = enumerate_all(enumerator)
+        self.assertIsNone(enumerator.next())
+
+        # Going back to an exhausted loc value still sees the blocking clauses
+        enumerator.set_loc(1)
+        ones = enumerate_all(enumerator)
+        self.assertTrue(all(count_functions(x) == 1 for x in ones))
+        enumerator.set_loc(2)
+        self.assertIsNone(enumerator.next())
+        self.assertGreater(len(first), 0)
+
+    def test_encodings(self):
+        expected = set(str(x) for x in enumerate_all(
+            SmtEnumerator(spec, depth=3, loc=2)))
+        for encoding in ['int', 'onehot', 'bitvec']:
+            progs = enumerate_all(
+                SmtEnumerator(spec, depth=3, loc=2, encoding=encoding))
+            self.assertSetEqual(set(str(x) for x in progs), expected)
+        with self.assertRaises(ValueError):
+            SmtEnumerator(spec, depth=3, loc=2, encoding='float')
+
+    def test_commutative(self):
+        full = enumerate_all(SmtEnumerator(spec, depth=3, loc=2))
+        for encoding in ['int', 'onehot', 'bitvec']:
+            progs = enumerate_all(
+                SmtEnumerator(comm_spec, depth=3, loc=2, encoding=encoding))
+            canons = [canonical(x) for x in progs]
+            # Exactly one representative per equivalence class
+            self.assertEqual(len(canons), len(set(canons)))
+            self.assertSetEqual(set(canons), set(canonical(x) for x in full))
+            self.assertLess(len(progs), len(full))
+
+        progs = enumerate_all(SmtEnumerator(
+            comm_spec, depth=3, loc=2, break_symmetries=False))
+        self.assertEqual(len(progs), len(full))
+
+    def test_invalid_commutative(self):
+        bad_spec = S.parse(spec_str + '''
+            predicate commutative(neg);
+        ''')
+        with self.assertRaises(RuntimeError):
+            SmtEnumerator(bad_spec, depth=3, loc=2)
+
+    def test_maxsat_engines(self):
+        def costs(maxsat):
+            enumerator = SmtEnumerator(
+                soft_spec, depth=3, loc=1, max_loc=2, maxsat=maxsat)
+            result = []
+            prog = enumerator.next()
+            while prog is not None:
+                result.append((enumerator.loc,
+                               enumerator.optimizer.computeCost(enumerator.model)))
+                enumerator.update()
+                prog = enumerator.next()
+            return result
+
+        expected = costs('lsu')
+        # Models come out in order of increasing cost within each loc
+        self.assertListEqual(expected, sorted(expected))
+        self.assertGreater(len(set(c for _, c in expected)), 1)
+        for maxsat in ['core', 'z3']:
+            self.assertListEqual(costs(maxsat), expected)
+        with self.assertRaises(ValueError):
+            SmtEnumerator(spec, depth=3, loc=2, maxsat='anneal')
+
+    def test_next_batch(self):
+        expected = set(str(x) for x in enumerate_all(
+            SmtEnumerator(spec, depth=3, loc=1, max_loc=2)))
+        enumerator = SmtEnumerator(spec, depth=3, loc=1, max_loc=2)
+        progs = []
+        batch = enumerator.next_batch(4)
+        while len(batch) > 0:
+            self.assertLessEqual(len(batch), 4)
+            progs.extend(batch)
+            # Models of a batch are already blocked
+            enumerator.update()
+            batch = enumerator.next_batch(4)
+        strs = [str(x) for x in progs]
+        self.assertEqual(len(strs), len(set(strs)))
+        self.assertSetEqual(set(strs), expected)
+        self.assertListEqual(enumerator.next_batch(4), [])
+
+    def test_next_batch_cost(self):
+        for maxsat in ['lsu', 'core', 'z3']:
+            enumerator = SmtEnumerator(soft_spec, depth=3, loc=2, maxsat=maxsat)
+            cost = dict()
+            prog = enumerator.next()
+            while prog is not None:
+                cost[str(prog)] = enumerator.optimizer.computeCost(enumerator.model)
+                enumerator.update()
+                prog = enumerator.next()
+            self.assertGreater(len(set(cost.values())), 1)
+
+            enumerator = SmtEnumerator(soft_spec, depth=3, loc=2, maxsat=maxsat)
+            progs = []
+            batch = enumerator.next_batch(3)
+            while len(batch) > 0:
+                self.assertEqual(enumerator.z3_solver.num_scopes(), 0)
+                progs.extend(str(x) for x in batch)
+                batch = enumerator.next_batch(3)
+            self.assertEqual(len(progs), len(cost))
+            self.assertSetEqual(set(progs), set(cost.keys()))
+            # Batches still come out in order of increasing cost
+            costs = [cost[x] for x in progs]
+            self.assertListEqual(costs, sorted(costs))
+
+    def test_next_batch_blame(self):
+        enumerator = SmtEnumerator(spec, depth=3, loc=2)
+        batch = enumerator.next_batch(2)
+        self.assertEqual(len(batch), 2)
+        # Blame the root production of the first program of the batch
+        prog = batch[0]
+        enumerator.update([[(prog, prog.production)]])
+        rest = enumerate_all(enumerator)
+        self.assertGreater(len(rest), 0)
+        for x in rest:
+            self.assertNotEqual(x.name, prog.name)
+
+    def test_enumset(self):
+        enumset_spec = S.parse(r'''
+            enumset Cols[2] {
+              "1", "2", "3", "4"
+            }
+            value Table;
+            value Empty;
+            program P(Table) -> Table;
+            func select: Table -> Table, Cols;
+            func empty: Empty -> Empty;
+        ''')
+        cols = enumset_spec.get_type_or_raise('Cols')
+        expected = set('select(@param0, {})'.format(x) for x in cols.domain)
+        self.assertEqual(len(expected), 10)
+        for encoding in ['int', 'onehot', 'bitvec']:
+            progs = enumerate_all(
+                SmtEnumerator(enumset_spec, depth=3, loc=1, encoding=encoding))
+            self.assertSetEqual(set(str(x) for x in progs), expected)
+
+    def test_enumset_blame(self):
+        enumset_spec = S.parse(r'''
+            enumset Cols[2] {
+              "1", "2", "3", "4"
+            }
+            value Table;
+            value Empty;
+            program P(Table) -> Table;
+            func select: Table -> Table, Cols;
+            func empty: Empty -> Empty;
+        ''')
+        # The symbolic production is the only production of the type
+        self.assertEqual(len(enumset_spec.get_productions_with_lhs('Cols')), 1)
+        for encoding in ['int', 'onehot', 'bitvec']:
+            enumerator = SmtEnumerator(enumset_spec, depth=3, loc=1, encoding=encoding)
+            prog = enumerator.next()
+            # Blaming the value of the enumset only forbids that value
+            cols = prog.children[1]
+            enumerator.update([[(prog, prog.production), (cols, cols.production)]])
+            lemmas = enumerator.export_lemmas()
+            self.assertListEqual(lemmas, [[(1, prog.production.id), (3, cols.production.id, cols.production.mask)]])
+            rest = enumerate_all(enumerator)
+            self.assertEqual(len(rest), 9)
+            self.assertNotIn(str(prog), [str(x) for x in rest])
+            # Lemmas carry the value to other enumerators
+            other = SmtEnumerator(enumset_spec, depth=2, loc=1, encoding=encoding)
+            other.import_lemmas(lemmas)
+            self.assertSetEqual(set(str(x) for x in enumerate_all(other)), set(str(x) for x in rest))
+
+    def test_empty_by_type(self):
+        # Only productions of type Empty fill unused slots, whatever the names of the other productions
+        named_spec = S.parse(r'''
+            value Int;
+            value Empty;
+            program P(Int) -> Int;
+            func isEmpty: Int -> Int;
+            func empty: Empty -> Empty;
+        ''')
+        progs = enumerate_all(SmtEnumerator(named_spec, depth=3, loc=2))
+        self.assertListEqual([str(x) for x in progs], ['isEmpty(isEmpty(@param0))'])
+
+    def test_id_ranges(self):
+        self.assertListEqual(id_ranges([]), [])
+        self.assertListEqual(id_ranges([5, 1, 2, 3, 7, 6, 9, 2]), [(1, 3), (5, 7), (9, 9)])
+
+    def test_invalid_loc(self):
+        with self.assertRaises(ValueError):
+            SmtEnumerator(spec, depth=3, loc=0)
+        with self.assertRaises(ValueError):
+            SmtEnumerator(spec, depth=3, loc=2, max_loc=1)
+        enumerator = SmtEnumerator(spec, depth=3, loc=1)
+        with self.assertRaises(ValueError):
+            enumerator.set_loc(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
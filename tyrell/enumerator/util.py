@@ -0,0 +1,27 @@
+from typing import Iterator, List, Tuple
+from ..spec import Production, ProductionIndex
+
+
+def compositions(total: int, parts: int) -> Iterator[Tuple[int, ...]]:
+    '''
+    Enumerate the tuples of `parts` positive integers that sum up to `total`, e.g. the sizes of the arguments of a function application whose arguments have `total` nodes in total.
+    '''
+    if parts == 1:
+        yield (total,)
+        return
+    for first in range(1, total - parts + 2):
+        for rest in compositions(total - first, parts - 1):
+            yield (first,) + rest
+
+
+def split_productions(index: ProductionIndex) -> Tuple[List[List[Production]], List[List[Tuple[Production, Tuple[int, ...]]]]]:
+    '''
+    Return, for each type ID, the enum then param productions of the type, and its function productions together with the type IDs of their children.
+    '''
+    leaves, functions = [], []
+    for type_id in range(index.num_types()):
+        prods = index.productions_with_lhs_id(type_id)
+        leaves.append([x for x in prods if index.is_enum[x.id]] +
+                      [x for x in prods if index.is_param[x.id]])
+        functions.append([(x, index.child_type_ids(x.id)) for x in prods if index.is_function[x.id]])
+    return leaves, functions
@@ -1,4 +1,5 @@
 from .interpreter import Interpreter
 from .post_order import PostOrderInterpreter
 from .context import Context
+from .cache import EvalCache
 from .error import InterpreterError, GeneralError, AssertionViolation
@@ -0,0 +1,139 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from collections import OrderedDict
+from ..dsl import Node
+
+
+class EvalCache:
+    '''
+    A bounded cache of the values of subtrees, shared by all the evaluations of an interpreter.
+    Entries are keyed by the structure of the subtree and by the input list it was evaluated on. Input lists are told apart by identity, which is what a decider does when it evaluates every candidate on the same examples.
+    The least recently used entries are evicted once there are more than `max_entries` of them, or once their total weight exceeds `max_weight`. The weight of an entry is given by `weigh(value)` and defaults to 1.
+    '''
+
+    _max_entries: int
+    _max_weight: Optional[float]
+    _weigh: Callable[[Any], float]
+    _max_inputs: int
+    _max_structures: int
+    _next_key: int
+    _entries: 'OrderedDict[Tuple[int, int], Tuple[Any, float]]'
+    _weight: float
+    _structures: Dict[Tuple[int, ...], int]
+    _inputs: Dict[int, Tuple[int, Any]]
+    _hits: int
+    _misses: int
+    _evictions: int
+
+    def __init__(self,
+                 max_entries: int = 65536,
+                 max_weight: Optional[float] = None,
+                 weigh: Optional[Callable[[Any], float]] = None,
+                 max_inputs: int = 64):
+        '''
+        `max_inputs` bounds the number of distinct input lists that are remembered. When a new one would exceed it, the whole cache is cleared.
+        The table of subtree structures is likewise cleared when it grows beyond 16 times `max_entries`. Keys are never reused, so keys computed before a clear simply stop matching.
+        '''
+        if max_entries <= 0:
+            raise ValueError(
+                'Max entries cannot be non-positive: {}'.format(max_entries))
+        if max_weight is not None and max_weight <= 0:
+            raise ValueError(
+                'Max weight cannot be non-positive: {}'.format(max_weight))
+        if max_inputs <= 0:
+            raise ValueError(
+                'Max inputs cannot be non-positive: {}'.format(max_inputs))
+        self._max_entries = max_entries
+        self._max_weight = max_weight
+        self._weigh = weigh if weigh is not None else (lambda x: 1)
+        self._max_inputs = max_inputs
+        self._max_structures = 16 * max_entries
+        self._next_key = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self.clear()
+
+    def clear(self) -> None:
+        '''Remove all the entries. The counters are kept.'''
+        self._entries = OrderedDict()
+        self._weight = 0
+        self._structures = dict()
+        self._inputs = dict()
+
+    def structure_key(self, node: Node, child_keys: Tuple[int, ...]) -> int:
+        '''
+        Return an integer that identifies the structure of the subtree rooted at `node`, given the keys of its children.
+        Subtrees with the same productions at the same positions get the same key.
+        '''
+        # Productions are unique per id, except enumset values, whose productions compare by value
+        structure = (node.production,) + child_keys
+        key = self._structures.get(structure)
+        if key is None:
+            if len(self._structures) >= self._max_structures:
+                self.clear()
+            key = self._next_key
+            self._next_key += 1
+            self._structures[structure] = key
+        return key
+
+    def input_key(self, inputs: Any) -> int:
+        '''Return an integer that identifies the input list `inputs`'''
+        entry = self._inputs.get(id(inputs))
+        if entry is None:
+            if len(self._inputs) >= self._max_inputs:
+                self.clear()
+            # Keep a reference to the inputs so that their id cannot be reused while the entries are alive
+            entry = (self._next_key, inputs)
+            self._next_key += 1
+            self._inputs[id(inputs)] = entry
+        return entry[0]
+
+    def lookup(self, key: Tuple[int, int]) -> Tuple[bool, Any]:
+        '''Return a pair of whether `key` is in the cache, and its value'''
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return False, None
+        self._hits += 1
+        self._entries.move_to_end(key)
+        return True, entry[0]
+
+    def store(self, key: Tuple[int, int], value: Any) -> None:
+        weight = self._weigh(value)
+        if self._max_weight is not None and weight > self._max_weight:
+            # It would evict everything else
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._weight -= old[1]
+        self._entries[key] = (value, weight)
+        self._weight += weight
+        while len(self._entries) > self._max_entries or \
+                (self._max_weight is not None and self._weight > self._max_weight):
+            _, (_, evicted_weight) = self._entries.popitem(last=False)
+            self._weight -= evicted_weight
+            self._evictions += 1
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def evictions(self) -> int:
+        return self._evictions
+
+    @property
+    def num_entries(self) -> int:
+        return len(self._entries)
+
+    @property
+    def weight(self) -> float:
+        return self._weight
+
+    def __repr__(self) -> str:
+        return 'EvalCache(entries={}, hits={}, misses={}, evictions={})'.format(
+            len(self._entries), self._hits, self._misses, self._evictions)
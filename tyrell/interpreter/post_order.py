@@ -1,17 +1,200 @@
-from typing import Tuple, List, Iterator, Any
+from typing import Tuple, List, Iterator, Any, Callable, Dict, Optional
+from functools import partial
+from weakref import WeakKeyDictionary
 from ..dsl import Node, AtomNode, ParamNode, ApplyNode
 from ..visitor import GenericVisitor
 from .interpreter import Interpreter
 from .context import Context
+from .cache import EvalCache
 from .error import InterpreterError, GeneralError
 
 
+def _tag_failure(e: InterpreterError, index: int) -> None:
+    # Only the innermost node that sees the error records its pre-order index
+    if getattr(e, '_node_index', None) is None:
+        e._node_index = index
+
+
+def _failed_context(prog: Node, index: int) -> Context:
+    '''
+    Build the context that the visitor-based evaluation of `prog` has when the node at pre-order position `index` fails, i.e. when its arguments have been evaluated but not the node itself.
+    '''
+    context = Context()
+    counter = [0]
+
+    def replay(node: Node) -> bool:
+        # Return True iff the failing node was reached
+        failed = counter[0] == index
+        counter[0] += 1
+        context.observe(node)
+        if not node.is_leaf():
+            for x in node.children:
+                if replay(x):
+                    return True
+            context.pop()
+        if failed:
+            return True
+        context.finish(node)
+        return False
+
+    replay(prog)
+    return context
+
+
 class PostOrderInterpreter(Interpreter):
+    _cache: Optional[EvalCache] = None
+    _compiled: Optional['WeakKeyDictionary[Node, Callable[[Node, List[Any]], Any]]'] = None
+
+    def __init__(self, cache: Optional[EvalCache] = None):
+        '''
+        If `cache` is given, the values of function applications are memoized across calls to `eval()`. This pays off when the evaluated programs share subtrees, as the candidates of an enumerator do.
+        '''
+        self._cache = cache
+
+    @property
+    def cache(self) -> Optional[EvalCache]:
+        return self._cache
+
+    def cacheable(self, node: Node, value: Any) -> bool:
+        '''
+        Tell whether `value`, the result of evaluating `node`, may be stored in the evaluation cache.
+        Override it to return False for values that are only valid for a limited time, e.g. names of objects living in an external runtime that may be overwritten.
+        '''
+        return True
 
     def eval(self, prog: Node, inputs: List[Any]) -> Any:
         '''
         Interpret the Given AST in post-order. Assumes the existence of `eval_XXX` method where `XXX` is the name of a function defined in the DSL.
+        The AST is compiled by `compile()` on first use, so evaluating the same program on several inputs only pays for the DSL operations.
+        '''
+        try:
+            return self._compile_code(prog)(prog, inputs)
+        except InterpreterError as e:
+            index = e._node_index
+            e._node_index = None
+            e.context = _failed_context(prog, index)
+            raise e from None
+
+    def step(self, node: Node, arg_values: List[Any], inputs: List[Any]) -> Any:
+        '''
+        Evaluate `node` alone, given the values of its arguments. This lets a client that already knows the values of the subtrees, e.g. a bottom-up enumerator, avoid evaluating them again.
+        The errors raised carry no context.
+        '''
+        if node.is_param():
+            if node.index >= len(inputs):
+                msg = 'Input parameter access({}) out of bound({})'.format(
+                    node.index, len(inputs))
+                raise GeneralError(msg)
+            return inputs[node.index]
+        if node.is_leaf():
+            method = getattr(self, 'eval_' + node.type.name, lambda x: x)
+            return method(node.data)
+        method_name = 'eval_' + node.name
+        method = getattr(self, method_name, None)
+        if method is None:
+            raise NotImplementedError(
+                'Cannot find required eval method: "{}"'.format(method_name))
+        return method(node, arg_values)
+
+    def compile(self, prog: Node) -> Callable[[List[Any]], Any]:
+        '''
+        Turn `prog` into a function that takes the inputs and returns the output, made of closures with the `eval_XXX` methods already bound.
+        The closures are memoized for as long as `prog` is alive. Errors raised by the function carry no context; `eval()` adds it.
         '''
+        return partial(self._compile_code(prog), prog)
+
+    def _compile_code(self, prog: Node) -> Callable[[Node, List[Any]], Any]:
+        '''
+        Return the compiled code of `prog`, which takes `prog` itself and the inputs.
+        The code is stored in a dictionary with weak keys, so it must not refer to `prog`, or the entry would never go away: the nodes are passed down to the closures at each call instead.
+        '''
+        if self._compiled is None:
+            self._compiled = WeakKeyDictionary()
+        fn = self._compiled.get(prog)
+        if fn is None:
+            keys = dict()
+            if self._cache is not None:
+                self._compute_keys(prog, keys)
+            fn = self._compile_node(prog, [0], keys)
+            self._compiled[prog] = fn
+        return fn
+
+    def _compute_keys(self, node: Node, keys: Dict[Node, int]) -> int:
+        child_keys = tuple(self._compute_keys(x, keys) for x in node.children)
+        key = self._cache.structure_key(node, child_keys)
+        keys[node] = key
+        return key
+
+    def _compile_node(self, node: Node, counter: List[int], keys: Dict[Node, int]) -> Callable[[Node, List[Any]], Any]:
+        index = counter[0]
+        counter[0] += 1
+        if node.is_param():
+            param_index = node.index
+
+            def eval_param(node, inputs):
+                if param_index >= len(inputs):
+                    msg = 'Input parameter access({}) out of bound({})'.format(
+                        param_index, len(inputs))
+                    e = GeneralError(msg)
+                    _tag_failure(e, index)
+                    raise e
+                return inputs[param_index]
+            return eval_param
+
+        if node.is_leaf():
+            data = node.data
+            method = getattr(self, 'eval_' + node.type.name, None)
+            if method is None:
+                return lambda node, inputs: data
+
+            def eval_atom(node, inputs):
+                try:
+                    return method(data)
+                except InterpreterError as e:
+                    _tag_failure(e, index)
+                    raise
+            return eval_atom
+
+        arg_fns = [self._compile_node(x, counter, keys) for x in node.args]
+        method_name = 'eval_' + node.name
+        method = getattr(self, method_name, None)
+        if method is None:
+            def method(apply_node, arg_values):
+                raise NotImplementedError(
+                    'Cannot find required eval method: "{}"'.format(method_name))
+        cache = self._cache
+        if cache is None:
+            def eval_apply(node, inputs):
+                try:
+                    return method(node, [f(x, inputs) for f, x in zip(arg_fns, node.args)])
+                except InterpreterError as e:
+                    _tag_failure(e, index)
+                    raise
+            return eval_apply
+
+        structure_key = keys[node]
+        cacheable = self.cacheable
+
+        def eval_apply_cached(node, inputs):
+            key = (structure_key, cache.input_key(inputs))
+            found, value = cache.lookup(key)
+            if found:
+                return value
+            try:
+                value = method(node, [f(x, inputs) for f, x in zip(arg_fns, node.args)])
+            except InterpreterError as e:
+                _tag_failure(e, index)
+                raise
+            if cacheable(node, value):
+                cache.store(key, value)
+            return value
+        return eval_apply_cached
+
+    def reference_eval(self, prog: Node, inputs: List[Any]) -> Any:
+        '''
+        Interpret the given AST by visiting it, without compiling it. This is slower than `eval()` and serves as its reference implementation.
+        '''
+        cache = self._cache
         class NodeVisitor(GenericVisitor):
             _interp: PostOrderInterpreter
             _context: Context
@@ -19,6 +202,16 @@ class PostOrderInterpreter(Interpreter):
             def __init__(self, interp):
                 self._interp = interp
                 self._context = Context()
+                if cache is not None:
+                    self._input_key = cache.input_key(inputs)
+                    self._keys = dict()
+                    self._compute_keys(prog)
+
+            def _compute_keys(self, node: Node) -> int:
+                child_keys = tuple(self._compute_keys(x) for x in node.children)
+                key = cache.structure_key(node, child_keys)
+                self._keys[node] = key
+                return key
 
             def visit_with_context(self, node: Node):
                 self._context.observe(node)
@@ -26,6 +219,14 @@ class PostOrderInterpreter(Interpreter):
                 self._context.finish(node)
                 return res
 
+            def _replay(self, node: Node):
+                self._context.observe(node)
+                if not node.is_leaf():
+                    for x in node.children:
+                        self._replay(x)
+                    self._context.pop()
+                self._context.finish(node)
+
             def visit_atom_node(self, atom_node: AtomNode):
                 method_name = self._eval_method_name(atom_node.type.name)
                 method = getattr(self._interp, method_name, lambda x: x)
@@ -40,13 +241,25 @@ class PostOrderInterpreter(Interpreter):
                 return inputs[param_index]
 
             def visit_apply_node(self, apply_node: ApplyNode):
+                if cache is not None:
+                    key = (self._keys[apply_node], self._input_key)
+                    found, value = cache.lookup(key)
+                    if found:
+                        # Record the nodes below as if they had been evaluated, so that the context stays the same with or without the cache
+                        for x in apply_node.args:
+                            self._replay(x)
+                        self._context.pop()
+                        return value
                 in_values = [self.visit_with_context(
                     x) for x in apply_node.args]
                 self._context.pop()
                 method_name = self._eval_method_name(apply_node.name)
                 method = getattr(self._interp, method_name,
                                  self._method_not_found)
-                return method(apply_node, in_values)
+                value = method(apply_node, in_values)
+                if cache is not None and self._interp.cacheable(apply_node, value):
+                    cache.store(key, value)
+                return value
 
             def _method_not_found(self, apply_node: ApplyNode, arg_values: List[Any]):
                 msg = 'Cannot find required eval method: "{}"'.format(
@@ -1,9 +1,13 @@
+import gc
 import unittest
+import weakref
 from itertools import product
 from .. import spec as S
 from .. import dsl as D
+from ..enumerator import ExhaustiveEnumerator
 from .post_order import PostOrderInterpreter
-from .error import GeneralError
+from .cache import EvalCache
+from .error import InterpreterError, GeneralError
 
 
 class BoolInterpreter(PostOrderInterpreter):
@@ -113,5 +117,185 @@ class TestSimpleInterpreter(unittest.TestCase):
             self.assertListEqual(ctx.evaluated, [lit, c, p0])
 
 
+class CountingInterpreter(BoolInterpreter):
+    def __init__(self, cache=None):
+        super().__init__(cache)
+        self.num_not = 0
+
+    def eval_not(self, node, args):
+        self.num_not += 1
+        return not args[0]
+
+
+class NoOrCacheInterpreter(CountingInterpreter):
+    def cacheable(self, node, value):
+        return node.name != 'or'
+
+
+class TestEvalCache(unittest.TestCase):
+
+    def setUp(self):
+        self._builder = D.Builder(spec)
+        self._domain = [False, True]
+        self._inputs = [[x, y] for x, y in product(self._domain, self._domain)]
+
+    def test_same_values(self):
+        b = self._builder
+        progs = [
+            b.from_sexp_string('(or (not (@param 0)) (@param 1))'),
+            b.from_sexp_string('(and (not (@param 0)) (not (@param 1)))'),
+            b.from_sexp_string('(not (or (not (@param 0)) (@param 1)))'),
+        ]
+        plain = BoolInterpreter()
+        cached = BoolInterpreter(EvalCache())
+        for _ in range(2):
+            for prog in progs:
+                for inputs in self._inputs:
+                    self.assertEqual(cached.eval(prog, inputs),
+                                     plain.eval(prog, inputs))
+        self.assertGreater(cached.cache.hits, 0)
+
+    def test_shared_subtrees(self):
+        b = self._builder
+        interp = CountingInterpreter(EvalCache())
+        p0 = b.from_sexp_string('(or (not (@param 0)) (@param 1))')
+        # A structurally equal subtree built separately
+        p1 = b.from_sexp_string('(and (not (@param 0)) (@param 1))')
+        for inputs in self._inputs:
+            interp.eval(p0, inputs)
+        self.assertEqual(interp.num_not, 4)
+        for inputs in self._inputs:
+            interp.eval(p1, inputs)
+        self.assertEqual(interp.num_not, 4)
+        self.assertEqual(interp.cache.hits, 4)
+
+        # Input lists are told apart by identity
+        interp.eval(p1, [False, True])
+        self.assertEqual(interp.num_not, 5)
+
+    def test_uncacheable(self):
+        b = self._builder
+        interp = NoOrCacheInterpreter(EvalCache())
+        p = b.from_sexp_string('(or (not (@param 0)) (@param 1))')
+        inputs = self._inputs[0]
+        interp.eval(p, inputs)
+        interp.eval(p, inputs)
+        # "or" is evaluated again, but its argument comes from the cache
+        self.assertEqual(interp.num_not, 1)
+        self.assertEqual(interp.cache.num_entries, 1)
+
+    def test_context_with_cache(self):
+        b = self._builder
+        interp = BoolInterpreter(EvalCache())
+        c = b.from_sexp_string('(const (BoolLit "true"))')
+        p = b.from_sexp_string(
+            '(and (const (BoolLit "true")) (assertTrue (@param 0)))')
+        inputs = [False, True]
+        interp.eval(c, inputs)
+        with self.assertRaises(GeneralError) as cm:
+            interp.eval(p, inputs)
+        ctx = cm.exception.context
+        lit = p.args[0].args[0]
+        self.assertListEqual(ctx.stack, [p])
+        self.assertListEqual(
+            ctx.observed, [p, p.args[0], lit, p.args[1], p.args[1].args[0]])
+        self.assertListEqual(
+            ctx.evaluated, [lit, p.args[0], p.args[1].args[0]])
+
+    def test_eviction(self):
+        b = self._builder
+        cache = EvalCache(max_entries=2)
+        interp = CountingInterpreter(cache)
+        inputs = self._inputs[0]
+        progs = [b.from_sexp_string(x) for x in
+                 ['(not (@param 0))', '(not (@param 1))', '(not (not (@param 0)))']]
+        for prog in progs:
+            interp.eval(prog, inputs)
+        self.assertEqual(cache.num_entries, 2)
+        self.assertEqual(cache.evictions, 1)
+        # The least recently used entry is gone
+        num_not = interp.num_not
+        interp.eval(progs[1], inputs)
+        self.assertEqual(interp.num_not, num_not + 1)
+
+        weighted = EvalCache(max_weight=2, weigh=lambda x: 2 if x else 1)
+        interp = CountingInterpreter(weighted)
+        interp.eval(progs[0], [False, False])
+        interp.eval(progs[1], [False, False])
+        self.assertEqual(weighted.num_entries, 1)
+        self.assertLessEqual(weighted.weight, 2)
+
+        with self.assertRaises(ValueError):
+            EvalCache(max_entries=0)
+
+
+class TestCompiledEval(unittest.TestCase):
+    '''Compare eval() against reference_eval() on every program of depth at most 3'''
+
+    def setUp(self):
+        enumerator = ExhaustiveEnumerator(spec, max_depth=3)
+        self._progs = []
+        prog = enumerator.next()
+        while prog is not None:
+            self._progs.append(prog)
+            prog = enumerator.next()
+        # The last one triggers out-of-bound parameter accesses
+        self._inputs = [[x, y] for x, y in product([False, True], [False, True])] + [[True]]
+
+    @staticmethod
+    def run_eval(eval_fn, prog, inputs):
+        try:
+            return eval_fn(prog, inputs)
+        except InterpreterError as e:
+            ctx = e.context
+            return (type(e), str(e), ctx.observed, ctx.evaluated, ctx.stack)
+
+    def check_same(self, interp, reference):
+        num_errors = 0
+        for prog in self._progs:
+            for inputs in self._inputs:
+                expected = self.run_eval(reference.reference_eval, prog, inputs)
+                actual = self.run_eval(interp.eval, prog, inputs)
+                self.assertEqual(actual, expected, str(prog))
+                if isinstance(expected, tuple):
+                    num_errors += 1
+        self.assertGreater(num_errors, 0)
+
+    def test_same_as_reference(self):
+        self.check_same(BoolInterpreter(), BoolInterpreter())
+
+    def test_same_as_reference_with_cache(self):
+        # Run twice so that the second round mostly hits the cache
+        interp = BoolInterpreter(EvalCache())
+        self.check_same(interp, BoolInterpreter())
+        self.check_same(interp, BoolInterpreter())
+        self.assertGreater(interp.cache.hits, 0)
+
+    def test_compile_is_memoized(self):
+        b = D.Builder(spec)
+        interp = BoolInterpreter()
+        p = b.from_sexp_string('(or (not (@param 0)) (@param 1))')
+        fn = interp.compile(p)
+        self.assertIs(interp.compile(p).func, fn.func)
+        self.assertEqual(fn([True, False]), False)
+        # Structurally equal programs are compiled separately
+        q = b.from_sexp_string('(or (not (@param 0)) (@param 1))')
+        self.assertIsNot(interp.compile(q).func, fn.func)
+
+    def test_compiled_programs_are_collected(self):
+        b = D.Builder(spec)
+        for interp in [BoolInterpreter(), BoolInterpreter(EvalCache())]:
+            refs = []
+            for x in range(200):
+                p = b.from_sexp_string('(and (not (@param 0)) (const (BoolLit "{}")))'.format(
+                    'true' if x % 2 == 0 else 'false'))
+                interp.eval(p, [False, True])
+                refs.append(weakref.ref(p))
+            del p
+            gc.collect()
+            self.assertEqual(sum(1 for x in refs if x() is not None), 0)
+            self.assertEqual(len(interp._compiled), 0)
+
+
 if __name__ == '__main__':
     unittest.main()
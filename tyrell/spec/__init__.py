@@ -1,8 +1,8 @@
 from .parser import LarkError as ParseError
-from .type import Type, EnumType, ValueType
-from .production import Production, EnumProduction, ParamProduction, FunctionProduction
+from .type import Type, EnumType, EnumSetType, ValueType
+from .production import Production, EnumProduction, EnumSetProduction, ParamProduction, FunctionProduction
 from .predicate import Predicate
-from .spec import TypeSpec, ProductionSpec, ProgramSpec, TyrellSpec
+from .spec import TypeSpec, ProductionSpec, ProgramSpec, ProductionIndex, TyrellSpec
 from .desugar import ParseTreeProcessingError
 from . import expr
 from .do_parse import parse, parse_file
@@ -1,10 +1,9 @@
 from ast import literal_eval
 from typing import List, cast
 from .spec import TypeSpec, ProductionSpec, ProgramSpec, PredicateSpec, TyrellSpec
-from .type import Type, EnumType, ValueType
+from .type import Type, EnumType, EnumSetType, ValueType
 from .expr import *
 from .parser import Visitor_Recursive
-from .util import enum_set_domain
 from ..logger import get_logger
 
 logger = get_logger('tyrell.desugar')
@@ -29,8 +28,7 @@ class TypeCollector(Visitor_Recursive):
         name = str(tree.children[0])
         max_len = int(tree.children[1])
         domain = [literal_eval(str(x)) for x in tree.children[2].children]
-        self._spec.define_type(
-            EnumType(name, enum_set_domain(domain, max_len)))
+        self._spec.define_type(EnumSetType(name, domain, max_len))
 
     def _process_properties(self, items):
         ret = []
@@ -1,25 +1,46 @@
-from .parser import Lark_StandAlone
+from typing import Optional
+from .parser import Lark_StandAlone, ContextualLexer
 from .desugar import desugar
+from .spec import TyrellSpec
+from .. import __version__
+from ..cache import DiskCache, content_hash
 
-# This has to be global since Lark_StandAlone() is not re-entrant.
-# See https://github.com/lark-parser/lark/issues/299
-parser = Lark_StandAlone()
+
+# Lark_StandAlone() can only be built once per process: building it rewrites the global rules of the generated parser, and a second instance produces broken parse trees.
+# Its LALR parser keeps all the state of a parse on the stack, so it may run several parses at the same time.
+_parser = Lark_StandAlone()
 
 
 def parse(input_str):
     '''
     Parse Tyrell spec from an input string.
     May raise either ``ParseError`` or ``ParseTreeProcessingError``.
+    This function is thread-safe.
     '''
-    parse_tree = parser.parse(input_str)
+    # The generated parser lexes every input with the same global ContextualLexer, whose state follows the parser (see https://github.com/lark-parser/lark/issues/299).
+    # Give each parse its own lexer instead, so that concurrent parses do not corrupt each other.
+    lexer = ContextualLexer()
+    parse_tree = _parser.parser.parse(lexer.lex(input_str), lexer.set_parser_state)
     return desugar(parse_tree)
 
 
-def parse_file(file_path):
+# Bump this whenever the classes that make up a spec change in a way that breaks old pickles
+_CACHE_FORMAT = 3
+
+
+def parse_file(file_path, cache: Optional[DiskCache] = None):
     '''
     Parse Tyrell spec from an input file path.
     May raise either ``ParseError`` or ``ParseTreeProcessingError``.
+    If ``cache`` is given, the spec is looked up in it by the content of the file and the version of tyrell, and stored in it after parsing if it is missing. ``DiskCache(os.path.dirname(file_path))`` keeps the cache next to the spec.
     '''
     with open(file_path, 'r') as f:
         spec_str = f.read()
-    return parse(spec_str)
+    if cache is None:
+        return parse(spec_str)
+    key = content_hash('spec/{}'.format(_CACHE_FORMAT), __version__, spec_str)
+    spec = cache.get('spec', key)
+    if not isinstance(spec, TyrellSpec):
+        spec = parse(spec_str)
+        cache.put('spec', key, spec)
+    return spec
@@ -1,6 +1,6 @@
-from typing import List, Any, cast
+from typing import Iterable, List, Any, Optional, cast
 from abc import ABC, abstractmethod
-from .type import Type, EnumType, ValueType
+from .type import Type, EnumType, EnumSetType, ValueType
 from .expr import Expr, ExprType
 
 
@@ -10,6 +10,8 @@ class Production(ABC):
     Each production rule is uniquely identified by its ID in a given spec.
     '''
 
+    __slots__ = ('_id', '_lhs', '__weakref__')
+
     _id: int
     _lhs: Type
 
@@ -43,8 +45,17 @@ class Production(ABC):
     def is_function(self) -> bool:
         raise NotImplementedError
 
+    def is_enum_set(self) -> bool:
+        return False
+
+    def instances(self) -> Iterable['Production']:
+        '''Return the productions that an AST node can hold for this one: the production itself, unless it is a symbolic `EnumSetProduction`'''
+        return (self,)
+
 
 class EnumProduction(Production):
+    __slots__ = ('_choice',)
+
     _choice: int
 
     def __init__(self, id: int, lhs: EnumType, choice: int):
@@ -81,7 +92,93 @@ class EnumProduction(Production):
             self._id, self._lhs, self._get_rhs())
 
 
+class EnumSetProduction(Production):
+    '''
+    The production of all the values of an enumset type. A spec registers one such production per enumset type, with no choice: it is symbolic, and an AST node cannot hold it.
+    `with_choice()` returns the instance that stands for one value of the domain. The instances share the ID of the symbolic production, and two of them are equal iff they have the same choice.
+    '''
+    __slots__ = ('_choice',)
+
+    _choice: Optional[int]
+
+    def __init__(self, id: int, lhs: EnumSetType, choice: Optional[int] = None):
+        super().__init__(id, lhs)
+        if not isinstance(lhs, EnumSetType):
+            raise ValueError('LHS of EnumSetProduction must be an enumset type')
+        if choice is not None and not 0 <= choice < len(lhs.domain):
+            msg = 'Cannot create a EnumSetProduction with choice {} for a domain with {} elements.'.format(
+                choice, len(lhs.domain))
+            raise ValueError(msg)
+        self._choice = choice
+
+    @property
+    def choice(self) -> Optional[int]:
+        return self._choice
+
+    def is_symbolic(self) -> bool:
+        return self._choice is None
+
+    def with_choice(self, choice: int) -> 'EnumSetProduction':
+        '''Return the instance for value `choice` of the domain. Raise `ValueError` if it is out of bound.'''
+        return EnumSetProduction(self._id, cast(EnumSetType, self._lhs), choice)
+
+    def with_mask(self, mask: int) -> 'EnumSetProduction':
+        '''Return the instance for the value whose bitmask is `mask`. Raise `ValueError` if it is not in the domain.'''
+        domain = cast(EnumSetType, self._lhs).domain
+        return self.with_choice(domain.rank(domain.from_mask(mask)))
+
+    @property
+    def mask(self) -> int:
+        '''The bitmask of the value, see `EnumSetDomain.to_mask()`'''
+        return cast(EnumSetType, self._lhs).domain.to_mask(self._get_rhs())
+
+    def instances(self) -> Iterable['EnumSetProduction']:
+        if self._choice is not None:
+            return (self,)
+        return (self.with_choice(i) for i in range(len(self._lhs.domain)))
+
+    def _get_rhs(self) -> Any:
+        if self._choice is None:
+            raise ValueError(
+                'A symbolic EnumSetProduction has no value: {}'.format(self._lhs))
+        return cast(EnumSetType, self._lhs).domain[self._choice]
+
+    @property
+    def rhs(self) -> List[Any]:
+        return [] if self._choice is None else [self._get_rhs()]
+
+    def is_function(self) -> bool:
+        return False
+
+    def is_enum(self) -> bool:
+        return True
+
+    def is_enum_set(self) -> bool:
+        return True
+
+    def is_param(self) -> bool:
+        return False
+
+    def __eq__(self, other):
+        if isinstance(other, EnumSetProduction):
+            return self._id == other._id and self._choice == other._choice
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self._id, self._choice))
+
+    def __repr__(self) -> str:
+        return 'EnumSetProduction(id={}, lhs={!r}, choice={})'.format(
+            self._id, self._lhs, self._choice)
+
+    def __str__(self) -> str:
+        value = '<enumset>' if self._choice is None else self._get_rhs()
+        return 'Production {}: {} -> {}'.format(self._id, self._lhs, value)
+
+
 class ParamProduction(Production):
+    __slots__ = ('_param_id',)
+
     _param_id: int
 
     def __init__(self, id: int, lhs: ValueType, param_id: int):
@@ -113,6 +210,8 @@ class ParamProduction(Production):
 
 
 class FunctionProduction(Production):
+    __slots__ = ('_name', '_rhs', '_constraints')
+
     _name: str
     _rhs: List[Type]
     _constraints: List[Expr]
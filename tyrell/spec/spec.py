@@ -1,16 +1,19 @@
-from typing import Iterable, List, Dict, DefaultDict, Optional, Union, Any
+from typing import Iterable, List, Dict, DefaultDict, Optional, Tuple, Union, Any
 from collections import defaultdict
-from .type import Type, EnumType, ValueType
-from .production import EnumProduction, ParamProduction, FunctionProduction, Production
+from array import array
+from .type import Type, EnumType, EnumSetType, ValueType
+from .production import EnumProduction, EnumSetProduction, ParamProduction, FunctionProduction, Production
 from .expr import Expr
 from .predicate import Predicate
 
 
 class TypeSpec:
     _types: Dict[str, Type]
+    _frozen: bool
 
     def __init__(self):
         self._types = dict()
+        self._frozen = False
 
     def get_type(self, name: str) -> Optional[Type]:
         '''
@@ -29,8 +32,11 @@ class TypeSpec:
     def define_type(self, ty: Type) -> Type:
         '''
         Add the type `ty` to this spec. Return `ty` itself.
-        Raise `ValueError` if another type with duplicated name is found.
+        Raise `ValueError` if another type with duplicated name is found, or if the spec is frozen.
         '''
+        if self._frozen:
+            raise ValueError(
+                'Cannot define type {} in a frozen spec'.format(ty))
         name = ty.name
         if name in self._types:
             raise ValueError(
@@ -48,6 +54,14 @@ class TypeSpec:
         '''Return the total number of defined types'''
         return len(self._types)
 
+    def freeze(self) -> None:
+        '''Forbid any further type definition'''
+        self._frozen = True
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
     def __repr(self) -> str:
         return 'TypeSpec({})'.format([str(x) for x in self._types.values()])
 
@@ -57,12 +71,20 @@ class ProductionSpec:
     _lhs_map: DefaultDict[str, List[Production]]
     _param_map: Dict[int, Production]
     _func_map: Dict[str, Production]
+    # Enum productions of each enum type, keyed by their choice
+    _enum_map: DefaultDict[str, Dict[int, Production]]
+    # The symbolic production of each enumset type
+    _enum_set_map: Dict[str, EnumSetProduction]
+    _frozen: bool
 
     def __init__(self):
         self._productions = list()
         self._lhs_map = defaultdict(list)
         self._param_map = dict()
         self._func_map = dict()
+        self._enum_map = defaultdict(dict)
+        self._enum_set_map = dict()
+        self._frozen = False
 
     def get_production(self, id: int) -> Optional[Production]:
         '''
@@ -140,16 +162,20 @@ class ProductionSpec:
 
     def get_enum_production(self, ty: EnumType, value: str) -> Optional[Production]:
         '''
-        Return the enum production whose type is `type` and value is `value`.
+        Return the enum production whose type is `type` and value is `value`. For an enumset type, this is the instance of its symbolic production for `value`.
         If no production is found, return `None`
         '''
         if not isinstance(ty, EnumType):
             return None
-        prods = self.get_productions_with_lhs(ty)
-        for prod in prods:
-            if prod.rhs[0] == value:
-                return prod
-        return None
+        try:
+            # Large domains (e.g. enumsets) find the index of a value without going through all of them
+            choice = ty.domain.index(value)
+        except ValueError:
+            return None
+        if isinstance(ty, EnumSetType):
+            prod = self._enum_set_map.get(ty.name)
+            return None if prod is None else prod.with_choice(choice)
+        return self._enum_map[ty.name].get(choice)
 
     def get_enum_production_or_raise(self, ty: EnumType, value: str) -> Optional[Production]:
         '''
@@ -159,15 +185,19 @@ class ProductionSpec:
         if not isinstance(ty, EnumType):
             raise KeyError(
                 'The given type is not a enum type: {}'.format(ty))
-        for prod in self.get_productions_with_lhs(ty):
-            if prod.rhs[0] == value:
-                return prod
-        raise KeyError(
-            'Value "{}" is not in the domain of type {}'.format(value, ty))
+        prod = self.get_enum_production(ty, value)
+        if prod is None:
+            raise KeyError(
+                'Value "{}" is not in the domain of type {}'.format(value, ty))
+        return prod
 
     def _get_next_id(self) -> int:
         return len(self._productions)
 
+    def _check_not_frozen(self) -> None:
+        if self._frozen:
+            raise ValueError('Cannot add a production to a frozen spec')
+
     def _add_production(self, prod: Production) -> None:
         self._productions.append(prod)
         self._lhs_map[prod.lhs.name].append(prod)
@@ -175,17 +205,34 @@ class ProductionSpec:
     def add_enum_production(self, lhs: EnumType, choice: int) -> EnumProduction:
         '''
         Create a new enum production. Return the created production.
-        Raise `ValueError` if `choice` is out of bound.
+        Raise `ValueError` if `choice` is out of bound, or if the spec is frozen.
         '''
+        self._check_not_frozen()
         prod = EnumProduction(self._get_next_id(), lhs, choice)
         self._add_production(prod)
+        self._enum_map[lhs.name].setdefault(choice, prod)
+        return prod
+
+    def add_enum_set_production(self, lhs: EnumSetType) -> EnumSetProduction:
+        '''
+        Create the symbolic production of an enumset type. Return the created production.
+        Raise `ValueError` if the type already has one, or if the spec is frozen.
+        '''
+        self._check_not_frozen()
+        if lhs.name in self._enum_set_map:
+            raise ValueError(
+                'EnumSet Production of type {} has already been created'.format(lhs))
+        prod = EnumSetProduction(self._get_next_id(), lhs)
+        self._enum_set_map[lhs.name] = prod
+        self._add_production(prod)
         return prod
 
     def add_param_production(self, lhs: ValueType, index: int) -> ParamProduction:
         '''
         Create new param production. Return the created production.
-        Raise `ValueError` if a production with the same `index` has already been created.
+        Raise `ValueError` if a production with the same `index` has already been created, or if the spec is frozen.
         '''
+        self._check_not_frozen()
         if index in self._param_map:
             raise ValueError(
                 'Parameter Production with index {} has already been created'.format(index))
@@ -197,8 +244,9 @@ class ProductionSpec:
     def add_func_production(self, name: str, lhs: ValueType, rhs: List[Type], constraints: List[Expr]=[]) -> FunctionProduction:
         '''
         Create a new function production with the given `name`, `lhs`, and `rhs`. Return the created production.
-        Raise `ValueError` if a production with the same `name` has already been created
+        Raise `ValueError` if a production with the same `name` has already been created, or if the spec is frozen.
         '''
+        self._check_not_frozen()
         if name in self._func_map:
             raise ValueError(
                 'Function Production with name {} has already been created'.format(name))
@@ -216,6 +264,14 @@ class ProductionSpec:
         '''Return the number of defined productions'''
         return len(self._productions)
 
+    def freeze(self) -> None:
+        '''Forbid any further production'''
+        self._frozen = True
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
     def __repr__(self):
         return 'ProductionSpec({})'.format([str(x) for x in self._productions])
 
@@ -260,12 +316,21 @@ class ProgramSpec:
 class PredicateSpec:
     _preds: List[Predicate]
     _name_map: DefaultDict[str, List[Predicate]]
+    _frozen: bool
 
     def __init__(self):
         self._preds = list()
         self._name_map = defaultdict(list)
+        self._frozen = False
 
     def add_predicate(self, name: str, args: List[Any]=[]) -> Predicate:
+        '''
+        Create a new predicate. Return the created predicate.
+        Raise `ValueError` if the spec is frozen.
+        '''
+        if self._frozen:
+            raise ValueError(
+                'Cannot add predicate {} to a frozen spec'.format(name))
         pred = Predicate(name, args)
         self._preds.append(pred)
         self._name_map[name].append(pred)
@@ -281,18 +346,187 @@ class PredicateSpec:
         '''Return the number of predicates'''
         return len(self._preds)
 
+    def freeze(self) -> None:
+        '''Forbid any further predicate'''
+        self._frozen = True
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+
+class ProductionIndex:
+    '''
+    Read-only tables over the productions of a frozen spec, so that hot loops do not have to go through all the productions or their string representation.
+    Types are numbered in the order they are defined, and productions by their ID. Masks are `bytes` with a 0/1 entry per production. Integer tables are read-only views of `array`s.
+    A production is "empty" if its LHS is the type named `Empty`: the SMT enumerator fills the unused child slots of its k-tree with such productions.
+    '''
+    EMPTY_TYPE_NAME = 'Empty'
+
+    _types: Tuple[Type, ...]
+    _type_ids: Dict[str, int]
+    _productions: Tuple[Production, ...]
+    _lhs_ids: memoryview
+    _by_lhs: Tuple[Tuple[Production, ...], ...]
+    _ids_by_lhs: Tuple[Tuple[int, ...], ...]
+    _is_function: bytes
+    _is_param: bytes
+    _is_enum: bytes
+    _is_leaf: bytes
+    _is_empty: bytes
+    _arity: memoryview
+    _max_arity: int
+    # Type ID of each child slot, `max_arity` slots per production, -1 for the slots a production does not use
+    _child_type_ids: memoryview
+    # Type IDs of the children of each production, without the unused slots
+    _children_by_prod: Tuple[Tuple[int, ...], ...]
+
+    def __init__(self, types: Iterable[Type], productions: Iterable[Production]):
+        self._types = tuple(types)
+        self._type_ids = {ty.name: i for i, ty in enumerate(self._types)}
+        self._productions = tuple(productions)
+        for i, prod in enumerate(self._productions):
+            if prod.id != i:
+                raise ValueError(
+                    'Productions must be numbered consecutively from 0: {}'.format(prod))
+        lhs_ids = array('i', [self.type_id(x.lhs) for x in self._productions])
+        self._lhs_ids = memoryview(lhs_ids).toreadonly()
+        by_lhs = [[] for _ in self._types]  # type: List[List[Production]]
+        for prod, lhs_id in zip(self._productions, lhs_ids):
+            by_lhs[lhs_id].append(prod)
+        self._by_lhs = tuple([tuple(x) for x in by_lhs])
+        self._ids_by_lhs = tuple([tuple([p.id for p in x]) for x in by_lhs])
+
+        self._is_function = bytes([x.is_function() for x in self._productions])
+        self._is_param = bytes([x.is_param() for x in self._productions])
+        self._is_enum = bytes([x.is_enum() for x in self._productions])
+        self._is_leaf = bytes([not x.is_function() for x in self._productions])
+        empty_id = self._type_ids.get(self.EMPTY_TYPE_NAME)
+        self._is_empty = bytes([x == empty_id for x in lhs_ids])
+
+        arity = array('i', [len(x.rhs) if x.is_function() else 0
+                            for x in self._productions])
+        self._arity = memoryview(arity).toreadonly()
+        self._max_arity = max(arity, default=0)
+        child_type_ids = array('i', [-1]) * (len(self._productions) * self._max_arity)
+        for prod in self._productions:
+            if prod.is_function():
+                base = prod.id * self._max_arity
+                for slot, ty in enumerate(prod.rhs):
+                    child_type_ids[base + slot] = self.type_id(ty)
+        self._child_type_ids = memoryview(child_type_ids).toreadonly()
+        self._children_by_prod = tuple([
+            tuple(child_type_ids[x.id * self._max_arity:x.id * self._max_arity + arity[x.id]])
+            for x in self._productions])
+
+    def __reduce__(self):
+        # Views cannot be pickled, but they are cheap to recompute
+        return (ProductionIndex, (self._types, self._productions))
+
+    @property
+    def types(self) -> Tuple[Type, ...]:
+        return self._types
+
+    def num_types(self) -> int:
+        return len(self._types)
+
+    def num_productions(self) -> int:
+        return len(self._productions)
+
+    def type_id(self, ty: Union[str, Type]) -> int:
+        '''
+        Return the ID of `ty`, where `ty` can be a Type or a string representing the name of the type.
+        Raise `KeyError` if the type is not defined.
+        '''
+        name = ty.name if isinstance(ty, Type) else ty
+        return self._type_ids[name]
+
+    def productions_with_lhs_id(self, type_id: int) -> Tuple[Production, ...]:
+        '''Return the productions whose LHS is the type with ID `type_id`'''
+        return self._by_lhs[type_id]
+
+    def ids_with_lhs_id(self, type_id: int) -> Tuple[int, ...]:
+        '''Return the IDs of the productions whose LHS is the type with ID `type_id`, in increasing order'''
+        return self._ids_by_lhs[type_id]
+
+    @property
+    def lhs_ids(self) -> memoryview:
+        '''The type ID of the LHS of each production'''
+        return self._lhs_ids
+
+    @property
+    def is_function(self) -> bytes:
+        return self._is_function
+
+    @property
+    def is_param(self) -> bytes:
+        return self._is_param
+
+    @property
+    def is_enum(self) -> bytes:
+        return self._is_enum
+
+    @property
+    def is_leaf(self) -> bytes:
+        '''Whether each production has no child, i.e. it is a param or an enum production'''
+        return self._is_leaf
+
+    @property
+    def is_empty(self) -> bytes:
+        return self._is_empty
+
+    @property
+    def empty_type_id(self) -> Optional[int]:
+        '''The ID of the type named `Empty`, or None if the spec does not define it'''
+        return self._type_ids.get(self.EMPTY_TYPE_NAME)
+
+    @property
+    def arity(self) -> memoryview:
+        '''The number of children of each production (0 for params and enums)'''
+        return self._arity
+
+    @property
+    def max_arity(self) -> int:
+        return self._max_arity
+
+    def child_type_id(self, prod_id: int, slot: int) -> int:
+        '''
+        Return the type ID of the child at position `slot` of production `prod_id`, or -1 if the production has no such child.
+        Raise `IndexError` if `slot` is not smaller than `max_arity`.
+        '''
+        if not 0 <= slot < self._max_arity:
+            raise IndexError(
+                'Child slot out of range: {}'.format(slot))
+        return self._child_type_ids[prod_id * self._max_arity + slot]
+
+    def child_type_ids(self, prod_id: int) -> Tuple[int, ...]:
+        '''Return the type IDs of the children of production `prod_id`, in order (empty for params and enums)'''
+        return self._children_by_prod[prod_id]
+
+    def __repr__(self) -> str:
+        return 'ProductionIndex(types={}, productions={})'.format(
+            len(self._types), len(self._productions))
+
 
 class TyrellSpec:
     _type_spec: TypeSpec
     _prog_spec: ProgramSpec
     _prod_spec: ProductionSpec
     _pred_spec: PredicateSpec
+    _index: ProductionIndex
 
     def __init__(self,
                  type_spec,
                  prog_spec,
-                 prod_spec=ProductionSpec(),
-                 pred_spec=PredicateSpec()):
+                 prod_spec=None,
+                 pred_spec=None):
+        '''
+        Complete the given specs with the enum and param productions, then freeze them: nothing can be added to a spec once it is part of a TyrellSpec.
+        '''
+        if prod_spec is None:
+            prod_spec = ProductionSpec()
+        if pred_spec is None:
+            pred_spec = PredicateSpec()
         # Generate all enum productions
         self._add_enum_productions(
             prod_spec,
@@ -306,9 +540,23 @@ class TyrellSpec:
         self._prod_spec = prod_spec
         self._pred_spec = pred_spec
 
+        type_spec.freeze()
+        prod_spec.freeze()
+        pred_spec.freeze()
+        self._index = ProductionIndex(type_spec.types(), prod_spec.productions())
+
+    @property
+    def index(self) -> ProductionIndex:
+        '''Precomputed tables over the productions, see `ProductionIndex`'''
+        return self._index
+
     @staticmethod
     def _add_enum_productions(prod_spec, enum_tys):
         for ty in enum_tys:
+            if isinstance(ty, EnumSetType):
+                if len(ty.domain) > 0:
+                    prod_spec.add_enum_set_production(ty)
+                continue
             for i in range(len(ty.domain)):
                 prod_spec.add_enum_production(ty, i)
 
@@ -1,6 +1,18 @@
 import unittest
-from .type import EnumType, ValueType
-from .spec import TypeSpec, ProductionSpec, PredicateSpec
+import os
+import sys
+import pickle
+import tempfile
+from itertools import combinations
+from math import comb
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from ..cache import DiskCache
+from . import do_parse
+from .parser import LarkError
+from .type import EnumType, EnumSetType, ValueType
+from .spec import TypeSpec, ProductionSpec, PredicateSpec, ProgramSpec, TyrellSpec
+from .util import EnumSetDomain
 
 
 class TestTyrellSpec(unittest.TestCase):
@@ -71,5 +83,269 @@ class TestTyrellSpec(unittest.TestCase):
         self.assertEqual(len(h_preds), 0)
 
 
+class TestProductionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self._spec = do_parse.parse(r'''
+            enum SmallInt {
+              "0", "1"
+            }
+            value Int;
+            value Empty;
+            program Toy(Int, Int) -> Int;
+            func const: Int -> SmallInt;
+            func plus: Int -> Int, Int;
+            func empty: Empty -> Empty;
+        ''')
+
+    def check_index(self, spec, index):
+        self.assertEqual(index.num_productions(), spec.num_productions())
+        self.assertEqual(index.num_types(), spec.num_types())
+        self.assertEqual(index.max_arity, 2)
+        for prod in spec.productions():
+            pid = prod.id
+            self.assertIs(index.types[index.lhs_ids[pid]], prod.lhs)
+            self.assertEqual(index.is_function[pid], prod.is_function())
+            self.assertEqual(index.is_param[pid], prod.is_param())
+            self.assertEqual(index.is_enum[pid], prod.is_enum())
+            self.assertEqual(index.is_leaf[pid], not prod.is_function())
+            self.assertEqual(index.is_empty[pid], prod.lhs.name == 'Empty')
+            arity = len(prod.rhs) if prod.is_function() else 0
+            self.assertEqual(index.arity[pid], arity)
+            self.assertListEqual([index.types[x] for x in index.child_type_ids(pid)],
+                                 prod.rhs if prod.is_function() else [])
+            for slot in range(index.max_arity):
+                if slot < arity:
+                    self.assertIs(index.types[index.child_type_id(pid, slot)], prod.rhs[slot])
+                else:
+                    self.assertEqual(index.child_type_id(pid, slot), -1)
+        for ty in spec.types():
+            type_id = index.type_id(ty)
+            self.assertEqual(index.type_id(ty.name), type_id)
+            self.assertListEqual(list(index.productions_with_lhs_id(type_id)),
+                                 spec.get_productions_with_lhs(ty))
+            self.assertListEqual(list(index.ids_with_lhs_id(type_id)),
+                                 [x.id for x in spec.get_productions_with_lhs(ty)])
+
+    def test_index(self):
+        spec = self._spec
+        index = spec.index
+        self.check_index(spec, index)
+        self.assertEqual(index.empty_type_id, index.type_id('Empty'))
+        self.assertEqual(sum(index.is_empty), 1)
+        with self.assertRaises(KeyError):
+            index.type_id('NotAType')
+        with self.assertRaises(IndexError):
+            index.child_type_id(0, 2)
+        with self.assertRaises(TypeError):
+            index.arity[0] = 3
+
+    def test_pickle(self):
+        spec = pickle.loads(pickle.dumps(self._spec))
+        self.check_index(spec, spec.index)
+
+    def test_frozen(self):
+        spec = self._spec
+        with self.assertRaises(ValueError):
+            spec._type_spec.define_type(ValueType('Other'))
+        with self.assertRaises(ValueError):
+            spec._prod_spec.add_func_production(
+                name='neg', lhs=spec.get_type('Int'), rhs=[spec.get_type('Int')])
+        with self.assertRaises(ValueError):
+            spec._pred_spec.add_predicate('occurs', ['plus', 1])
+
+    def test_no_empty(self):
+        ty = ValueType('Int')
+        type_spec = TypeSpec()
+        type_spec.define_type(ty)
+        prod_spec = ProductionSpec()
+        prod_spec.add_func_production(name='neg', lhs=ty, rhs=[ty])
+        spec = TyrellSpec(type_spec, ProgramSpec('P', [ty], ty), prod_spec)
+        self.assertIsNone(spec.index.empty_type_id)
+        self.assertEqual(bytes(spec.index.is_empty), bytes(2))
+        # Default specs are not shared between TyrellSpecs
+        other = TyrellSpec(TypeSpec(), ProgramSpec('Q', [], ty))
+        self.assertEqual(other.num_productions(), 0)
+
+
+class TestEnumSetDomain(unittest.TestCase):
+
+    def test_domain(self):
+        elems = ['a', 'b', 'c', 'd', 'e']
+        for max_len in range(7):
+            domain = EnumSetDomain(elems, max_len)
+            expected = [list(x) for k in range(1, max_len + 1) for x in combinations(elems, k)]
+            self.assertEqual(len(domain), len(expected))
+            self.assertListEqual(list(domain), expected)
+            self.assertListEqual([domain[i] for i in range(len(domain))], expected)
+            self.assertListEqual([domain.rank(x) for x in expected], list(range(len(expected))))
+            self.assertEqual(domain, expected)
+        domain = EnumSetDomain(elems, 3)
+        self.assertListEqual(domain[-1], ['c', 'd', 'e'])
+        self.assertListEqual(domain[3:6:2], [['d'], ['a', 'b']])
+        self.assertEqual(domain.index(['b', 'd']), 10)
+        self.assertIn(['a', 'e'], domain)
+        self.assertNotIn(['e', 'a'], domain)
+        self.assertNotIn(['a', 'b', 'c', 'd'], domain)
+        self.assertNotIn(['f'], domain)
+        self.assertNotIn([], domain)
+        self.assertNotIn('a', domain)
+        with self.assertRaises(IndexError):
+            domain[len(domain)]
+        with self.assertRaises(ValueError):
+            domain.index(['a', 'a'])
+        with self.assertRaises(ValueError):
+            EnumSetDomain(elems, -1)
+        with self.assertRaises(ValueError):
+            EnumSetDomain(['a', 'a'], 1)
+
+    def test_mask(self):
+        domain = EnumSetDomain(['a', 'b', 'c', 'd'], 2)
+        for value in domain:
+            self.assertListEqual(domain.from_mask(domain.to_mask(value)), value)
+        self.assertEqual(domain.to_mask(['b', 'd']), 0b1010)
+        for mask in [0, 0b111, 0b10000, -1]:
+            with self.assertRaises(ValueError):
+                domain.from_mask(mask)
+        with self.assertRaises(ValueError):
+            domain.to_mask(['d', 'b'])
+
+    def test_large_domain(self):
+        domain = EnumSetDomain([str(x) for x in range(1000)], 4)
+        self.assertEqual(len(domain), sum(comb(1000, k) for k in range(1, 5)))
+        for index in [0, 999, 1000, 123456789, len(domain) - 1]:
+            self.assertEqual(domain.rank(domain[index]), index)
+
+    def test_parse(self):
+        spec = do_parse.parse(r'''
+            enumset Cols[2] {
+              "1", "2", "3"
+            }
+            value Table;
+            program P(Table) -> Table;
+            func select: Table -> Table, Cols;
+        ''')
+        cols = spec.get_type_or_raise('Cols')
+        self.assertIsInstance(cols, EnumSetType)
+        self.assertIsInstance(cols.domain, EnumSetDomain)
+        # A single symbolic production stands for the whole domain
+        prods = spec.get_productions_with_lhs(cols)
+        self.assertEqual(len(prods), 1)
+        self.assertTrue(prods[0].is_enum_set())
+        self.assertTrue(prods[0].is_symbolic())
+        self.assertListEqual(prods[0].rhs, [])
+        self.assertTrue(spec.index.is_enum[prods[0].id])
+        self.assertListEqual([x.rhs[0] for x in prods[0].instances()], list(cols.domain))
+        prod = spec.get_enum_production(cols, ['2', '3'])
+        self.assertEqual(prod.id, prods[0].id)
+        self.assertEqual(prod.choice, 5)
+        self.assertEqual(prod, prods[0].with_choice(5))
+        self.assertNotEqual(prod, prods[0])
+        self.assertEqual(prod.mask, 0b110)
+        self.assertEqual(prods[0].with_mask(0b110), prod)
+        self.assertIsNone(spec.get_enum_production(cols, ['3', '2']))
+        with self.assertRaises(KeyError):
+            spec.get_enum_production_or_raise(cols, ['4'])
+        with self.assertRaises(ValueError):
+            prods[0].with_mask(0b111)
+        with self.assertRaises(ValueError):
+            prods[0].with_choice(len(cols.domain))
+
+
+class TestParseFile(unittest.TestCase):
+    spec_str = r'''
+        enum SmallInt {
+          "0", "1"
+        }
+        value Int {
+            pos: bool;
+        }
+        program Toy(Int, Int) -> Int;
+        func const: Int -> SmallInt;
+        func plus: Int r -> Int a, Int b {
+            pos(a) && pos(b) ==> pos(r);
+        }
+        predicate commutative(plus);
+    '''
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'toy.tyrell')
+            with open(path, 'w') as f:
+                f.write(self.spec_str)
+            cache = DiskCache(os.path.join(tmp_dir, 'cache'))
+            spec = do_parse.parse_file(path, cache=cache)
+            self.assertEqual(len(os.listdir(os.path.join(tmp_dir, 'cache', 'spec'))), 1)
+
+            # A cache hit does not parse anything
+            with mock.patch.object(do_parse, 'parse', side_effect=AssertionError):
+                cached = do_parse.parse_file(path, cache=cache)
+            self.assertIsNot(cached, spec)
+            self.assertListEqual([str(x) for x in cached.productions()],
+                                 [str(x) for x in spec.productions()])
+            self.assertListEqual([str(x) for x in cached.predicates()],
+                                 [str(x) for x in spec.predicates()])
+            plus = cached.get_function_production_or_raise('plus')
+            self.assertIs(plus.lhs, cached.get_type_or_raise('Int'))
+            self.assertEqual(str(plus.constraints[0]), str(
+                spec.get_function_production_or_raise('plus').constraints[0]))
+
+            # Another content is another entry
+            with open(path, 'w') as f:
+                f.write(self.spec_str.replace('"1"', '"2"'))
+            other = do_parse.parse_file(path, cache=cache)
+            self.assertEqual(len(os.listdir(os.path.join(tmp_dir, 'cache', 'spec'))), 2)
+            self.assertIsNotNone(other.get_enum_production(other.get_type_or_raise('SmallInt'), '2'))
+
+
+def make_spec_str(index):
+    funcs = '\n'.join(['func f{}_{}: Int -> Int, SmallInt;'.format(index, i) for i in range(index % 7 + 1)])
+    return r'''
+        enum SmallInt {{
+          "{0}", "{1}"
+        }}
+        value Int {{
+            size: int;
+        }}
+        program P{0}(Int) -> Int;
+        {2}
+        func g{0}: Int r -> Int a {{
+            size(r) <= size(a) + {0};
+        }}
+        predicate occurs(g{0}, {0});
+    '''.format(index, index + 1, funcs)
+
+
+def describe(spec):
+    return ([str(x) for x in spec.productions()],
+            [str(x) for x in spec.predicates()],
+            [str(x) for x in spec.get_function_production_or_raise('g' + spec.name[1:]).constraints])
+
+
+class TestConcurrentParse(unittest.TestCase):
+
+    def test_thread_pool(self):
+        inputs = [make_spec_str(i) for i in range(200)]
+        expected = [describe(do_parse.parse(x)) for x in inputs]
+        # Switch threads often, so that the parses interleave
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                for _ in range(3):
+                    actual = list(executor.map(lambda x: describe(do_parse.parse(x)), inputs))
+                    self.assertListEqual(actual, expected)
+        finally:
+            sys.setswitchinterval(interval)
+
+    def test_error_recovery(self):
+        for _ in range(2):
+            with self.assertRaises(LarkError):
+                do_parse.parse('program P(Int) ->')
+        spec = do_parse.parse(make_spec_str(3))
+        self.assertEqual(spec.name, 'P3')
+        self.assertEqual(len(spec.get_function_productions()), 5)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Tuple, Optional, Any
+from typing import List, Dict, Tuple, Optional, Any, Sequence
 from .expr import ExprType
+from .util import EnumSetDomain
 
 
 class Type(ABC):
@@ -40,14 +41,14 @@ class Type(ABC):
 class EnumType(Type):
     '''A special kind of type whose domain is finite and specified up-front'''
 
-    _domain: List[Any]
+    _domain: Sequence[Any]
 
-    def __init__(self, name: str, domain: List[Any] = []):
+    def __init__(self, name: str, domain: Sequence[Any] = []):
         super().__init__(name)
         self._domain = domain
 
     @property
-    def domain(self) -> List[Any]:
+    def domain(self) -> Sequence[Any]:
         return self._domain
 
     def is_enum(self) -> bool:
@@ -60,6 +61,34 @@ class EnumType(Type):
         return 'EnumType({}, domain={})'.format(self._name, self._domain)
 
 
+class EnumSetType(EnumType):
+    '''
+    An enum type whose values are the sets of 1 to `max_len` distinct elements, as lists.
+    The domain is not materialized, and a spec gives the type a single symbolic production rather than one production per value, see `EnumSetProduction`.
+    '''
+
+    _domain: EnumSetDomain
+
+    def __init__(self, name: str, elements: List[Any], max_len: int):
+        super().__init__(name, EnumSetDomain(elements, max_len))
+
+    @property
+    def domain(self) -> EnumSetDomain:
+        return self._domain
+
+    @property
+    def elements(self) -> List[Any]:
+        return self._domain.elements
+
+    @property
+    def max_len(self) -> int:
+        return self._domain.max_len
+
+    def __repr__(self) -> str:
+        return 'EnumSetType({}, elements={}, max_len={})'.format(
+            self._name, self.elements, self.max_len)
+
+
 class ValueType(Type):
     _properties: Dict[str, ExprType]
 
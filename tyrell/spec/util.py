@@ -1,7 +1,144 @@
-from itertools import combinations, chain
+from typing import Any, Dict, Iterator, List, Sequence
+from itertools import combinations
+from math import comb
+
+
+class EnumSetDomain(Sequence):
+    '''
+    The domain of an enumset type: all the combinations of 1 to `max_len` distinct elements, as lists.
+    They are ordered by size, then in the order given by `itertools.combinations`, so index `i` is the same combination as in a fully materialized list.
+    Combinations are computed on access, by unranking their index, hence the domain takes space linear in the number of elements whatever its size.
+    '''
+    _elems: List[Any]
+    _positions: Dict[Any, int]
+    _max_len: int
+    # Index of the first combination of each size
+    _offsets: List[int]
+
+    def __init__(self, elems: List[Any], max_len: int):
+        if max_len < 0:
+            raise ValueError(
+                'Max length of an enumset cannot be negative: {}'.format(max_len))
+        self._elems = list(elems)
+        self._positions = {x: i for i, x in enumerate(self._elems)}
+        if len(self._positions) != len(self._elems):
+            raise ValueError(
+                'Elements of an enumset must be distinct: {}'.format(self._elems))
+        self._max_len = min(max_len, len(self._elems))
+        self._offsets = [0]
+        for k in range(1, self._max_len + 1):
+            self._offsets.append(self._offsets[-1] + comb(len(self._elems), k))
+
+    @property
+    def elements(self) -> List[Any]:
+        return self._elems
+
+    @property
+    def max_len(self) -> int:
+        return self._max_len
+
+    def __len__(self) -> int:
+        return self._offsets[-1]
+
+    def _size_of(self, index: int) -> int:
+        for k in range(1, self._max_len + 1):
+            if index < self._offsets[k]:
+                return k
+        raise IndexError('EnumSetDomain index out of range: {}'.format(index))
+
+    def unrank(self, index: int) -> List[Any]:
+        '''Return the combination at position `index`. Raise `IndexError` if it is out of range.'''
+        if index < 0:
+            raise IndexError('EnumSetDomain index out of range: {}'.format(index))
+        k = self._size_of(index)
+        rest = index - self._offsets[k - 1]
+        n = len(self._elems)
+        ret = []
+        pos = 0
+        for i in range(k, 0, -1):
+            # Skip the combinations that start with an element before `pos`
+            while True:
+                count = comb(n - pos - 1, i - 1)
+                if rest < count:
+                    break
+                rest -= count
+                pos += 1
+            ret.append(self._elems[pos])
+            pos += 1
+        return ret
+
+    def rank(self, value: Sequence[Any]) -> int:
+        '''Return the position of the combination `value`. Raise `ValueError` if it is not in the domain.'''
+        if isinstance(value, str):
+            raise ValueError('{!r} is not in the enumset domain'.format(value))
+        try:
+            positions = [self._positions[x] for x in value]
+        except (KeyError, TypeError):
+            raise ValueError('{!r} is not in the enumset domain'.format(value)) from None
+        k = len(positions)
+        if k == 0 or k > self._max_len or any(x >= y for x, y in zip(positions, positions[1:])):
+            raise ValueError('{!r} is not in the enumset domain'.format(value))
+        n = len(self._elems)
+        ret = self._offsets[k - 1]
+        prev = -1
+        for i, pos in enumerate(positions):
+            for skipped in range(prev + 1, pos):
+                ret += comb(n - skipped - 1, k - i - 1)
+            prev = pos
+        return ret
+
+    def to_mask(self, value: Sequence[Any]) -> int:
+        '''Return the bitmask of the combination `value`, whose bit `i` is set iff it holds the `i`-th element. Raise `ValueError` if it is not in the domain.'''
+        self.rank(value)
+        return sum(1 << self._positions[x] for x in value)
+
+    def from_mask(self, mask: int) -> List[Any]:
+        '''Return the combination whose bitmask is `mask`. Raise `ValueError` if it is not in the domain.'''
+        if mask <= 0 or mask >> len(self._elems) != 0 or bin(mask).count('1') > self._max_len:
+            raise ValueError('Bitmask {:#x} is not in the enumset domain'.format(mask))
+        return [x for i, x in enumerate(self._elems) if mask >> i & 1]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.unrank(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self.unrank(index)
+
+    def __iter__(self) -> Iterator[List[Any]]:
+        for k in range(1, self._max_len + 1):
+            for x in combinations(self._elems, k):
+                yield list(x)
+
+    def __contains__(self, value) -> bool:
+        try:
+            self.rank(value)
+            return True
+        except ValueError:
+            return False
+
+    def index(self, value, start: int = 0, stop=None) -> int:
+        ret = self.rank(value)
+        if ret < start or (stop is not None and ret >= stop):
+            raise ValueError('{!r} is not in the given range of the enumset domain'.format(value))
+        return ret
+
+    def count(self, value) -> int:
+        return 1 if value in self else 0
+
+    def __eq__(self, other):
+        if isinstance(other, EnumSetDomain):
+            return self._elems == other._elems and self._max_len == other._max_len
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(x == y for x, y in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return 'EnumSetDomain({!r}, max_len={})'.format(self._elems, self._max_len)
 
 
 def enum_set_domain(elem_domain, max_len):
-    itr = chain.from_iterable(
-        [combinations(elem_domain, x) for x in range(1, max_len + 1)])
-    return [list(x) for x in itr]
+    '''Return the domain of an enumset of the given elements with at most `max_len` of them'''
+    return EnumSetDomain(elem_domain, max_len)
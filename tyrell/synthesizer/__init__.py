@@ -1 +1,3 @@
 from .synthesizer import Synthesizer
+from .parallel import ParallelSynthesizer
+from .portfolio import PortfolioSynthesizer
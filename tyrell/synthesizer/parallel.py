@@ -0,0 +1,203 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import cpu_count
+from queue import Queue
+import sexpdata
+from ..interpreter import InterpreterError
+from ..enumerator import Enumerator
+from ..decider import Decider, Blame
+from ..dsl import Node, Builder, NodeIndexer
+from ..spec import TyrellSpec
+from ..logger import get_logger
+
+logger = get_logger('tyrell.synthesizer.parallel')
+
+# Per-process state of the workers. Each worker builds its own decider (and hence its own interpreter) once, on its first task.
+_worker_builder: Optional[Builder] = None
+_worker_decider_factory: Optional[Callable[[], Decider]] = None
+_worker_decider: Optional[Decider] = None
+
+
+def _init_worker(spec: TyrellSpec, decider_factory: Callable[[], Decider]) -> None:
+    global _worker_builder, _worker_decider_factory, _worker_decider
+    _worker_builder = Builder(spec)
+    _worker_decider_factory = decider_factory
+    _worker_decider = None
+
+
+def _get_worker_decider() -> Decider:
+    '''
+    Build the decider of this worker if needed.
+    This happens in a task rather than in the initializer, so that an exception raised by the factory is reported as the result of the task.
+    '''
+    global _worker_decider
+    assert _worker_decider_factory is not None
+    if _worker_decider is None:
+        _worker_decider = _worker_decider_factory()
+    return _worker_decider
+
+
+def _encode_info(info: Any, prog: Node) -> Any:
+    '''
+    Blames refer to nodes of the worker's copy of the program. Replace each of them with the BFS index of its node and the id of its production, plus the choice of an enumset value, which the main process maps back to its own copy.
+    Any other kind of feedback is sent as is.
+    '''
+    if not isinstance(info, list):
+        return info
+    indexer = NodeIndexer(prog)
+    return [[_encode_blame(indexer, blame) for blame in core] for core in info]
+
+
+def _encode_blame(indexer: NodeIndexer, blame: Blame) -> Tuple[int, ...]:
+    nid = indexer.get_id_or_raise(blame.node)
+    if blame.production.is_enum_set():
+        return (nid, blame.production.id, blame.production.choice)
+    return (nid, blame.production.id)
+
+
+def _decode_info(info: Any, prog: Node, spec: TyrellSpec) -> Any:
+    if not isinstance(info, list):
+        return info
+    indexer = NodeIndexer(prog)
+    return [[_decode_blame(indexer, spec, *blame) for blame in core] for core in info]
+
+
+def _decode_blame(indexer: NodeIndexer, spec: TyrellSpec, nid: int, pid: int, choice: Optional[int] = None) -> Blame:
+    prod = spec.get_production_or_raise(pid)
+    if choice is not None:
+        prod = prod.with_choice(choice)
+    return Blame(indexer.get_node_or_raise(nid), prod)
+
+
+def _analyze(index: int, sexp_str: str) -> Tuple[int, bool, Any]:
+    assert _worker_builder is not None
+    decider = _get_worker_decider()
+    prog = _worker_builder.from_sexp_string(sexp_str)
+    try:
+        res = decider.analyze(prog)
+        if res.is_ok():
+            return index, True, None
+        info = res.why()
+    except InterpreterError as e:
+        info = decider.analyze_interpreter_error(e)
+    return index, False, _encode_info(info, prog)
+
+
+def _terminate(executor: ProcessPoolExecutor) -> None:
+    '''Shut `executor` down without waiting for the tasks in flight'''
+    # The executor forgets its processes on shutdown, and has no public way to kill them
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+class ParallelSynthesizer:
+    '''
+    A synthesizer that checks several candidate programs at the same time.
+    The enumerator stays in the main process, while the candidates are analyzed by a pool of worker processes, each of which owns a decider created by `decider_factory`.
+    `decider_factory` must be picklable (e.g. a module-level function or a `functools.partial` of one), since the workers may be spawned rather than forked.
+    Programs travel to the workers as sexp strings. The feedback of each analysis is passed to `enumerator.update()` as soon as it arrives, and all the workers are terminated as soon as one program is accepted.
+    If the decider factory or an analysis raises, `synthesize()` raises the same exception. If a worker dies, it raises `concurrent.futures.process.BrokenProcessPool`.
+    '''
+
+    _enumerator: Enumerator
+    _spec: TyrellSpec
+    _decider_factory: Callable[[], Decider]
+    _num_workers: int
+    _max_pending: int
+    _num_attempts: int
+
+    def __init__(self,
+                 enumerator: Enumerator,
+                 spec: TyrellSpec,
+                 decider_factory: Callable[[], Decider],
+                 num_workers: Optional[int] = None,
+                 max_pending: Optional[int] = None):
+        '''
+        `num_workers` defaults to the number of CPUs.
+        `max_pending` bounds the number of programs that have been enumerated but not analyzed yet. It defaults to the number of workers.
+        Raising it keeps the workers busy when enumeration is slow, but candidates enumerated ahead of time miss the feedback of the analyses still in flight, so blame-based pruning becomes less effective.
+        '''
+        self._enumerator = enumerator
+        self._spec = spec
+        self._decider_factory = decider_factory
+        if num_workers is None:
+            num_workers = cpu_count()
+        if num_workers <= 0:
+            raise ValueError(
+                'Number of workers cannot be non-positive: {}'.format(num_workers))
+        self._num_workers = num_workers
+        if max_pending is None:
+            max_pending = num_workers
+        if max_pending <= 0:
+            raise ValueError(
+                'Max pending programs cannot be non-positive: {}'.format(max_pending))
+        self._max_pending = max_pending
+        self._num_attempts = 0
+
+    @property
+    def enumerator(self):
+        return self._enumerator
+
+    @property
+    def num_workers(self):
+        return self._num_workers
+
+    @property
+    def num_attempts(self) -> int:
+        '''Number of programs analyzed by the last call to `synthesize()`'''
+        return self._num_attempts
+
+    def synthesize(self) -> Optional[Node]:
+        '''
+        Enumerate ASTs until one of them passes the analysis.
+        Returns the synthesized program, or `None` if the synthesis failed.
+        '''
+        num_attempts = 0
+        self._num_attempts = 0
+        num_submitted = 0
+        # programs that are being analyzed, indexed by submission order
+        pending: Dict[int, Node] = dict()
+        # futures of the analyses, in order of completion
+        results: Queue = Queue()
+        exhausted = False
+        executor = ProcessPoolExecutor(self._num_workers, initializer=_init_worker,
+                                       initargs=(self._spec, self._decider_factory))
+        try:
+            while True:
+                if not exhausted and len(pending) < self._max_pending:
+                    num_wanted = self._max_pending - len(pending)
+                    progs = self._enumerator.next_batch(num_wanted)
+                    exhausted = len(progs) < num_wanted
+                    for prog in progs:
+                        logger.debug('Enumerator generated: {}'.format(prog))
+                        pending[num_submitted] = prog
+                        future = executor.submit(
+                            _analyze, num_submitted, sexpdata.dumps(prog.to_sexp()))
+                        future.add_done_callback(results.put)
+                        num_submitted += 1
+                if len(pending) == 0:
+                    break
+
+                future = results.get()
+                # Failures of the workers, including their death, are raised here
+                index, is_ok, info = future.result()
+                prog = pending.pop(index)
+                num_attempts += 1
+                self._num_attempts = num_attempts
+                if is_ok:
+                    logger.debug(
+                        'Program accepted after {} attempts'.format(num_attempts))
+                    return prog
+                info = _decode_info(info, prog, self._spec)
+                logger.debug('Program rejected. Reason: {}'.format(info))
+                self._enumerator.update(info)
+        finally:
+            # Do not wait for the remaining analyses
+            _terminate(executor)
+        logger.debug(
+            'Enumerator is exhausted after {} attempts'.format(num_attempts))
+        return None
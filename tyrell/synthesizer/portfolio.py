@@ -0,0 +1,163 @@
+from typing import Any, Callable, List, Optional
+from multiprocessing import Process, Queue
+from queue import Empty
+import time
+import traceback
+import sexpdata
+from ..enumerator import Enumerator, SmtEnumerator
+from ..dsl import Node, Builder
+from ..spec import TyrellSpec
+from ..logger import get_logger
+from .synthesizer import Synthesizer
+
+logger = get_logger('tyrell.synthesizer.portfolio')
+
+
+class LemmaSharingEnumerator(Enumerator):
+    '''
+    Wrap an `SmtEnumerator` so that the lemmas it learns are sent to the other members of a portfolio, and the lemmas they learn are added to it before each enumeration.
+    '''
+    _enumerator: SmtEnumerator
+    _inbox: Any
+    _outboxes: List[Any]
+
+    def __init__(self, enumerator: SmtEnumerator, inbox, outboxes):
+        super().__init__()
+        self._enumerator = enumerator
+        self._inbox = inbox
+        self._outboxes = outboxes
+
+    def _receive(self):
+        while True:
+            try:
+                lemmas = self._inbox.get_nowait()
+            except Empty:
+                return
+            self._enumerator.import_lemmas(lemmas)
+
+    def next(self) -> Optional[Node]:
+        self._receive()
+        return self._enumerator.next()
+
+    def next_batch(self, k: int) -> List[Node]:
+        self._receive()
+        return self._enumerator.next_batch(k)
+
+    def update(self, info: Any = None) -> None:
+        self._enumerator.update(info)
+        lemmas = self._enumerator.export_lemmas()
+        if len(lemmas) > 0:
+            for outbox in self._outboxes:
+                outbox.put(lemmas)
+
+
+def _run_member(index: int, factory: Callable[[], Synthesizer], results, inbox, outboxes) -> None:
+    try:
+        synthesizer = factory()
+        if inbox is not None and isinstance(synthesizer.enumerator, SmtEnumerator):
+            # Members that are killed must not wait for their lemmas to be delivered
+            for outbox in outboxes:
+                outbox.cancel_join_thread()
+            synthesizer = Synthesizer(
+                LemmaSharingEnumerator(synthesizer.enumerator, inbox, outboxes), synthesizer.decider)
+        prog = synthesizer.synthesize()
+        sexp_str = sexpdata.dumps(prog.to_sexp()) if prog is not None else None
+        results.put((index, sexp_str, None))
+    except Exception:
+        results.put((index, None, traceback.format_exc()))
+
+
+class PortfolioSynthesizer:
+    '''
+    Run several synthesizers on the same problem, each in its own process, and return the first program found.
+    Each member is described by a picklable factory that builds a `Synthesizer` (e.g. a module-level function or a `functools.partial` of one). Members typically differ by their enumerator: `SmtEnumerator` with various depths, locs or MaxSAT engines, `RandomEnumerator` with various seeds, `ExhaustiveEnumerator`, etc.
+    If `share_lemmas` is set, the members whose enumerator is an `SmtEnumerator` send each other the lemmas learned from blames. All the members must then solve the same problem on the same spec.
+    '''
+
+    _spec: TyrellSpec
+    _members: List[Callable[[], Synthesizer]]
+    _share_lemmas: bool
+    _timeout: Optional[float]
+    _winner: Optional[int]
+
+    def __init__(self,
+                 spec: TyrellSpec,
+                 members: List[Callable[[], Synthesizer]],
+                 share_lemmas: bool = False,
+                 timeout: Optional[float] = None):
+        '''
+        `timeout` bounds the wall-clock time of `synthesize()` in seconds. By default, it runs until some member succeeds or all of them fail.
+        '''
+        if len(members) == 0:
+            raise ValueError('PortfolioSynthesizer needs at least one member')
+        if timeout is not None and timeout <= 0:
+            raise ValueError(
+                'Timeout cannot be non-positive: {}'.format(timeout))
+        self._spec = spec
+        self._members = members
+        self._share_lemmas = share_lemmas
+        self._timeout = timeout
+        self._winner = None
+
+    @property
+    def members(self):
+        return self._members
+
+    @property
+    def winner(self) -> Optional[int]:
+        '''Index of the member that found the program returned by the last call to `synthesize()`'''
+        return self._winner
+
+    def synthesize(self) -> Optional[Node]:
+        '''
+        Run all the members until one of them finds a program, then terminate the others.
+        Returns the synthesized program, or `None` if all the members failed or the timeout expired.
+        '''
+        self._winner = None
+        results: Queue = Queue()
+        num_members = len(self._members)
+        if self._share_lemmas:
+            inboxes = [Queue() for _ in range(num_members)]
+        else:
+            inboxes = [None] * num_members
+        procs = []
+        for index, factory in enumerate(self._members):
+            outboxes = [x for i, x in enumerate(inboxes) if i != index and x is not None]
+            procs.append(Process(target=_run_member,
+                                 args=(index, factory, results, inboxes[index], outboxes)))
+        deadline = None if self._timeout is None else time.monotonic() + self._timeout
+        try:
+            for proc in procs:
+                proc.start()
+            num_done = 0
+            while num_done < num_members:
+                try:
+                    index, sexp_str, error = results.get(timeout=0.1)
+                except Empty:
+                    if deadline is not None and time.monotonic() > deadline:
+                        logger.debug('Portfolio timed out')
+                        return None
+                    # A member may have been killed without reporting anything
+                    if all(not proc.is_alive() for proc in procs) and results.empty():
+                        break
+                    continue
+                num_done += 1
+                if error is not None:
+                    logger.warning(
+                        'Portfolio member {} failed:\n{}'.format(index, error))
+                elif sexp_str is not None:
+                    logger.debug(
+                        'Program found by portfolio member {}'.format(index))
+                    self._winner = index
+                    return Builder(self._spec).from_sexp_string(sexp_str)
+                else:
+                    logger.debug(
+                        'Portfolio member {} is exhausted'.format(index))
+            return None
+        finally:
+            started = [proc for proc in procs if proc.pid is not None]
+            for proc in started:
+                if proc.is_alive():
+                    proc.terminate()
+            for proc in started:
+                proc.join()
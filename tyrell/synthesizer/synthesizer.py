@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Any
+import time
 from ..interpreter import InterpreterError
 from ..enumerator import Enumerator
 from ..decider import Decider
@@ -13,10 +14,14 @@ class Synthesizer(ABC):
 
     _enumerator: Enumerator
     _decider: Decider
+    _num_attempts: int
+    _decider_time: float
 
     def __init__(self, enumerator: Enumerator, decider: Decider):
         self._enumerator = enumerator
         self._decider = decider
+        self._num_attempts = 0
+        self._decider_time = 0.0
 
     @property
     def enumerator(self):
@@ -26,18 +31,32 @@ class Synthesizer(ABC):
     def decider(self):
         return self._decider
 
+    @property
+    def num_attempts(self) -> int:
+        '''Number of programs analyzed by the last call to `synthesize()`'''
+        return self._num_attempts
+
+    @property
+    def decider_time(self) -> float:
+        '''Seconds spent in the decider by the last call to `synthesize()`'''
+        return self._decider_time
+
     def synthesize(self):
         '''
         A convenient method to enumerate ASTs until the result passes the analysis.
         Returns the synthesized program, or `None` if the synthesis failed.
         '''
         num_attempts = 0
+        self._decider_time = 0.0
         prog = self._enumerator.next()
         while prog is not None:
             num_attempts += 1
+            self._num_attempts = num_attempts
             logger.debug('Enumerator generated: {}'.format(prog))
+            start = time.perf_counter()
             try:
                 res = self._decider.analyze(prog)
+                self._decider_time += time.perf_counter() - start
                 if res.is_ok():
                     logger.debug(
                         'Program accepted after {} attempts'.format(num_attempts))
@@ -49,9 +68,11 @@ class Synthesizer(ABC):
                     prog = self._enumerator.next()
             except InterpreterError as e:
                 info = self._decider.analyze_interpreter_error(e)
+                self._decider_time += time.perf_counter() - start
                 logger.debug('Interpreter failed. Reason: {}'.format(info))
                 self._enumerator.update(info)
                 prog = self._enumerator.next()
+        self._num_attempts = num_attempts
         logger.debug(
             'Enumerator is exhausted after {} attempts'.format(num_attempts))
         return None
@@ -0,0 +1,174 @@
+import os
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from ..spec import parse
+from ..dsl import Builder
+from ..interpreter import PostOrderInterpreter
+from ..enumerator import ExhaustiveEnumerator, SmtEnumerator, make_empty_enumerator
+from ..decider import Example, ExampleDecider, ExampleConstraintDecider, Blame
+from .parallel import ParallelSynthesizer, _encode_info, _decode_info
+
+spec_str = r'''
+    value IntExpr {
+        pos: bool;
+        neg: bool;
+    }
+    value Empty;
+
+    program Foo(IntExpr, IntExpr) -> IntExpr;
+    func plus: IntExpr r -> IntExpr a, IntExpr b {
+        pos(a) && pos(b) ==> pos(r);
+    }
+    func mult: IntExpr r -> IntExpr a, IntExpr b {
+        pos(a) && neg(b) ==> neg(r);
+        pos(a) && pos(b) ==> pos(r);
+    }
+    func minus: IntExpr r -> IntExpr a, IntExpr b;
+    func empty: Empty -> Empty;
+'''
+spec = parse(spec_str)
+builder = Builder(spec)
+examples = [
+    Example(input=[2, 3], output=10),
+    Example(input=[1, 4], output=5),
+]
+
+
+class FooInterpreter(PostOrderInterpreter):
+    def eval_plus(self, node, args):
+        return args[0] + args[1]
+
+    def eval_mult(self, node, args):
+        return args[0] * args[1]
+
+    def eval_minus(self, node, args):
+        return args[0] - args[1]
+
+    def apply_pos(self, arg):
+        return arg > 0
+
+    def apply_neg(self, arg):
+        return arg < 0
+
+
+def make_example_decider():
+    return ExampleDecider(interpreter=FooInterpreter(), examples=examples)
+
+
+def make_constraint_decider(spec):
+    return ExampleConstraintDecider(spec=spec, interpreter=FooInterpreter(), examples=examples,
+                                    num_processes=1)
+
+
+def make_broken_decider():
+    raise ValueError('Cannot build the decider')
+
+
+class DyingDecider(ExampleDecider):
+    def analyze(self, prog):
+        os._exit(1)
+
+
+def make_dying_decider():
+    return DyingDecider(interpreter=FooInterpreter(), examples=examples)
+
+
+class TestParallelSynthesizer(unittest.TestCase):
+
+    def check_solution(self, prog):
+        self.assertIsNotNone(prog)
+        interp = FooInterpreter()
+        for example in examples:
+            self.assertEqual(interp.eval(prog, example.input), example.output)
+
+    def test_exhaustive(self):
+        synthesizer = ParallelSynthesizer(
+            enumerator=ExhaustiveEnumerator(spec, max_depth=3),
+            spec=spec,
+            decider_factory=make_example_decider,
+            num_workers=2
+        )
+        self.check_solution(synthesizer.synthesize())
+
+    def test_smt_with_blames(self):
+        synthesizer = ParallelSynthesizer(
+            enumerator=SmtEnumerator(spec, depth=3, loc=1, max_loc=2),
+            spec=spec,
+            decider_factory=partial(make_constraint_decider, spec),
+            num_workers=2
+        )
+        self.check_solution(synthesizer.synthesize())
+
+    def test_exhausted(self):
+        synthesizer = ParallelSynthesizer(
+            enumerator=make_empty_enumerator(),
+            spec=spec,
+            decider_factory=make_example_decider,
+            num_workers=1
+        )
+        self.assertIsNone(synthesizer.synthesize())
+
+    def test_decider_failure(self):
+        synthesizer = ParallelSynthesizer(
+            enumerator=ExhaustiveEnumerator(spec, max_depth=3),
+            spec=spec,
+            decider_factory=make_broken_decider,
+            num_workers=2
+        )
+        with self.assertRaises(ValueError):
+            synthesizer.synthesize()
+
+    def test_worker_death(self):
+        synthesizer = ParallelSynthesizer(
+            enumerator=ExhaustiveEnumerator(spec, max_depth=3),
+            spec=spec,
+            decider_factory=make_dying_decider,
+            num_workers=2
+        )
+        with self.assertRaises(BrokenProcessPool):
+            synthesizer.synthesize()
+
+    def test_blame_serialization(self):
+        prog = builder.from_sexp_string(
+            '(mult (@param 0) (plus (@param 1) (@param 0)))')
+        copy = builder.from_sexp_string(
+            '(mult (@param 0) (plus (@param 1) (@param 0)))')
+        plus = prog.children[1]
+        info = [[Blame(prog, prog.production), Blame(plus.children[1], plus.children[1].production)]]
+        decoded = _decode_info(_encode_info(info, prog), copy, spec)
+        self.assertEqual(len(decoded), 1)
+        self.assertIs(decoded[0][0].node, copy)
+        self.assertIs(decoded[0][1].node, copy.children[1].children[1])
+        self.assertEqual(decoded[0][1].production, plus.children[1].production)
+        self.assertIsNone(_encode_info(None, prog))
+
+        # Blames on enumset values keep the value
+        enumset_spec = parse(r'''
+            enumset Cols[2] {
+              "a", "b", "c"
+            }
+            value Table;
+            program P(Table) -> Table;
+            func select: Table -> Table, Cols;
+        ''')
+        enumset_builder = Builder(enumset_spec)
+        prog = enumset_builder.from_sexp_string('(select (@param 0) (Cols ("b" "c")))')
+        copy = enumset_builder.from_sexp_string('(select (@param 0) (Cols ("b" "c")))')
+        info = [[Blame(prog.args[1], prog.args[1].production)]]
+        decoded = _decode_info(_encode_info(info, prog), copy, enumset_spec)
+        self.assertIs(decoded[0][0].node, copy.args[1])
+        self.assertEqual(decoded[0][0].production, prog.args[1].production)
+        self.assertListEqual(decoded[0][0].production.rhs, [['b', 'c']])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            ParallelSynthesizer(make_empty_enumerator(), spec,
+                                make_example_decider, num_workers=0)
+        with self.assertRaises(ValueError):
+            ParallelSynthesizer(make_empty_enumerator(), spec,
+                                make_example_decider, num_workers=1, max_pending=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
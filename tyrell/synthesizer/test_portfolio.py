@@ -0,0 +1,88 @@
+import unittest
+from functools import partial
+from ..enumerator import ExhaustiveEnumerator, SmtEnumerator, make_empty_enumerator
+from ..decider import ExampleConstraintDecider
+from .synthesizer import Synthesizer
+from .portfolio import PortfolioSynthesizer
+from .test_parallel import spec, builder, examples, FooInterpreter, make_example_decider
+
+
+def make_exhaustive(depth):
+    return Synthesizer(ExhaustiveEnumerator(spec, max_depth=depth), make_example_decider())
+
+
+def make_smt(depth, loc, max_loc):
+    return Synthesizer(
+        SmtEnumerator(spec, depth=depth, loc=loc, max_loc=max_loc),
+        ExampleConstraintDecider(spec=spec, interpreter=FooInterpreter(), examples=examples))
+
+
+def make_empty():
+    return Synthesizer(make_empty_enumerator(), make_example_decider())
+
+
+def make_broken():
+    raise RuntimeError('This member cannot be built')
+
+
+class TestPortfolioSynthesizer(unittest.TestCase):
+
+    def check_solution(self, prog):
+        self.assertIsNotNone(prog)
+        interp = FooInterpreter()
+        for example in examples:
+            self.assertEqual(interp.eval(prog, example.input), example.output)
+
+    def test_first_solution_wins(self):
+        synthesizer = PortfolioSynthesizer(spec, [
+            make_empty,
+            partial(make_smt, 3, 1, 2),
+            partial(make_exhaustive, 3),
+        ])
+        self.check_solution(synthesizer.synthesize())
+        self.assertIn(synthesizer.winner, [1, 2])
+
+    def test_share_lemmas(self):
+        synthesizer = PortfolioSynthesizer(spec, [
+            partial(make_smt, 3, 1, 2),
+            partial(make_smt, 4, 2, 2),
+        ], share_lemmas=True)
+        self.check_solution(synthesizer.synthesize())
+
+    def test_all_members_fail(self):
+        synthesizer = PortfolioSynthesizer(spec, [make_empty, make_broken])
+        self.assertIsNone(synthesizer.synthesize())
+        self.assertIsNone(synthesizer.winner)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            PortfolioSynthesizer(spec, [])
+        with self.assertRaises(ValueError):
+            PortfolioSynthesizer(spec, [make_empty], timeout=0)
+
+
+class TestLemmas(unittest.TestCase):
+
+    def test_export_import(self):
+        prog = builder.from_sexp_string('(minus (@param 0) (@param 1))')
+        source = SmtEnumerator(spec, depth=3, loc=1)
+        # Make the source enumerator own a copy of the program
+        found = None
+        for x in source.next_batch(100):
+            if str(x) == str(prog):
+                found = x
+        self.assertIsNotNone(found)
+        source.update([[(found, found.production)]])
+        lemmas = source.export_lemmas()
+        self.assertEqual(len(lemmas), 1)
+        self.assertListEqual(source.export_lemmas(), [])
+
+        # The root is node 1 in every k-tree
+        target = SmtEnumerator(spec, depth=4, loc=1, max_loc=2)
+        target.import_lemmas(lemmas)
+        for x in target.next_batch(1000):
+            self.assertNotEqual(x.name, 'minus')
+
+
+if __name__ == '__main__':
+    unittest.main()
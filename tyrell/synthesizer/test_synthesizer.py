@@ -0,0 +1,27 @@
+import unittest
+from ..enumerator import SmtEnumerator, make_empty_enumerator
+from .synthesizer import Synthesizer
+from .test_parallel import spec, make_example_decider
+
+
+class TestSynthesizer(unittest.TestCase):
+
+    def test_counters(self):
+        enumerator = SmtEnumerator(spec, depth=3, loc=1, max_loc=2)
+        synthesizer = Synthesizer(enumerator, make_example_decider())
+        self.assertIsNotNone(synthesizer.synthesize())
+        self.assertGreater(synthesizer.num_attempts, 0)
+        self.assertGreaterEqual(synthesizer.decider_time, 0.0)
+        # At least one solver call per enumerated program
+        self.assertGreaterEqual(
+            enumerator.num_solver_calls, synthesizer.num_attempts)
+
+    def test_counters_exhausted(self):
+        synthesizer = Synthesizer(make_empty_enumerator(), make_example_decider())
+        self.assertIsNone(synthesizer.synthesize())
+        self.assertEqual(synthesizer.num_attempts, 0)
+        self.assertEqual(synthesizer.decider_time, 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import os
+import tempfile
+from .cache import DiskCache, content_hash
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def test_content_hash(self):
+        self.assertEqual(content_hash('a', 'b'), content_hash('a', 'b'))
+        self.assertNotEqual(content_hash('a', 'b'), content_hash('ab'))
+        self.assertNotEqual(content_hash('a', 'b'), content_hash('b', 'a'))
+
+    def test_get_put(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = DiskCache(os.path.join(tmp_dir, 'cache'))
+            self.assertIsNone(cache.get('ns', 'key'))
+            cache.put('ns', 'key', {'a': [1, 2]})
+            self.assertDictEqual(cache.get('ns', 'key'), {'a': [1, 2]})
+            self.assertIsNone(cache.get('other', 'key'))
+            cache.put('ns', 'key', 3)
+            self.assertEqual(cache.get('ns', 'key'), 3)
+            self.assertListEqual(os.listdir(os.path.join(tmp_dir, 'cache', 'ns')), ['key.pickle'])
+
+    def test_corrupted_entry(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = DiskCache(tmp_dir)
+            cache.put('ns', 'key', 1)
+            with open(os.path.join(tmp_dir, 'ns', 'key.pickle'), 'wb') as f:
+                f.write(b'garbage')
+            self.assertIsNone(cache.get('ns', 'key'))
+
+
+if __name__ == '__main__':
+    unittest.main()
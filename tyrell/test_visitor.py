@@ -0,0 +1,49 @@
+import unittest
+from .visitor import GenericVisitor
+
+
+class FooNode:
+    pass
+
+
+class BarBazNode:
+    pass
+
+
+class FooVisitor(GenericVisitor):
+    def __init__(self):
+        pass
+
+    def visit_foo_node(self, node):
+        return 'foo'
+
+
+class FooBarVisitor(FooVisitor):
+    def visit_foo_node(self, node):
+        return 'foo2'
+
+    def visit_bar_baz_node(self, node):
+        return 'bar'
+
+
+class TestGenericVisitor(unittest.TestCase):
+
+    def test_dispatch(self):
+        visitor = FooVisitor()
+        self.assertEqual(visitor.visit(FooNode()), 'foo')
+        self.assertEqual(visitor.visit(FooNode()), 'foo')
+        with self.assertRaises(Exception) as cm:
+            visitor.visit(BarBazNode())
+        self.assertIn('visit_bar_baz_node', str(cm.exception))
+
+    def test_subclass_dispatch(self):
+        # Fill the table of the base class first
+        self.assertEqual(FooVisitor().visit(FooNode()), 'foo')
+        visitor = FooBarVisitor()
+        self.assertEqual(visitor.visit(FooNode()), 'foo2')
+        self.assertEqual(visitor.visit(BarBazNode()), 'bar')
+        self.assertEqual(FooVisitor().visit(FooNode()), 'foo')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Any, Callable, ClassVar, Dict
 import re
 
 first_cap_re = re.compile('(.)([A-Z][a-z]+)')
@@ -11,15 +12,30 @@ def camel_to_snake_case(name: str) -> str:
 
 
 class GenericVisitor(ABC):
+    # Maps the type of a visited node to the method that visits it. Every subclass gets its own table, which is filled on first use
+    _dispatch_table: ClassVar[Dict[type, Callable[['GenericVisitor', Any], Any]]] = dict()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch_table = dict()
 
     @abstractmethod
     def __init__(self):
         pass
 
     def visit(self, node):
-        method_name = self._visit_method_name(node)
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
+        try:
+            visitor = self._dispatch_table[type(node)]
+        except KeyError:
+            visitor = self._resolve_visitor(type(node))
+        return visitor(self, node)
+
+    @classmethod
+    def _resolve_visitor(cls, node_type: type) -> Callable[['GenericVisitor', Any], Any]:
+        method_name = 'visit_' + camel_to_snake_case(node_type.__name__)
+        visitor = getattr(cls, method_name, cls.generic_visit)
+        cls._dispatch_table[node_type] = visitor
+        return visitor
 
     def generic_visit(self, node):
         raise Exception(